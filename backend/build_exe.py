@@ -6,11 +6,34 @@ Builds Windows .exe using PyInstaller with all necessary files.
 """
 import os
 import sys
+import json
 import shutil
 import subprocess
+from collections import Counter
 from pathlib import Path
 import importlib.util
 
+from bundle_config import EXCLUDED_MODULES, is_excluded
+
+
+# Imports everything a real tray app startup imports, without opening the
+# database: production settings, the WSGI app, URLconf, views and templates.
+STARTUP_PROFILE_SCRIPT = """
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'labelgen.settings_production'
+import django
+django.setup()
+from labelgen.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+from django.template.loader import get_template
+for name in ('base', 'home', 'bulk_generate', 'box_label', 'reprint', 'printer_settings'):
+    get_template(f'inventory/{name}.html')
+import inventory.startup
+import inventory.management.commands.serve
+import waitress
+"""
+
 
 def check_package(package_name, install_name=None):
     """Check if a package is installed without importing it."""
@@ -25,6 +48,106 @@ def check_package(package_name, install_name=None):
     return True
 
 
+def profile_startup_imports(base_dir):
+    """
+    Run a startup under `python -X importtime` and parse the profile.
+
+    Returns:
+        list: (module, self_us, cumulative_us) tuples in import order
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_PROFILE_SCRIPT],
+        cwd=str(base_dir),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise RuntimeError('Startup import profile failed')
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def archive_sizes(build_dir):
+    """
+    Compressed size of everything in the bundle, grouped by package.
+
+    Returns:
+        dict: {'modules': {package: bytes}, 'files': {path prefix: bytes}}
+    """
+    from PyInstaller.archive.readers import CArchiveReader, ZlibArchiveReader
+
+    modules = Counter()
+    for pyz in build_dir.glob('PYZ-*.pyz'):
+        for name, (_, _, length) in ZlibArchiveReader(str(pyz)).toc.items():
+            parts = name.split('.')
+            key = '.'.join(parts[:2]) if parts[0] == 'django' else parts[0]
+            modules[key] += length
+
+    files = Counter()
+    for pkg in build_dir.glob('*.pkg'):
+        for name, entry in CArchiveReader(str(pkg)).toc.items():
+            if entry[-1] in ('m', 'M', 's'):
+                continue  # bootstrap scripts
+            parts = name.replace('\\', '/').split('/')
+            key = '/'.join(parts[:3]) if parts[0] == 'django' else '/'.join(parts[:2])
+            files[key] += entry[1]
+    return {'modules': dict(modules), 'files': dict(files)}
+
+
+def write_build_report(dist_dir, exe_path, imports, sizes):
+    """Write build_report.json and a readable build_report.txt to dist/."""
+    by_package = Counter()
+    for module, self_us, _ in imports:
+        by_package[module.split('.')[0]] += self_us
+
+    report = {
+        'executable': exe_path.name,
+        'executable_bytes': exe_path.stat().st_size,
+        'startup_import_us': sum(self_us for _, self_us, _ in imports),
+        'startup_modules': len(imports),
+        'import_time_by_package_us': dict(by_package.most_common()),
+        'slowest_imports': [
+            {'module': module, 'self_us': self_us, 'cumulative_us': cumulative_us}
+            for module, self_us, cumulative_us in sorted(imports, key=lambda i: -i[1])[:40]
+        ],
+        'bundle_module_bytes': dict(Counter(sizes['modules']).most_common()),
+        'bundle_file_bytes': dict(Counter(sizes['files']).most_common()),
+        'excluded_modules': EXCLUDED_MODULES,
+    }
+    with open(dist_dir / 'build_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    lines = [
+        'LabelGen build report',
+        '=' * 60,
+        f"Executable: {exe_path.name} ({report['executable_bytes'] / (1024*1024):.1f} MB)",
+        f"Startup imports: {report['startup_modules']} modules, "
+        f"{report['startup_import_us'] / 1000:.0f} ms",
+        '',
+        'Import time by package (self time):',
+    ]
+    for package, us in by_package.most_common(20):
+        lines.append(f'  {us / 1000:8.1f} ms  {package}')
+    lines += ['', 'Slowest modules (self / cumulative):']
+    for entry in report['slowest_imports'][:20]:
+        lines.append(f"  {entry['self_us'] / 1000:8.1f} / {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+    lines += ['', 'Largest bundled files (compressed):']
+    for name, size in Counter(sizes['files']).most_common(20):
+        lines.append(f'  {size / 1024:8.0f} KB  {name}')
+    lines += ['', 'Largest bundled Python packages (compressed bytecode):']
+    for name, size in Counter(sizes['modules']).most_common(20):
+        lines.append(f'  {size / 1024:8.0f} KB  {name}')
+    with open(dist_dir / 'build_report.txt', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
 def main():
     """Build the executable"""
     print("=" * 60)
@@ -42,6 +165,8 @@ def main():
         missing.append('pystray')
     if not check_package('PIL', 'Pillow'):
         missing.append('Pillow')
+    if not check_package('whitenoise'):
+        missing.append('whitenoise')
     
     if missing:
         print(f"\n[ERROR] Missing packages: {', '.join(missing)}")
@@ -58,6 +183,36 @@ def main():
             shutil.rmtree(dir_path)
             print(f"  Removed {dir_name}/")
     
+    # Profile a real startup before building so an exclusion can't remove
+    # something the app imports
+    print("\nProfiling startup imports (-X importtime)...")
+    try:
+        imports = profile_startup_imports(base_dir)
+    except RuntimeError as e:
+        print(f"\n[ERROR] {e}")
+        sys.exit(1)
+    needed = sorted({module for module, _, _ in imports if is_excluded(module)})
+    if needed:
+        print("\n[ERROR] Excluded modules are imported at startup:")
+        for module in needed:
+            print(f"  - {module}")
+        print("Remove them from EXCLUDED_MODULES in bundle_config.py")
+        sys.exit(1)
+    print(f"  {len(imports)} modules, {sum(i[1] for i in imports) / 1000:.0f} ms")
+    
+    # Hash and precompress static files into staticfiles/ for the bundle
+    print("\nCollecting static files...")
+    try:
+        subprocess.run(
+            [sys.executable, 'manage.py', 'collectstatic', '--noinput', '--clear', '-v', '0'],
+            check=True,
+            cwd=str(base_dir),
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='labelgen.settings_production'),
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"\n[ERROR] collectstatic failed: {e}")
+        sys.exit(1)
+    
     # Remove old spec file if using auto-generation
     spec_file = base_dir / 'labelgen.spec'
     
@@ -97,6 +252,15 @@ def main():
         import stat
         exe_path.chmod(exe_path.stat().st_mode | stat.S_IEXEC)
     
+    # Keep the size/import-time report next to the executable
+    try:
+        sizes = archive_sizes(base_dir / 'build' / 'labelgen')
+    except Exception as e:
+        print(f"Warning: could not read bundle archives: {e}")
+        sizes = {'modules': {}, 'files': {}}
+    write_build_report(base_dir / 'dist', exe_path, imports, sizes)
+    print("Build report: dist/build_report.txt")
+    
     # Create a README for distribution
     readme_path = base_dir / 'dist' / 'README.txt'
     with open(readme_path, 'w') as f:
@@ -113,7 +277,7 @@ Quick Start:
 
 First Run Notes:
 - The database (db.sqlite3) will be created automatically
-- Migrations are applied on every startup (safe to run multiple times)
+- Migrations are applied on the first start after an update (safe to run multiple times)
 - Initial configuration is created with defaults (serial starts at 500)
 - Check the console window for startup status messages
 
@@ -130,8 +294,11 @@ Requirements:
 
 Database:
 - The database (db.sqlite3) will be created in the same folder as this executable
+- Admin sessions are kept separately in system.sqlite3 in the same folder
 - This ensures your data persists between runs
-- To backup your data, simply copy db.sqlite3 to a safe location
+- .schema_fingerprint.json lets LabelGen skip migrations when nothing changed;
+  delete it to force a full migration check on the next launch
+- To backup your data, quit LabelGen and copy db.sqlite3 to a safe location
 
 Note: The server runs on http://127.0.0.1:8001/
 
@@ -143,6 +310,7 @@ For support, see the documentation in the source repository.
     print("\nDistribution files:")
     print(f"  - LabelGen.exe ({exe_path.stat().st_size / (1024*1024):.1f} MB)")
     print(f"  - README.txt")
+    print(f"  - build_report.txt / build_report.json (bundle size and import times)")
     
     print("\nNext steps:")
     print("  1. Test the executable: cd dist && ./LabelGen.exe")
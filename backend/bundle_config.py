@@ -0,0 +1,74 @@
+"""
+What the PyInstaller bundle leaves out.
+
+Shared by labelgen.spec (which applies it) and build_exe.py (which checks it
+against an import-time profile of a real startup, so a module the app
+actually imports can never be excluded by mistake).
+"""
+
+# Modules never imported by the tray app with production settings
+EXCLUDED_MODULES = [
+    # Django contrib apps not in INSTALLED_APPS (admin and messages are
+    # only loaded by the development settings, which the bundle doesn't use)
+    'django.contrib.admin',
+    'django.contrib.admindocs',
+    'django.contrib.flatpages',
+    'django.contrib.gis',
+    'django.contrib.humanize',
+    'django.contrib.messages',
+    'django.contrib.postgres',
+    'django.contrib.redirects',
+    'django.contrib.sitemaps',
+    'django.contrib.syndication',
+    # Database backends other than SQLite
+    'django.db.backends.mysql',
+    'django.db.backends.oracle',
+    'django.db.backends.postgresql',
+    # Test and development tooling
+    'django.test',
+    'inventory.admin',
+    'inventory.tests',
+    'unittest',
+    'pydoc',
+    'pydoc_data',
+    # The bundle serves through waitress; uvicorn is only for `serve --asgi`
+    'uvicorn',
+    # Pillow is only used to draw the tray icon
+    'tkinter',
+    'PIL.ImageTk',
+    'PIL.ImageQt',
+    'PIL.AvifImagePlugin',
+    'PIL._avif',
+    'PIL.WebPImagePlugin',
+    'PIL._webp',
+]
+
+# Data files under these bundle paths belong to excluded contrib apps
+EXCLUDED_DATA_PREFIXES = [
+    'django/contrib/' + module.split('.')[2]
+    for module in EXCLUDED_MODULES
+    if module.startswith('django.contrib.')
+]
+
+# Translation catalogs kept; the UI is English only
+KEPT_LOCALES = ('en',)
+
+
+def keep_data_file(dest):
+    """True if a collected data file (bundle path) should be shipped."""
+    dest = dest.replace('\\', '/')
+    if any(dest == prefix or dest.startswith(prefix + '/') for prefix in EXCLUDED_DATA_PREFIXES):
+        return False
+    if dest.endswith('.po'):
+        return False
+    if '/locale/' in dest:
+        locale = dest.split('/locale/', 1)[1].split('/', 1)[0]
+        return locale in KEPT_LOCALES
+    return True
+
+
+def is_excluded(module_name):
+    return any(
+        module_name == excluded or module_name.startswith(excluded + '.')
+        for excluded in EXCLUDED_MODULES
+    )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, SerialNumber, Config
+from .models import Product, SerialNumber, ArchivedSerialNumber, GenerationBatch, PrintJob, Config
 
 
 @admin.register(Product)
@@ -27,6 +27,41 @@ class SerialNumberAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(ArchivedSerialNumber)
+class ArchivedSerialNumberAdmin(admin.ModelAdmin):
+    list_display = ['serial_number', 'part_number', 'upc', 'created_at', 'archived_at']
+    search_fields = ['serial_number', 'part_number__part_number', 'upc']
+    readonly_fields = ['serial_number', 'part_number', 'upc', 'created_at', 'change_seq', 'archived_at']
+    
+    def has_add_permission(self, request):
+        # Rows only arrive here through the archive_serials command
+        return False
+
+
+@admin.register(GenerationBatch)
+class GenerationBatchAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'part_number', 'first_serial', 'last_serial', 'quantity', 'station']
+    search_fields = ['part_number__part_number', 'station']
+    readonly_fields = ['part_number', 'upc', 'start_number', 'end_number', 'serial_digits', 'station', 'created_at']
+    date_hierarchy = 'created_at'
+    
+    def has_add_permission(self, request):
+        # Batches are recorded by serial generation
+        return False
+
+
+@admin.register(PrintJob)
+class PrintJobAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'label_type', 'station', 'printer', 'confirmed', 'total', 'status']
+    list_filter = ['status', 'label_type']
+    search_fields = ['station', 'printer']
+    readonly_fields = ['label_type', 'printer', 'station', 'labels', 'total', 'confirmed', 'created_at', 'updated_at']
+    
+    def has_add_permission(self, request):
+        # Jobs are registered by workstations when they start printing
+        return False
+
+
 @admin.register(Config)
 class ConfigAdmin(admin.ModelAdmin):
     list_display = ['serial_start', 'serial_digits', 'current_serial', 'formatted_current']
@@ -2,4 +2,13 @@ from django.apps import AppConfig
 
 
 class InventoryConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import apply_sqlite_pragmas
+        from .querylog import install_slow_query_log
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='inventory.apply_sqlite_pragmas')
+        connection_created.connect(install_slow_query_log, dispatch_uid='inventory.install_slow_query_log')
@@ -0,0 +1,124 @@
+"""
+Hot/cold archival of serial numbers.
+
+Old rows are moved in batches from SerialNumber to ArchivedSerialNumber so the
+hot table (and its indexes) only holds recent serials. Lookups check the hot
+table first and fall through to the archive.
+"""
+
+from django.db import transaction
+
+from .models import ArchivedSerialNumber, SerialNumber
+
+
+ARCHIVE_FIELDS = ('serial_number', 'part_number_id', 'upc', 'created_at', 'change_seq')
+
+
+class SerialArchiveService:
+    """
+    Moves old serial numbers to the archive table and looks serials up in both.
+    """
+
+    DEFAULT_BATCH_SIZE = 5000
+
+    @staticmethod
+    def count_archivable(cutoff):
+        """Number of hot rows created before the cutoff."""
+        return SerialNumber.objects.filter(created_at__lt=cutoff).count()
+
+    @staticmethod
+    def archive(cutoff, batch_size=DEFAULT_BATCH_SIZE, progress_callback=None):
+        """
+        Move rows created before the cutoff into the archive table.
+
+        Each batch is copied and deleted in its own transaction, so the write
+        lock is only held briefly and an interrupted run can simply be started
+        again.
+
+        Args:
+            cutoff (datetime): Archive serials created before this time
+            batch_size (int): Rows moved per transaction
+            progress_callback (callable): Called with the running total after each batch
+
+        Returns:
+            int: Number of rows moved
+        """
+        moved = 0
+        last_serial = ''
+
+        while True:
+            with transaction.atomic():
+                # Walk the primary key so each batch resumes where the last stopped
+                rows = list(
+                    SerialNumber.objects.filter(
+                        serial_number__gt=last_serial,
+                        created_at__lt=cutoff,
+                    )
+                    .order_by('serial_number')
+                    .values_list(*ARCHIVE_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+
+                ArchivedSerialNumber.objects.bulk_create(
+                    [ArchivedSerialNumber(**dict(zip(ARCHIVE_FIELDS, row))) for row in rows],
+                    ignore_conflicts=True,
+                )
+                # The batch is exactly the qualifying rows in this key range
+                first_serial, last_serial = rows[0][0], rows[-1][0]
+                SerialNumber.objects.filter(
+                    serial_number__gte=first_serial,
+                    serial_number__lte=last_serial,
+                    created_at__lt=cutoff,
+                ).delete()
+
+            moved += len(rows)
+            if progress_callback:
+                progress_callback(moved)
+
+        return moved
+
+    @staticmethod
+    def lookup(serial_number, using=None):
+        """
+        Find a serial in the hot table, falling through to the archive.
+
+        Returns:
+            dict or None: {
+                'serial_number': str,
+                'part_number': str,
+                'upc': str or None,
+                'created_at': datetime,
+                'archived': bool
+            }
+        """
+        for model, archived in ((SerialNumber, False), (ArchivedSerialNumber, True)):
+            row = model.objects.using(using).filter(serial_number=serial_number).values_list(
+                'serial_number', 'part_number_id', 'upc', 'created_at'
+            ).first()
+            if row is not None:
+                return {
+                    'serial_number': row[0],
+                    'part_number': row[1],
+                    'upc': row[2],
+                    'created_at': row[3],
+                    'archived': archived,
+                }
+        return None
+
+    @staticmethod
+    async def alookup(serial_number):
+        """Async version of lookup() for async views."""
+        for model, archived in ((SerialNumber, False), (ArchivedSerialNumber, True)):
+            row = await model.objects.filter(serial_number=serial_number).values_list(
+                'serial_number', 'part_number_id', 'upc', 'created_at'
+            ).afirst()
+            if row is not None:
+                return {
+                    'serial_number': row[0],
+                    'part_number': row[1],
+                    'upc': row[2],
+                    'created_at': row[3],
+                    'archived': archived,
+                }
+        return None
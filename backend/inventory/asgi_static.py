@@ -0,0 +1,151 @@
+"""
+Static files under ASGI.
+
+WhiteNoiseMiddleware is sync-only, so under ASGI Django would run every
+request through it in a worker thread and switch back to the event loop
+afterwards, which is the cost async views are meant to avoid. The settings
+therefore list StaticFilesMiddleware, WhiteNoise's middleware that steps
+aside (MiddlewareNotUsed) when StaticFilesASGIHandler builds its chain.
+get_asgi_application() then answers static URLs in front of Django with a
+standalone WhiteNoise over STATIC_ROOT, through WhiteNoise's public WSGI
+interface: hashed files keep their immutable cache headers and the
+precompressed .br/.gz variants are still served. settings.MIDDLEWARE is
+never changed, and WSGI serving keeps the middleware.
+"""
+
+import asyncio
+import contextvars
+from urllib.parse import urlparse
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from whitenoise import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+WHITENOISE_MIDDLEWARE = 'inventory.asgi_static.StaticFilesMiddleware'
+CHUNK_SIZE = 64 * 1024
+# Names ManifestStaticFilesStorage gives hashed copies: app.3f2a9c1b04de.css
+HASHED_FILE_RE = r'\.[0-9a-f]{12}\.[^/]+$'
+
+# Set while StaticFilesASGIHandler loads its middleware
+_static_served_in_front = contextvars.ContextVar('static_served_in_front', default=False)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise's middleware, left out of the chain when static files are served in front of it."""
+
+    def __init__(self, get_response=None, settings=settings):
+        if _static_served_in_front.get():
+            raise MiddlewareNotUsed('Static files are served in front of the ASGI handler')
+        super().__init__(get_response, settings)
+
+
+class StaticFilesASGIHandler(ASGIHandler):
+    """Django's ASGI handler, without StaticFilesMiddleware in its chain."""
+
+    def load_middleware(self, is_async=False):
+        token = _static_served_in_front.set(True)
+        try:
+            super().load_middleware(is_async)
+        finally:
+            _static_served_in_front.reset(token)
+
+
+def wsgi_environ(scope):
+    """The WSGI environ WhiteNoise reads (method, path, Accept-Encoding, Range, ...)."""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI carries the path as UTF-8 bytes decoded as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'wsgi.file_wrapper': lambda file, block_size=CHUNK_SIZE: FileWrapper(file, CHUNK_SIZE),
+    }
+    for name, value in scope.get('headers', []):
+        environ['HTTP_' + name.decode('latin-1').upper().replace('-', '_')] = value.decode('latin-1')
+    return environ
+
+
+def not_static(environ, start_response):
+    # WhiteNoise hands on requests for files it doesn't have; nothing is started
+    return ()
+
+
+def build_whitenoise():
+    """A standalone WhiteNoise over STATIC_ROOT, configured like the middleware."""
+    whitenoise = WhiteNoise(
+        not_static,
+        autorefresh=getattr(settings, 'WHITENOISE_AUTOREFRESH', settings.DEBUG),
+        max_age=getattr(settings, 'WHITENOISE_MAX_AGE', 0 if settings.DEBUG else 60),
+        immutable_file_test=HASHED_FILE_RE,
+    )
+    prefix = urlparse(settings.STATIC_URL or '').path
+    if settings.STATIC_ROOT:
+        whitenoise.add_files(settings.STATIC_ROOT, prefix=prefix)
+    return whitenoise, '/' + prefix.strip('/') + '/'
+
+
+class StaticFilesApplication:
+    """ASGI application serving WhiteNoise's files and passing everything else on."""
+
+    def __init__(self, application, whitenoise, prefix):
+        self.application = application
+        self.whitenoise = whitenoise
+        self.prefix = prefix
+
+    def static_response(self, scope):
+        """(status, headers, body iterable) for a static file, or None."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started.update(status=int(status.split(' ', 1)[0]), headers=headers)
+
+        body = self.whitenoise(wsgi_environ(scope), start_response)
+        if not started:
+            return None
+        return started['status'], started['headers'], body
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(self.prefix):
+            return await self.application(scope, receive, send)
+
+        # Opening the file and checking the headers touch the disk
+        response = await asyncio.to_thread(self.static_response, scope)
+        if response is None:
+            return await self.application(scope, receive, send)
+
+        status, headers, body = response
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                for name, value in headers
+            ],
+        })
+        chunks = iter(body)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, b'')
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': bool(chunk)})
+                if not chunk:
+                    break
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+def get_asgi_application():
+    """
+    Django's ASGI application, with static files served in front of it
+    instead of by StaticFilesMiddleware when the settings include it.
+    """
+    import django
+
+    django.setup(set_prefix=False)
+    handler = StaticFilesASGIHandler()
+    if WHITENOISE_MIDDLEWARE not in settings.MIDDLEWARE:
+        return handler
+    return StaticFilesApplication(handler, *build_whitenoise())
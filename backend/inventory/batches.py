@@ -0,0 +1,119 @@
+"""
+Generation batches: one row per generate_serials call.
+
+A batch stores the numeric range it covers rather than its serials, so the
+reprint page can list recent runs from the created_at index and rebuild the
+ZPL for a whole run (or what is left of it after a jam) from a single row.
+
+Ranges can overlap: an admin may move the serial counter backwards or change
+the digit count, so the same number can be in several batches. The batch a
+scanned serial belongs to is therefore found through its SerialNumber row.
+"""
+
+from .archive import SerialArchiveService
+from .models import GenerationBatch
+
+
+class GenerationBatchService:
+    """
+    Reads generation batches and resolves reprint ranges.
+    """
+
+    DEFAULT_RECENT = 25
+    MAX_RECENT = 200
+
+    @staticmethod
+    def clamp_limit(limit):
+        """Coerce a requested listing size into 1..MAX_RECENT."""
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            return GenerationBatchService.DEFAULT_RECENT
+        return max(1, min(limit, GenerationBatchService.MAX_RECENT))
+
+    @staticmethod
+    def to_dict(batch):
+        return {
+            'id': batch.pk,
+            'part_number': batch.part_number_id,
+            'upc': batch.upc,
+            'first_serial': batch.first_serial,
+            'last_serial': batch.last_serial,
+            'quantity': batch.quantity,
+            'station': batch.station,
+            'created_at': batch.created_at.isoformat(),
+        }
+
+    @staticmethod
+    def recent(limit=DEFAULT_RECENT, using=None):
+        """
+        Most recent batches, newest first.
+
+        Returns:
+            list: batch dicts (see to_dict)
+        """
+        batches = GenerationBatch.objects.using(using).order_by('-created_at', '-pk')[:limit]
+        return [GenerationBatchService.to_dict(batch) for batch in batches]
+
+    @staticmethod
+    def containing(serial, using=None):
+        """
+        The batch a serial number was generated in, or None.
+
+        The serial's row (hot or archived) gives its part number and creation
+        time. Of the batches for that part and digit count whose range holds
+        the number, the right one is the first created at or after the
+        serial, since a batch is saved right after its serials.
+        """
+        try:
+            number = int(serial)
+        except (TypeError, ValueError):
+            return None
+        record = SerialArchiveService.lookup(serial, using=using)
+        if record is None:
+            return None
+        return (
+            GenerationBatch.objects.using(using)
+            .filter(
+                part_number_id=record['part_number'],
+                serial_digits=len(serial),
+                start_number__lte=number,
+                end_number__gte=number,
+                created_at__gte=record['created_at'],
+            )
+            .order_by('created_at', 'pk')
+            .first()
+        )
+
+    @staticmethod
+    def serials(batch, start=None, end=None):
+        """
+        Formatted serials of a batch, or of the sub-range start..end
+        (inclusive, either bound optional).
+
+        Args:
+            batch (GenerationBatch): The batch to reprint
+            start (str): First serial to include, as scanned
+            end (str): Last serial to include, as scanned
+
+        Returns:
+            list: serial number strings in order
+
+        Raises:
+            ValueError: a bound is not numeric or lies outside the batch
+        """
+        first = batch.start_number
+        last = batch.end_number
+        try:
+            if start not in (None, ''):
+                first = int(start)
+            if end not in (None, ''):
+                last = int(end)
+        except (TypeError, ValueError):
+            raise ValueError('Serial range bounds must be numeric')
+
+        if not batch.start_number <= first <= last <= batch.end_number:
+            raise ValueError(
+                f'Range must lie within {batch.first_serial}-{batch.last_serial}'
+            )
+        return [str(number).zfill(batch.serial_digits) for number in range(first, last + 1)]
@@ -0,0 +1,314 @@
+"""
+Benchmark scenarios and synthetic datasets for `manage.py bench`.
+
+Benchmarks run against separate database files in a data directory, set up
+through Django's test database machinery, so the real database is never
+touched. A dataset is built once and reused by later runs until the data
+directory is deleted. Each scenario times a key operation (serial generation,
+bulk scans, lookups, label ZPL, CSV import and the admin listing) through
+the same code paths a workstation uses. Scenarios run inside transactions
+that are rolled back, so what they write never reaches the saved dataset
+and every run measures the same data.
+"""
+
+import csv
+import io
+import json
+import platform
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta, timezone as dt_timezone
+
+import django
+from django.db import connections, transaction
+from django.test import Client
+from django.utils import timezone
+
+from .models import ArchivedSerialNumber, Config, GenerationBatch, Product, SerialNumber
+from .services import SerialNumberGenerator
+
+
+DATASETS = {
+    'small': {'products': 2000, 'serials': 50000},
+    'medium': {'products': 200000, 'serials': 1000000},
+    'large': {'products': 200000, 'serials': 10000000},
+}
+
+SERIAL_START = 500
+INSERT_CHUNK = 50000
+UPC_SHARE = 0.7
+
+
+BENCH_ALIASES = ('default', 'system')
+
+
+def bench_database_names(data_dir, dataset):
+    """Database file for each migrated alias of a dataset."""
+    return {
+        'default': str(data_dir / f'{dataset}.sqlite3'),
+        'system': str(data_dir / f'{dataset}-system.sqlite3'),
+    }
+
+
+def part_number_for(index):
+    return f'{index // 10000:03d}-{index % 10000:04d}'
+
+
+def upc_for(index):
+    return f'{(index * 7919) % 10**12:012d}'
+
+
+def dataset_is_built(products, serials):
+    config = Config.objects.filter(pk=1).first()
+    return (
+        config is not None
+        and config.serial_start == SERIAL_START
+        and Product.objects.count() >= products
+        and config.current_serial - SERIAL_START >= serials
+    )
+
+
+def build_dataset(products, serials, log=print):
+    """
+    Fill the current default database with products and serials.
+
+    Rows are inserted with executemany in large transactions rather than
+    through the ORM; 1M serials take well under a minute.
+    """
+    digits = max(6, len(str(SERIAL_START + serials)) + 1)
+    now = timezone.now().astimezone(dt_timezone.utc).replace(tzinfo=None)
+    connection = connections['default']
+
+    with transaction.atomic():
+        SerialNumber.objects.all().delete()
+        ArchivedSerialNumber.objects.all().delete()
+        GenerationBatch.objects.all().delete()
+        Product.objects.all().delete()
+        Config.objects.all().delete()
+
+    log(f'  {products} products...')
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk_start in range(0, products, INSERT_CHUNK):
+            cursor.executemany(
+                'INSERT INTO inventory_product (part_number, upc, change_seq) VALUES (%s, %s, NULL)',
+                [
+                    (part_number_for(i), upc_for(i) if (i % 10) < UPC_SHARE * 10 else None)
+                    for i in range(chunk_start, min(chunk_start + INSERT_CHUNK, products))
+                ],
+            )
+
+    log(f'  {serials} serials...')
+    for chunk_start in range(0, serials, INSERT_CHUNK):
+        rows = []
+        for i in range(chunk_start, min(chunk_start + INSERT_CHUNK, serials)):
+            product = (i * 2654435761) % products
+            rows.append((
+                str(SERIAL_START + i).zfill(digits),
+                part_number_for(product),
+                upc_for(product) if (product % 10) < UPC_SHARE * 10 else None,
+                # Oldest first, about 20 seconds apart
+                (now - timedelta(seconds=(serials - i) * 20)).isoformat(' '),
+                i + 1,
+            ))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO inventory_serialnumber (serial_number, part_number_id, upc, created_at, change_seq) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+        if chunk_start and chunk_start % (INSERT_CHUNK * 20) == 0:
+            log(f'    {chunk_start}')
+
+    Config.objects.create(
+        pk=1,
+        serial_start=SERIAL_START,
+        serial_digits=digits,
+        current_serial=SERIAL_START + serials,
+        last_change_seq=serials,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+@contextmanager
+def rolled_back(aliases=BENCH_ALIASES):
+    """Run the block in a transaction on each alias and roll them all back."""
+    with ExitStack() as stack:
+        for alias in aliases:
+            if alias in connections.settings:
+                stack.enter_context(transaction.atomic(using=alias))
+        yield
+        for alias in aliases:
+            if alias in connections.settings:
+                transaction.set_rollback(True, using=alias)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples):
+    """Timing summary in milliseconds for a list of durations in seconds."""
+    values = sorted(sample * 1000 for sample in samples)
+    return {
+        'runs': len(values),
+        'mean_ms': round(sum(values) / len(values), 3),
+        'p50_ms': round(percentile(values, 0.50), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'min_ms': round(values[0], 3),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+class BenchmarkSuite:
+    """
+    The benchmark scenarios. Each scenario is (name, default runs, operation);
+    the operation performs one timed unit of work.
+    """
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+        self.client = Client()
+        self.admin_client = Client()
+        session = self.admin_client.session
+        session['admin_authenticated'] = True
+        session.save()
+
+        config = SerialNumberGenerator.get_config()
+        self.serial_digits = config.serial_digits
+        self.serial_range = (config.serial_start, config.current_serial)
+        parts = Product.objects.count()
+        self.part_numbers = list(
+            Product.objects.order_by('part_number').values_list('part_number', flat=True)[
+                self.random.randrange(max(1, parts - 1000)):
+            ][:1000]
+        )
+        self.upload_round = 0
+
+    def existing_serial(self):
+        return str(self.random.randrange(*self.serial_range)).zfill(self.serial_digits)
+
+    def part_number(self):
+        return self.random.choice(self.part_numbers)
+
+    def scenarios(self):
+        scenarios = []
+        for quantity, runs in ((1, 200), (10, 100), (100, 30), (1000, 10)):
+            scenarios.append((
+                f'generate_serials[{quantity}]', runs,
+                lambda quantity=quantity: SerialNumberGenerator.generate_serials(self.part_number(), quantity),
+            ))
+        scenarios += [
+            ('process_bulk_scans[5x10]', 50, self.process_bulk_scans),
+            ('lookup_serial[hit]', 500, lambda: self.get('/api/lookup-serial/', serial=self.existing_serial())),
+            ('lookup_serial[miss]', 500, lambda: self.get('/api/lookup-serial/', serial='X' + self.existing_serial())),
+            ('generate_label_zpl[box]', 500, self.generate_label_zpl),
+            ('admin_upload_csv[1000 rows]', 5, self.upload_csv),
+            ('admin_product_listing', 5, self.product_listing),
+            ('admin_upc_page', 3, lambda: self.get('/admin-upc/', client=self.admin_client)),
+        ]
+        return scenarios
+
+    def get(self, path, client=None, **params):
+        response = (client or self.client).get(path, params)
+        if response.status_code >= 500:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+        return response
+
+    def post_json(self, path, data, client=None):
+        response = (client or self.client).post(path, json.dumps(data), content_type='application/json')
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}: {response.content[:200]!r}')
+        return response
+
+    def process_bulk_scans(self):
+        pairs = [{'part_number': self.part_number(), 'quantity': '10'} for _ in range(5)]
+        self.post_json('/api/process-bulk-scans/', {'pairs': pairs})
+
+    def generate_label_zpl(self):
+        self.post_json('/api/generate-label-zpl/', {
+            'label_type': 'box',
+            'serial_number': self.existing_serial(),
+            'part_number': self.part_number(),
+            'upc': '012345678901',
+        })
+
+    def upload_csv(self):
+        # 900 existing parts get new UPCs and 100 parts are new, every round
+        self.upload_round += 1
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['PartNumber', 'UPC'])
+        for part_number in self.random.sample(self.part_numbers, min(900, len(self.part_numbers))):
+            writer.writerow([part_number, f'{self.random.randrange(10**12):012d}'])
+        for i in range(100):
+            writer.writerow([f'B{self.upload_round:02d}-{i:04d}', f'{self.random.randrange(10**12):012d}'])
+        upload = io.BytesIO(out.getvalue().encode('utf-8'))
+        upload.name = 'bench.csv'
+        response = self.admin_client.post('/api/admin-upload-csv/', {'csv_file': upload})
+        if response.status_code != 200:
+            raise RuntimeError(f'CSV import returned {response.status_code}')
+
+    def product_listing(self):
+        list(Product.objects.order_by('part_number').values_list('part_number', 'upc'))
+
+
+def run_suite(suite, selected=None, scale=1.0, log=print):
+    """
+    Run the suite's scenarios (all, or those whose name starts with one of
+    selected) and return {name: summary}. Each scenario's writes are
+    rolled back when it finishes.
+    """
+    results = {}
+    for name, runs, operation in suite.scenarios():
+        if selected and not any(name.startswith(prefix) for prefix in selected):
+            continue
+        runs = max(1, int(runs * scale))
+        samples = []
+        with rolled_back():
+            operation()  # warm-up, not timed
+            for _ in range(runs):
+                start = time.perf_counter()
+                operation()
+                samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples)
+        log(f"  {name:<30} p50 {results[name]['p50_ms']:>9.2f} ms   p95 {results[name]['p95_ms']:>9.2f} ms")
+    return results
+
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Compare scenario p50s against a baseline report.
+
+    Returns:
+        list: dicts with scenario, baseline_ms, current_ms, change and
+        regressed (p50 slower than baseline by more than tolerance)
+    """
+    comparison = []
+    for name, summary in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        change = (summary['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] if previous['p50_ms'] else 0.0
+        comparison.append({
+            'scenario': name,
+            'baseline_ms': previous['p50_ms'],
+            'current_ms': summary['p50_ms'],
+            'change': round(change, 4),
+            'regressed': change > tolerance,
+        })
+    return comparison
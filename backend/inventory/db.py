@@ -0,0 +1,62 @@
+"""
+Database connection setup.
+Applies the SQLite PRAGMA profile from settings.SQLITE_PRAGMAS, adjusted per
+alias by settings.SQLITE_ALIAS_PRAGMAS, to every new connection.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+
+from .routers import READ_ALIAS
+
+
+PRAGMA_NAME_RE = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE_RE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+
+def migrated_aliases():
+    """
+    Return the database aliases that hold their own schema.
+    The read-only alias opens the 'default' file and is never migrated.
+    """
+    return [alias for alias in connections.settings if alias != READ_ALIAS]
+
+
+def get_sqlite_pragmas(alias=None):
+    """Return the PRAGMA profile for a database alias as a dict."""
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if alias is not None:
+        pragmas.update(getattr(settings, 'SQLITE_ALIAS_PRAGMAS', {}).get(alias, {}))
+    return pragmas
+
+
+def pragma_statements(pragmas):
+    """
+    Build PRAGMA statements from a profile dict.
+
+    Names and values are checked against simple patterns because PRAGMA
+    statements cannot take bound parameters.
+    """
+    statements = []
+    for name, value in pragmas.items():
+        if value is None:
+            continue
+        value = str(value)
+        if not PRAGMA_NAME_RE.match(name) or not PRAGMA_VALUE_RE.match(value):
+            raise ValueError(f"Invalid SQLite PRAGMA: {name}={value}")
+        statements.append(f'PRAGMA {name}={value}')
+    return statements
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created handler that applies the PRAGMA profile."""
+    if connection.vendor != 'sqlite':
+        return
+
+    # Run on the raw sqlite3 connection so the statements are not recorded
+    # as application queries.
+    raw_connection = connection.connection
+    for statement in pragma_statements(get_sqlite_pragmas(connection.alias)):
+        raw_connection.execute(statement)
@@ -0,0 +1,460 @@
+"""
+ZPL printer emulator for throughput testing and capacity planning.
+
+Listens like a network printer on raw TCP (port 9100) and like the printer
+bridge on HTTP (POST /print, GET /printers), so both the server-side
+transport and the browser flow can be pointed at it. Nothing is rendered;
+each label is timed instead:
+
+- Formatting costs a fixed time per barcode plus the ZPL size over
+  FORMAT_RATE. The next label is formatted while the current one prints.
+- Printing costs (label length + LABEL_GAP) / speed per copy. Length comes
+  from ^LL (dots, over DPI) or LABEL_LENGTH, speed from ^PR or SPEED, and
+  copies from ^PQ.
+
+Received labels wait in a buffer of BUFFER bytes. While it is full the TCP
+listener stops reading, so senders see the same flow control as from a
+printer that is busy. A job is one HTTP request, or what arrives on a TCP
+connection until it goes quiet for JOB_GAP seconds.
+
+All times are emulated seconds. With a time_scale below 1 the emulator runs
+faster than a real printer (0.01 prints a 2 second label in 20 ms), which
+keeps tests short; reports are still in printer time.
+"""
+
+import collections
+import http.server
+import json
+import re
+import socketserver
+import threading
+import time
+
+
+EMULATOR_DEFAULTS = {
+    'DPI': 203,
+    'SPEED': 4.0,             # inches per second, unless a label sets ^PR
+    'LABEL_LENGTH': 2.0,      # inches, unless a label sets ^LL
+    'LABEL_GAP': 0.125,       # inches fed between labels
+    'FORMAT_RATE': 100000,    # bytes of ZPL formatted per second
+    'BARCODE_TIME': 0.02,     # seconds to render one barcode field
+    'BUFFER': 256 * 1024,     # bytes of received labels held before reading stops
+    'JOB_GAP': 1.0,           # seconds of TCP silence that end a job
+}
+
+KEEP_JOBS = 200
+# Bytes read from a TCP connection at a time: what the buffer has room
+# for, within these bounds
+MIN_READ = 4096
+MAX_READ = 65536
+
+# ^PR letter speeds, inches per second
+PRINT_SPEED_LETTERS = {'A': 2, 'B': 3, 'C': 4, 'D': 5, 'E': 6}
+
+FORMAT_END = b'^XZ'
+LABEL_LENGTH_RE = re.compile(rb'\^LL(\d+)')
+PRINT_SPEED_RE = re.compile(rb'\^PR([A-E]|\d+)')
+QUANTITY_RE = re.compile(rb'\^PQ(\d+)')
+# Every ^B command except ^BY (barcode defaults) draws a barcode
+BARCODE_RE = re.compile(rb'\^B(?!Y)[0-9A-Z]')
+
+
+class EmulatedLabel:
+    """One ^XA..^XZ format as the emulator sees it."""
+
+    def __init__(self, data, options):
+        self.size = len(data)
+        match = LABEL_LENGTH_RE.search(data)
+        self.length = int(match.group(1)) / options['DPI'] if match else options['LABEL_LENGTH']
+        match = PRINT_SPEED_RE.search(data)
+        if match is None:
+            self.speed = options['SPEED']
+        else:
+            value = match.group(1).decode('ascii')
+            self.speed = PRINT_SPEED_LETTERS.get(value) or int(value) or options['SPEED']
+        match = QUANTITY_RE.search(data)
+        self.copies = max(1, int(match.group(1))) if match else 1
+        self.barcodes = len(BARCODE_RE.findall(data))
+        self.format_seconds = self.barcodes * options['BARCODE_TIME'] + self.size / options['FORMAT_RATE']
+        self.print_seconds = self.copies * (self.length + options['LABEL_GAP']) / self.speed
+        self.job = None
+        self.received_at = None
+
+
+def split_formats(buffer):
+    """
+    Complete label formats at the start of a receive buffer.
+
+    Returns:
+        tuple: (list of format bytes, bytes left over for the next read)
+    """
+    formats = []
+    while True:
+        end = buffer.find(FORMAT_END)
+        if end < 0:
+            return formats, buffer
+        end += len(FORMAT_END)
+        data, buffer = buffer[:end], buffer[end:]
+        if b'^XA' in data:
+            formats.append(data)
+
+
+class EmulatedJob:
+
+    def __init__(self, job_id, source, peer, now):
+        self.id = job_id
+        self.source = source
+        self.peer = peer
+        self.labels = 0
+        self.printed = 0
+        self.bytes = 0
+        self.received_first = now
+        self.received_last = now
+        self.print_started = None
+        self.print_finished = None
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'source': self.source,
+            'peer': self.peer,
+            'labels': self.labels,
+            'printed': self.printed,
+            'bytes': self.bytes,
+            'receive_seconds': round(self.received_last - self.received_first, 3),
+            'wait_seconds': None,
+            'print_seconds': None,
+            'total_seconds': None,
+            'labels_per_minute': None,
+        }
+        if self.print_started is not None:
+            data['wait_seconds'] = round(self.print_started - self.received_first, 3)
+        if self.print_finished is not None:
+            data['print_seconds'] = round(self.print_finished - self.print_started, 3)
+            total = self.print_finished - self.received_first
+            data['total_seconds'] = round(total, 3)
+            if total > 0:
+                data['labels_per_minute'] = round(self.printed * 60 / total, 1)
+        return data
+
+
+class PrinterEmulator:
+    """
+    The emulated print engine: a label buffer, a thread that prints from it
+    in emulated time, and per-job and queue depth statistics.
+    """
+
+    def __init__(self, options=None, time_scale=1.0):
+        self.options = dict(EMULATOR_DEFAULTS, **(options or {}))
+        self.time_scale = time_scale
+        self.condition = threading.Condition()
+        self.queue = collections.deque()
+        self.buffered_bytes = 0
+        self.jobs = collections.OrderedDict()
+        self.job_ids = 0
+        self.labels_printed = 0
+        self.bytes_received = 0
+        self.busy_seconds = 0.0
+        self.stalls = 0
+        self.first_received = None
+        self.last_printed = None
+        self.max_depth = 0
+        self.depth_area = 0.0
+        self.depth_changed = 0.0
+        self.started = time.monotonic()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._print_loop, daemon=True)
+
+    def now(self):
+        """Emulated seconds since the emulator started."""
+        return (time.monotonic() - self.started) / self.time_scale
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join(timeout=5)
+
+    def new_job(self, source, peer=''):
+        with self.condition:
+            self.job_ids += 1
+            job = EmulatedJob(self.job_ids, source, peer, self.now())
+            self.jobs[job.id] = job
+            while len(self.jobs) > KEEP_JOBS:
+                self.jobs.popitem(last=False)
+            return job
+
+    def _depth_changing(self, now):
+        # Called with the lock held, before the queue length changes
+        self.depth_area += len(self.queue) * (now - self.depth_changed)
+        self.depth_changed = now
+
+    def wait_for_room(self, timeout=None):
+        """Block while the label buffer is full. False if timed out or stopped."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.stopped or self.buffered_bytes < self.options['BUFFER'], timeout
+            ) and not self.stopped
+
+    def room(self):
+        """Bytes the label buffer can take before it is full."""
+        with self.condition:
+            return max(0, self.options['BUFFER'] - self.buffered_bytes)
+
+    def submit(self, job, formats):
+        """Queue complete label formats for a job."""
+        with self.condition:
+            now = self.now()
+            if self.first_received is None:
+                self.first_received = now
+            job.received_last = now
+            for data in formats:
+                label = EmulatedLabel(data, self.options)
+                label.job = job
+                label.received_at = now
+                job.labels += label.copies
+                job.bytes += label.size
+                self.bytes_received += label.size
+                self.buffered_bytes += label.size
+                self._depth_changing(now)
+                self.queue.append(label)
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify_all()
+
+    def submit_document(self, source, zpl, peer=''):
+        """Queue one ZPL document (any number of labels) as a job; None if it has no labels."""
+        if isinstance(zpl, str):
+            zpl = zpl.encode('utf-8')
+        formats, _ = split_formats(zpl)
+        if not formats:
+            return None
+        job = self.new_job(source, peer)
+        self.submit(job, formats)
+        return job
+
+    def _print_loop(self):
+        free_at = 0.0
+        previous = None
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.stopped or self.queue)
+                if self.stopped:
+                    return
+                now = self.now()
+                self._depth_changing(now)
+                label = self.queue.popleft()
+                self.buffered_bytes -= label.size
+                self.condition.notify_all()
+
+                start = max(free_at, label.received_at)
+                if start > free_at:
+                    # Idle before this label: nothing to format ahead
+                    cost = label.format_seconds + label.print_seconds
+                    if previous is not None and previous.job is label.job:
+                        self.stalls += 1
+                else:
+                    cost = max(label.format_seconds, label.print_seconds)
+                if label.job.print_started is None:
+                    label.job.print_started = start
+                free_at = start + cost
+                previous = label
+
+            delay = (free_at - self.now()) * self.time_scale
+            if delay > 0:
+                time.sleep(delay)
+
+            with self.condition:
+                label.job.printed += label.copies
+                label.job.print_finished = free_at
+                self.labels_printed += label.copies
+                self.busy_seconds += cost
+                self.last_printed = free_at
+                self.condition.notify_all()
+
+    def wait_idle(self, labels=None, timeout=5):
+        """
+        Wait until every received label has printed.
+
+        With no jobs yet, or labels still on their way over the network, the
+        printer is idle too early; pass labels to also wait until at least
+        that many have printed.
+
+        Returns:
+            bool: False if timed out
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: (labels is None or self.labels_printed >= labels)
+                and all(job.printed >= job.labels for job in self.jobs.values()),
+                timeout,
+            )
+
+    def report(self, jobs=True):
+        """Throughput, printer utilization, queue depth and (optionally) per-job timing."""
+        with self.condition:
+            now = self.now()
+            area = self.depth_area + len(self.queue) * (now - self.depth_changed)
+            window = now - self.first_received if self.first_received is not None else 0.0
+            elapsed = (self.last_printed - self.first_received) if self.last_printed is not None else 0.0
+            data = {
+                'printer': dict(self.options),
+                'time_scale': self.time_scale,
+                'jobs_received': self.job_ids,
+                'labels_received': sum(job.labels for job in self.jobs.values()),
+                'labels_printed': self.labels_printed,
+                'bytes_received': self.bytes_received,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'elapsed_seconds': round(elapsed, 3),
+                'utilization': round(self.busy_seconds / elapsed, 3) if elapsed > 0 else None,
+                'labels_per_minute': round(self.labels_printed * 60 / elapsed, 1) if elapsed > 0 else None,
+                'stalls': self.stalls,
+                'queue_depth': {
+                    'current': len(self.queue),
+                    'max': self.max_depth,
+                    'mean': round(area / window, 2) if window > 0 else 0.0,
+                },
+            }
+            if jobs:
+                data['jobs'] = [job.to_dict() for job in self.jobs.values()]
+            return data
+
+
+class _RawHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        emulator = self.server.emulator
+        peer = '%s:%s' % self.client_address[:2]
+        job = None
+        pending = b''
+        while emulator.wait_for_room():
+            # A large read would queue more labels than the buffer holds
+            data = self.request.recv(min(MAX_READ, max(MIN_READ, emulator.room())))
+            if not data:
+                break
+            if job is None or emulator.now() - job.received_last > emulator.options['JOB_GAP']:
+                job = emulator.new_job('tcp', peer)
+            formats, pending = split_formats(pending + data)
+            if formats:
+                emulator.submit(job, formats)
+
+
+class _RawServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class _HttpHandler(http.server.BaseHTTPRequestHandler):
+    """The printer bridge's API, with one printer: the emulator."""
+
+    PRINTER = {
+        'id': 'zpl_emulator',
+        'name': 'ZPL Printer Emulator',
+        'type': 'emulator',
+        'connection': 'Emulated',
+        'status': 'ready',
+        'description': 'Times labels like a real printer; see /status',
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_cors_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_cors_headers()
+        self.end_headers()
+
+    def do_GET(self):
+        emulator = self.server.emulator
+        path = self.path.split('?')[0]
+        if path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        elif path == '/printers':
+            self.send_json(200, {'success': True, 'printers': [self.PRINTER]})
+        elif path == '/status':
+            self.send_json(200, emulator.report(jobs='jobs=0' not in self.path))
+        else:
+            self.send_json(404, {'success': False, 'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/print':
+            self.send_json(404, {'success': False, 'error': 'Not found'})
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        zpl = body
+        if 'json' in (self.headers.get('Content-Type') or ''):
+            # Bridge style: {"printer_id": ..., "zpl": ...} or {"data": {"zpl": ...}}
+            try:
+                payload = json.loads(body)
+                zpl = payload.get('zpl') or (payload.get('data') or {}).get('zpl') or ''
+            except (ValueError, AttributeError):
+                self.send_json(400, {'success': False, 'error': 'Invalid JSON'})
+                return
+        job = self.server.emulator.submit_document('http', zpl, self.client_address[0])
+        if job is None:
+            self.send_json(400, {'success': False, 'error': 'No ^XA...^XZ label in the request'})
+            return
+        self.send_json(200, {
+            'success': True,
+            'message': f'{job.labels} label(s) queued on the emulator',
+            'job_id': str(job.id),
+        })
+
+
+class _HttpServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class EmulatorServer:
+    """
+    A PrinterEmulator with its raw TCP and HTTP listeners. Either port may
+    be None to leave that listener off, or 0 for any free port.
+    """
+
+    def __init__(self, emulator, host='127.0.0.1', tcp_port=9100, http_port=None):
+        self.emulator = emulator
+        self.servers = {}
+        if tcp_port is not None:
+            self.servers['tcp'] = _RawServer((host, tcp_port), _RawHandler)
+        if http_port is not None:
+            self.servers['http'] = _HttpServer((host, http_port), _HttpHandler)
+        for server in self.servers.values():
+            server.emulator = emulator
+        self.threads = [
+            threading.Thread(target=server.serve_forever, daemon=True) for server in self.servers.values()
+        ]
+
+    def address(self, listener):
+        return self.servers[listener].server_address[:2]
+
+    def start(self):
+        self.emulator.start()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        # Let blocked TCP readers go before waiting on the listeners
+        self.emulator.stop()
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
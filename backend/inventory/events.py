@@ -0,0 +1,150 @@
+"""
+Live serial counter events for Server-Sent Events clients.
+
+Generation and admin counter changes in this process are published directly.
+Changes made by other server processes are picked up by one shared poller
+thread per process, which only runs while at least one client is connected.
+Each ASGI client is an awaiting coroutine with a small queue, so idle
+connections hold no thread.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Config
+
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+def serial_state(current_serial, serial_digits):
+    """Payload describing the next serial to be generated."""
+    return {
+        'current_serial': current_serial,
+        'serial_digits': serial_digits,
+        'next_serial': str(current_serial).zfill(serial_digits),
+    }
+
+
+def format_event(event_type, data):
+    """Encode one SSE message."""
+    return f'event: {event_type}\ndata: {json.dumps(data)}\n\n'
+
+
+class SerialEventBroker:
+    """Fans serial counter events out to subscribed event-loop queues."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._last_state = None
+        self._poller = None
+
+    def subscribe(self, state=None):
+        """
+        Register a queue on the running event loop and return it. state is
+        the counter the client was just sent, so the poller doesn't repeat it.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self._last_state is None and state is not None:
+                self._last_state = (state['current_serial'], state['serial_digits'])
+            self._subscribers.add((loop, queue))
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {entry for entry in self._subscribers if entry[1] is not queue}
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event_type, data):
+        """Send an event to every subscriber. Safe to call from any thread."""
+        with self._lock:
+            self._last_state = (data['current_serial'], data['serial_digits'])
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, (event_type, data))
+            except RuntimeError:
+                # The client's event loop has closed
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def _deliver(queue, event):
+        if queue.full():
+            # A slow client only needs the latest counter value
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def _poll(self):
+        """Publish counter changes made by other processes while anyone listens."""
+        interval = getattr(settings, 'SERIAL_EVENTS_POLL_INTERVAL', 2)
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        # Cleared under the lock so subscribe() starts a new poller
+                        self._poller = None
+                        return
+                row = Config.objects.filter(pk=1).values_list(
+                    'current_serial', 'serial_digits'
+                ).first()
+                with self._lock:
+                    changed = row is not None and row != self._last_state
+                if changed:
+                    self.publish('counter', serial_state(*row))
+                time.sleep(interval)
+        finally:
+            connections.close_all()
+
+
+broker = SerialEventBroker()
+
+
+def publish_generated(part_number, quantity, start, end, next_serial, serial_digits):
+    """Publish a generation event (called once the batch has committed)."""
+    data = serial_state(next_serial, serial_digits)
+    data.update({
+        'part_number': part_number,
+        'quantity': quantity,
+        'start': start,
+        'end': end,
+    })
+    broker.publish('generated', data)
+
+
+def publish_counter(config):
+    """Publish the counter after an admin change to the config."""
+    broker.publish('counter', serial_state(config.current_serial, config.serial_digits))
+
+
+async def stream_events(initial_state):
+    """
+    Async SSE stream: the current state first, then live events, with a
+    comment line every HEARTBEAT_SECONDS to keep proxies from timing out.
+    """
+    queue = broker.subscribe(initial_state)
+    try:
+        yield format_event('counter', initial_state)
+        while True:
+            try:
+                event_type, data = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event_type, data)
+    finally:
+        broker.unsubscribe(queue)
@@ -0,0 +1,193 @@
+"""
+Streaming export of serial number history.
+Rows are read with a server-side iterator and encoded chunk by chunk so that
+memory use stays flat no matter how many serials are exported.
+"""
+
+import csv
+import itertools
+import json
+import zlib
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ArchivedSerialNumber, SerialNumber
+
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_COLUMNS = ['serial_number', 'part_number', 'upc', 'created_at']
+
+
+class _Echo:
+    """File-like object that hands back whatever csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+class SerialExportService:
+    """
+    Builds filtered SerialNumber querysets and encodes them as CSV or NDJSON.
+    """
+
+    DEFAULT_CHUNK_SIZE = 2000
+
+    @staticmethod
+    def parse_date_bound(value, end_of_day=False):
+        """
+        Parse a date or datetime filter value.
+
+        A bare date (2026-02-09) covers the whole day: the start bound uses
+        midnight and the end bound uses the last instant of that day.
+        """
+        if not value:
+            return None
+
+        # Check for a bare date first: parse_datetime also accepts one, as midnight
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is not None:
+            parsed = datetime.combine(day, time.max if end_of_day else time.min)
+        else:
+            try:
+                parsed = parse_datetime(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValueError(f"Invalid date: {value}")
+
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    @staticmethod
+    def build_queryset(start_date=None, end_date=None, part_number=None,
+                       serial_from=None, serial_to=None, using=None, archived=False):
+        """
+        Return an ordered values_list queryset for the requested filters.
+
+        Args:
+            start_date (datetime): Only serials created at or after this time
+            end_date (datetime): Only serials created at or before this time
+            part_number (str): Only serials for this part number
+            serial_from (str): First serial number to include
+            serial_to (str): Last serial number to include
+            using (str): Database alias to read from (default: routed)
+            archived (bool): Query the archive table instead of the hot table
+
+        Serial bounds are compared as strings, which matches numeric order as
+        long as the serials share the same zero-padded digit count.
+        """
+        model = ArchivedSerialNumber if archived else SerialNumber
+        queryset = model.objects.all()
+        if using:
+            queryset = queryset.using(using)
+
+        if start_date:
+            queryset = queryset.filter(created_at__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(created_at__lte=end_date)
+        if part_number:
+            queryset = queryset.filter(part_number_id=part_number)
+        if serial_from:
+            queryset = queryset.filter(serial_number__gte=serial_from)
+        if serial_to:
+            queryset = queryset.filter(serial_number__lte=serial_to)
+
+        # Order by primary key so the scan follows the PK index instead of
+        # sorting the whole table on the model's default -created_at ordering.
+        return queryset.order_by('serial_number').values_list(
+            'serial_number', 'part_number_id', 'upc', 'created_at'
+        )
+
+    @staticmethod
+    def iter_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield row tuples from the database without caching the queryset."""
+        return queryset.iterator(chunk_size=chunk_size)
+
+    @staticmethod
+    def iter_csv(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield CSV text, one block of up to chunk_size rows at a time."""
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_COLUMNS)
+
+        buffer = []
+        for serial_number, part_number, upc, created_at in rows:
+            buffer.append(writer.writerow([
+                serial_number,
+                part_number,
+                upc or '',
+                created_at.isoformat(),
+            ]))
+            if len(buffer) >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+
+        if buffer:
+            yield ''.join(buffer)
+
+    @staticmethod
+    def iter_ndjson(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield newline-delimited JSON, one block of up to chunk_size rows at a time."""
+        buffer = []
+        for serial_number, part_number, upc, created_at in rows:
+            buffer.append(json.dumps({
+                'serial_number': serial_number,
+                'part_number': part_number,
+                'upc': upc,
+                'created_at': created_at.isoformat(),
+            }) + '\n')
+            if len(buffer) >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+
+        if buffer:
+            yield ''.join(buffer)
+
+    @staticmethod
+    def iter_gzip(chunks, level=6):
+        """Compress a stream of text chunks into a single gzip stream."""
+        # wbits=31 selects the gzip container so the output is a valid .gz file
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    def stream(querysets, export_format='csv', compress=False,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Stream an export of one or more querysets, one after the other.
+
+        Args:
+            querysets: Result of build_queryset(), or a list of them
+            export_format (str): 'csv' or 'ndjson'
+            compress (bool): Gzip the output stream
+            chunk_size (int): Rows fetched per database round trip
+
+        Returns:
+            iterator: Text chunks, or bytes chunks when compress is True
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Invalid format: {export_format}. Must be one of {', '.join(EXPORT_FORMATS)}")
+
+        if not isinstance(querysets, (list, tuple)):
+            querysets = [querysets]
+        rows = itertools.chain.from_iterable(
+            SerialExportService.iter_rows(queryset, chunk_size=chunk_size)
+            for queryset in querysets
+        )
+        if export_format == 'ndjson':
+            chunks = SerialExportService.iter_ndjson(rows, chunk_size=chunk_size)
+        else:
+            chunks = SerialExportService.iter_csv(rows, chunk_size=chunk_size)
+
+        if compress:
+            return SerialExportService.iter_gzip(chunks)
+        return chunks
@@ -0,0 +1,122 @@
+"""
+Incremental change feed for downstream systems.
+
+Every new SerialNumber and every UPC change on a Product is stamped with a
+value from a single monotonic counter (Config.last_change_seq). Consumers keep
+the last sequence they processed and ask for everything after it; the
+change_seq columns are uniquely indexed so each poll is an index seek.
+
+archive_serials moves serials to ArchivedSerialNumber with their change_seq,
+so a consumer that falls behind the archive cutoff still sees every serial.
+"""
+
+from .models import ArchivedSerialNumber, Product, SerialNumber, Config
+
+
+class ChangeFeedService:
+    """
+    Allocates change sequence numbers and reads pages of the feed.
+    """
+
+    DEFAULT_PAGE_SIZE = 500
+    MAX_PAGE_SIZE = 1000
+
+    @staticmethod
+    def reserve(config, count):
+        """
+        Reserve a block of consecutive sequence numbers.
+
+        The caller must hold the Config row lock inside transaction.atomic and
+        is responsible for saving the config afterwards.
+
+        Args:
+            config (Config): Locked configuration record
+            count (int): How many sequence numbers to reserve
+
+        Returns:
+            int: First sequence number of the reserved block
+        """
+        first_seq = config.last_change_seq + 1
+        config.last_change_seq += count
+        return first_seq
+
+    @staticmethod
+    def reserve_locked(count):
+        """
+        Lock the config record, reserve a block and persist the counter.
+        Must be called inside transaction.atomic.
+        """
+        config, _ = Config.objects.select_for_update().get_or_create(pk=1)
+        first_seq = ChangeFeedService.reserve(config, count)
+        Config.objects.filter(pk=config.pk).update(last_change_seq=config.last_change_seq)
+        return first_seq
+
+    @staticmethod
+    def clamp_page_size(limit):
+        """Coerce a requested page size into 1..MAX_PAGE_SIZE."""
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            return ChangeFeedService.DEFAULT_PAGE_SIZE
+        return max(1, min(limit, ChangeFeedService.MAX_PAGE_SIZE))
+
+    @staticmethod
+    def fetch(cursor, limit=DEFAULT_PAGE_SIZE):
+        """
+        Return the changes recorded after a cursor.
+
+        Args:
+            cursor (int): Last sequence number the consumer has processed
+            limit (int): Maximum number of changes to return
+
+        Returns:
+            dict: {
+                'changes': [change dicts ordered by seq],
+                'next_cursor': cursor to pass on the next poll,
+                'has_more': True when another page is immediately available
+            }
+        """
+        # Fetch one extra row from each source to detect a following page
+        serial_rows = [
+            row
+            for model in (SerialNumber, ArchivedSerialNumber)
+            for row in model.objects.filter(change_seq__gt=cursor)
+            .order_by('change_seq')
+            .values_list('change_seq', 'serial_number', 'part_number_id', 'upc', 'created_at')[:limit + 1]
+        ]
+        product_rows = list(
+            Product.objects.filter(change_seq__gt=cursor)
+            .order_by('change_seq')
+            .values_list('change_seq', 'part_number', 'upc')[:limit + 1]
+        )
+
+        changes = [
+            {
+                'seq': seq,
+                'type': 'serial',
+                'serial_number': serial_number,
+                'part_number': part_number,
+                'upc': upc,
+                'created_at': created_at.isoformat(),
+            }
+            for seq, serial_number, part_number, upc, created_at in serial_rows
+        ]
+        changes.extend(
+            {
+                'seq': seq,
+                'type': 'upc',
+                'part_number': part_number,
+                'upc': upc,
+            }
+            for seq, part_number, upc in product_rows
+        )
+        changes.sort(key=lambda change: change['seq'])
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        return {
+            'changes': changes,
+            'next_cursor': changes[-1]['seq'] if changes else cursor,
+            'has_more': has_more,
+        }
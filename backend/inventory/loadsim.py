@@ -0,0 +1,432 @@
+"""
+Concurrent workstation load simulator for `manage.py loadsim`.
+
+Simulated stations drive a running LabelGen server over HTTP the way the
+browser pages do: each holds one keep-alive connection and a CSRF cookie,
+picks the next operation from a weighted scan mix, and waits an
+exponentially distributed think time between operations. A "generate"
+operation posts to process_bulk_scans and then requests label ZPL for
+every serial it got back, like /generate/ does before printing.
+
+Traces recorded by trace_middleware (settings.LOAD_TRACE) can be replayed
+with each recorded station's requests in their original order and spacing,
+optionally sped up.
+
+The report covers throughput, p50/p99 latency per operation, database lock
+errors, and a duplicate/gap check over every serial the run was handed.
+"""
+
+import hashlib
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+
+from .benchmarks import percentile
+
+
+DEFAULT_MIX = {'generate': 1, 'lookup': 4, 'label': 2}
+LOCK_ERROR_MARKERS = ('database is locked', 'database table is locked')
+
+# Path -> operation name, for reporting replayed requests
+OPERATIONS = {
+    '/api/process-bulk-scans/': 'generate',
+    '/api/lookup-serial/': 'lookup',
+    '/api/generate-label-zpl/': 'label',
+}
+
+
+def parse_mix(text):
+    """Parse 'generate=1,lookup=4,label=2' into a weight dict."""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation '{name}' (expected {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError('The scan mix needs at least one operation with a positive weight')
+    return mix
+
+
+class StationClient:
+    """One keep-alive HTTP connection with the CSRF cookie a browser would hold."""
+
+    def __init__(self, base_url, timeout=60):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+        self.csrf_token = None
+
+    def _connect(self):
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def start(self):
+        """Fetch the generate page to receive a CSRF cookie."""
+        self.request('GET', '/generate/')
+
+    def request(self, method, path, body=None):
+        """
+        Send a request, reconnecting once if the server closed the
+        keep-alive connection.
+
+        Returns:
+            tuple: (status, body bytes, elapsed seconds)
+        """
+        headers = {}
+        if self.csrf_token:
+            headers['Cookie'] = f'csrftoken={self.csrf_token}'
+            headers['X-CSRFToken'] = self.csrf_token
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):
+            if self.connection is None:
+                self._connect()
+            start = time.perf_counter()
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self.close()
+                if attempt:
+                    raise
+                continue
+            elapsed = time.perf_counter() - start
+            break
+
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie(header)
+            if 'csrftoken' in cookie:
+                self.csrf_token = cookie['csrftoken'].value
+        if response.will_close:
+            self.close()
+        return response.status, data, elapsed
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class LoadResults:
+    """Latencies, errors and allocated serials collected from every station."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_errors = 0
+        self.serials = []
+        self.recent_serials = []
+
+    def record(self, operation, elapsed, ok=True, lock_error=False):
+        with self._lock:
+            self.latencies[operation].append(elapsed)
+            if not ok:
+                self.errors[operation] += 1
+            if lock_error:
+                self.lock_errors += 1
+
+    def add_serials(self, serials):
+        with self._lock:
+            self.serials.extend(serials)
+            self.recent_serials = (self.recent_serials + serials)[-1000:]
+
+    def pick_serial(self, rng):
+        with self._lock:
+            return rng.choice(self.recent_serials) if self.recent_serials else None
+
+
+def is_lock_error(text):
+    return any(marker in text for marker in LOCK_ERROR_MARKERS)
+
+
+def record_response(results, operation, status, data, elapsed):
+    """
+    Record one response and return its decoded JSON (or None). Serials
+    from a generate response are added to the duplicate/gap check.
+    """
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        payload = None
+    text = data.decode('utf-8', 'replace')
+    lock_error = is_lock_error(text)
+    # A missed lookup is a valid answer, not an error
+    ok = status < 400 or (operation == 'lookup' and status == 404)
+
+    if operation == 'generate' and isinstance(payload, dict) and payload.get('success'):
+        serials = []
+        for result in payload['data']['results']:
+            if result.get('success'):
+                serials.extend(
+                    {'serial_number': serial, 'upc': result.get('upc')} for serial in result['serials']
+                )
+            else:
+                ok = False
+        results.add_serials(serials)
+    results.record(operation, elapsed, ok=ok, lock_error=lock_error)
+    return payload
+
+
+class Station(threading.Thread):
+    """A simulated workstation running the scan mix until the deadline."""
+
+    def __init__(self, number, base_url, results, deadline, options, seed):
+        super().__init__(daemon=True)
+        self.number = number
+        self.client = StationClient(base_url)
+        self.results = results
+        self.deadline = deadline
+        self.options = options
+        self.rng = random.Random(seed)
+        self.operations = list(options['mix'])
+        self.weights = [options['mix'][name] for name in self.operations]
+        self.error = None
+
+    def run(self):
+        try:
+            self.client.start()
+            while time.monotonic() < self.deadline:
+                operation = self.rng.choices(self.operations, self.weights)[0]
+                getattr(self, f'do_{operation}')()
+                if self.options['think_time'] > 0:
+                    time.sleep(self.rng.expovariate(1 / self.options['think_time']))
+        except Exception as e:
+            self.error = e
+        finally:
+            self.client.close()
+
+    def part_number(self):
+        return f"990-{self.rng.randrange(self.options['parts']):04d}"
+
+    def do_generate(self):
+        low, high = self.options['quantity']
+        pairs = [
+            {'part_number': self.part_number(), 'quantity': str(self.rng.randint(low, high))}
+            for _ in range(self.rng.randint(1, self.options['max_pairs']))
+        ]
+        body = json.dumps({'pairs': pairs, 'station': f'loadsim-{self.number}'})
+        status, data, elapsed = self.client.request('POST', '/api/process-bulk-scans/', body)
+        payload = record_response(self.results, 'generate', status, data, elapsed)
+
+        if self.options['labels'] and isinstance(payload, dict) and payload.get('success'):
+            for result in payload['data']['results']:
+                for serial in result.get('serials', []):
+                    self.request_label(serial, result['part_number'], result.get('upc'))
+
+    def do_lookup(self):
+        serial = self.results.pick_serial(self.rng)
+        if serial is None or self.rng.random() < self.options['miss_rate']:
+            serial = {'serial_number': f'X{self.rng.randrange(10**6):06d}'}
+        path = '/api/lookup-serial/?' + urlencode({'serial': serial['serial_number']})
+        status, data, elapsed = self.client.request('GET', path)
+        record_response(self.results, 'lookup', status, data, elapsed)
+
+    def do_label(self):
+        serial = self.results.pick_serial(self.rng)
+        if serial is None:
+            return self.do_generate()
+        self.request_label(serial['serial_number'], self.part_number(), serial.get('upc'))
+
+    def request_label(self, serial_number, part_number, upc):
+        body = json.dumps({
+            'label_type': self.rng.choice(('serial', 'box')),
+            'serial_number': serial_number,
+            'part_number': part_number,
+            'upc': upc or '',
+        })
+        status, data, elapsed = self.client.request('POST', '/api/generate-label-zpl/', body)
+        record_response(self.results, 'label', status, data, elapsed)
+
+
+def run_stations(base_url, stations, duration, options, seed=0):
+    """
+    Run simulated stations for duration seconds.
+
+    Returns:
+        tuple: (LoadResults, elapsed seconds, exceptions that stopped a station)
+    """
+    results = LoadResults()
+    deadline = time.monotonic() + duration
+    threads = [
+        Station(number, base_url, results, deadline, options, seed * 1000 + number)
+        for number in range(stations)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    errors = [thread.error for thread in threads if thread.error is not None]
+    return results, time.perf_counter() - started, errors
+
+
+def load_trace(path):
+    """Read a recorded trace into {station: [entries in time order]}."""
+    sessions = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                sessions[entry['station']].append(entry)
+    for entries in sessions.values():
+        entries.sort(key=lambda entry: entry['t'])
+    return dict(sessions)
+
+
+def replay_trace(base_url, sessions, speed=1.0):
+    """
+    Replay recorded sessions, one thread per recorded station. Each request
+    is sent at its recorded offset from the start of the trace divided by
+    speed, or as soon as the station's previous request has finished.
+    """
+    results = LoadResults()
+    if not sessions:
+        return results, 0.0, []
+    trace_start = min(entries[0]['t'] for entries in sessions.values())
+    errors = []
+
+    def replay(entries):
+        client = StationClient(base_url)
+        try:
+            client.start()
+            for entry in entries:
+                delay = (entry['t'] - trace_start) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+                path = entry['path'] + (f"?{entry['query']}" if entry.get('query') else '')
+                status, data, elapsed = client.request(entry['method'], path, entry.get('body'))
+                record_response(results, OPERATIONS.get(entry['path'], entry['path']), status, data, elapsed)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=replay, args=(entries,), daemon=True) for entries in sessions.values()]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started, errors
+
+
+def check_serials(serials):
+    """
+    Check the serials handed out during a run for duplicates and gaps.
+    Gaps can also come from other clients generating during the run.
+    """
+    counts = defaultdict(int)
+    for serial in serials:
+        counts[serial['serial_number']] += 1
+    duplicates = sorted(serial for serial, count in counts.items() if count > 1)
+
+    numbers = sorted(int(serial) for serial in counts if serial.isdigit())
+    gaps = []
+    for previous, current in zip(numbers, numbers[1:]):
+        if current - previous > 1:
+            gaps.append((previous + 1, current - 1))
+    return {
+        'allocated': len(serials),
+        'unique': len(counts),
+        'duplicates': duplicates,
+        'gaps': gaps,
+        'first': numbers[0] if numbers else None,
+        'last': numbers[-1] if numbers else None,
+    }
+
+
+def build_report(results, elapsed):
+    """Summary dict: per-operation throughput and latency, errors and the serial check."""
+    operations = {}
+    total = 0
+    for operation, samples in sorted(results.latencies.items()):
+        values = sorted(sample * 1000 for sample in samples)
+        total += len(values)
+        operations[operation] = {
+            'requests': len(values),
+            'errors': results.errors.get(operation, 0),
+            'per_second': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(values, 0.50), 2),
+            'p99_ms': round(percentile(values, 0.99), 2),
+            'max_ms': round(values[-1], 2),
+        }
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': total,
+        'per_second': round(total / elapsed, 2) if elapsed else 0.0,
+        'lock_errors': results.lock_errors,
+        'operations': operations,
+        'serials': check_serials(results.serials),
+    }
+
+
+def get_trace_settings():
+    defaults = {
+        'ENABLED': False,
+        'FILE': settings.BASE_DIR / 'load_trace.ndjson',
+    }
+    defaults.update(getattr(settings, 'LOAD_TRACE', {}))
+    return defaults
+
+
+class TraceRecorder:
+    """
+    Appends one JSON line per generate, lookup or label request, for replay.
+    Stations are told apart by a hash of the browser's CSRF cookie, falling
+    back to the client address.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, request, response, started):
+        if request.path not in OPERATIONS:
+            return
+        cookie = request.COOKIES.get('csrftoken')
+        if cookie:
+            station = hashlib.sha256(cookie.encode('utf-8')).hexdigest()[:12]
+        else:
+            station = request.META.get('REMOTE_ADDR', '')
+        entry = {
+            't': started,
+            'station': station,
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'status': response.status_code,
+        }
+        if request.method == 'POST':
+            entry['body'] = request.body.decode('utf-8', 'replace')
+        line = json.dumps(entry) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+_recorder = None
+
+
+def get_trace_recorder():
+    """The trace recorder, or None when settings.LOAD_TRACE is disabled."""
+    global _recorder
+    options = get_trace_settings()
+    if not options['ENABLED']:
+        return None
+    if _recorder is None:
+        _recorder = TraceRecorder(options['FILE'])
+    return _recorder
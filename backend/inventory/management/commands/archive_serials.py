@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.archive import SerialArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Move serial numbers older than a given age from the hot table to the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            default=getattr(settings, 'SERIAL_ARCHIVE_AFTER_DAYS', 90),
+                            help='Archive serials created more than this many days ago '
+                                 '(default: SERIAL_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=SerialArchiveService.DEFAULT_BATCH_SIZE,
+                            help='Rows moved per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 0:
+            raise CommandError('--older-than-days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        self.stdout.write(f"Archiving serials created before {cutoff:%Y-%m-%d %H:%M} UTC")
+
+        if options['dry_run']:
+            count = SerialArchiveService.count_archivable(cutoff)
+            self.stdout.write(f"{count} serials would be archived")
+            return
+
+        moved = SerialArchiveService.archive(
+            cutoff,
+            batch_size=options['batch_size'],
+            progress_callback=lambda total: self.stdout.write(f"  {total} moved..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"✓ Archived {moved} serials"))
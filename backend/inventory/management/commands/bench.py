@@ -0,0 +1,118 @@
+import json
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from inventory.benchmarks import (
+    DATASETS, BenchmarkSuite, bench_database_names, build_dataset, compare_to_baseline,
+    dataset_is_built, environment_info, run_suite,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time key operations (generation, bulk scans, lookups, label ZPL, CSV import, '
+        'admin listing) against a synthetic dataset and compare with a baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=sorted(DATASETS), default='small',
+                            help='Dataset size: small (2k products/50k serials), medium (200k/1M), large (200k/10M)')
+        parser.add_argument('--products', type=int, help='Override the dataset product count')
+        parser.add_argument('--serials', type=int, help='Override the dataset serial count')
+        parser.add_argument('--data-dir', default=str(settings.BASE_DIR / 'bench_data'),
+                            help='Where the benchmark databases are kept between runs')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Rebuild the dataset even if it already exists')
+        parser.add_argument('--scenario', action='append', default=[],
+                            help='Only run scenarios whose name starts with this (repeatable)')
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiply every scenario\'s run count (e.g. 0.2 for a quick check)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for scenario inputs')
+        parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare against a JSON results file from an earlier run')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Flag a regression when p50 is this much slower than the baseline (default 0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        products = options['products'] or DATASETS[dataset]['products']
+        serials = options['serials'] or DATASETS[dataset]['serials']
+        if options['products'] or options['serials']:
+            dataset = f'custom-{products}-{serials}'
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        data_dir = Path(options['data_dir']).resolve()
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for alias, name in bench_database_names(data_dir, dataset).items():
+            if alias in connections.settings:
+                connections[alias].settings_dict.setdefault('TEST', {})['NAME'] = name
+
+        # Misses are expected; don't print a 404 warning for each one
+        request_logger = logging.getLogger('django.request')
+        request_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=True)
+        try:
+            if options['rebuild'] or not dataset_is_built(products, serials):
+                self.stdout.write(f'Building dataset {dataset} in {data_dir}')
+                build_dataset(products, serials, log=self.stdout.write)
+
+            self.stdout.write(f'\nRunning benchmarks on {dataset} ({products} products, {serials} serials)')
+            suite = BenchmarkSuite(seed=options['seed'])
+            results = run_suite(suite, options['scenario'], options['scale'], log=self.stdout.write)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=True)
+            teardown_test_environment()
+            request_logger.setLevel(request_level)
+
+        report = {
+            'dataset': dataset,
+            'products': products,
+            'serials': serials,
+            'recorded_at': timezone.now().isoformat(),
+            'environment': environment_info(),
+            'scenarios': results,
+        }
+
+        regressions = []
+        if baseline is not None:
+            comparison = compare_to_baseline(results, baseline, options['tolerance'])
+            report['baseline'] = {'file': options['baseline'], 'comparison': comparison}
+            if baseline.get('dataset') != dataset:
+                self.stdout.write(self.style.WARNING(
+                    f"\nBaseline was recorded on dataset {baseline.get('dataset')}, not {dataset}"
+                ))
+            self.stdout.write(f"\n{'scenario':<30}{'baseline':>12}{'current':>12}{'change':>10}")
+            for row in comparison:
+                line = (f"{row['scenario']:<30}{row['baseline_ms']:>10.2f}ms{row['current_ms']:>10.2f}ms"
+                        f"{row['change'] * 100:>+9.1f}%")
+                if row['regressed']:
+                    regressions.append(row['scenario'])
+                    self.stdout.write(self.style.ERROR(line + '  REGRESSION'))
+                else:
+                    self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"\nResults written to {options['output']}")
+
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} scenario(s) slower than baseline by more than "
+                f"{options['tolerance'] * 100:.0f}%: {', '.join(regressions)}"
+            )
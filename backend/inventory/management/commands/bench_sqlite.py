@@ -0,0 +1,135 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.db import get_sqlite_pragmas, pragma_statements
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare SQLite read/write concurrency with the default connection '
+        'settings and with the tuned SQLITE_PRAGMAS profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Concurrent threads generating serial batches')
+        parser.add_argument('--readers', type=int, default=8,
+                            help='Concurrent threads looking up serials')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='Seconds to run each profile')
+        parser.add_argument('--rows', type=int, default=50000,
+                            help='Serials preloaded before the run')
+        parser.add_argument('--batch', type=int, default=25,
+                            help='Serials inserted per write transaction')
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('default', {}, 'DEFERRED', 5.0),
+            ('tuned', get_sqlite_pragmas(), 'IMMEDIATE', 20.0),
+        ]
+
+        results = []
+        for name, pragmas, begin_mode, timeout in profiles:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'bench.sqlite3')
+                self._create_database(path, pragmas, options['rows'])
+                stats = self._run(path, pragmas, begin_mode, timeout, options)
+            stats['profile'] = name
+            results.append(stats)
+
+        self.stdout.write(
+            f"\n{options['writers']} writers x {options['batch']} serials, "
+            f"{options['readers']} readers, {options['duration']:.0f}s per profile\n"
+        )
+        self.stdout.write(f"{'profile':<10}{'writes/s':>12}{'serials/s':>12}{'reads/s':>12}{'lock errors':>14}")
+        for stats in results:
+            self.stdout.write(
+                f"{stats['profile']:<10}{stats['writes_per_sec']:>12.1f}{stats['serials_per_sec']:>12.1f}"
+                f"{stats['reads_per_sec']:>12.1f}{stats['lock_errors']:>14}"
+            )
+
+    def _connect(self, path, pragmas, timeout):
+        connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for statement in pragma_statements(pragmas):
+            connection.execute(statement)
+        return connection
+
+    def _create_database(self, path, pragmas, rows):
+        connection = self._connect(path, pragmas, 5.0)
+        connection.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+        connection.execute(
+            'CREATE TABLE serial (serial_number TEXT PRIMARY KEY, part_number TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO serial VALUES (?, ?, ?)',
+            ((str(i).zfill(9), f'{i % 500:03d}-0000', time.time()) for i in range(rows))
+        )
+        connection.execute('INSERT INTO counter VALUES (1, ?)', (rows,))
+        connection.execute('COMMIT')
+        connection.close()
+
+    def _run(self, path, pragmas, begin_mode, timeout, options):
+        stop_at = time.perf_counter() + options['duration']
+        lock = threading.Lock()
+        stats = {'writes': 0, 'reads': 0, 'lock_errors': 0}
+        batch = options['batch']
+        preloaded = options['rows']
+
+        def record(key, amount=1):
+            with lock:
+                stats[key] += amount
+
+        def writer():
+            connection = self._connect(path, pragmas, timeout)
+            while time.perf_counter() < stop_at:
+                try:
+                    connection.execute(f'BEGIN {begin_mode}')
+                    start = connection.execute('SELECT value FROM counter WHERE id = 1').fetchone()[0]
+                    connection.executemany(
+                        'INSERT INTO serial VALUES (?, ?, ?)',
+                        ((str(start + i).zfill(9), '232-9983', time.time()) for i in range(batch))
+                    )
+                    connection.execute('UPDATE counter SET value = ? WHERE id = 1', (start + batch,))
+                    connection.execute('COMMIT')
+                    record('writes')
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    record('lock_errors')
+            connection.close()
+
+        def reader():
+            connection = self._connect(path, pragmas, timeout)
+            while time.perf_counter() < stop_at:
+                serial = str(random.randrange(preloaded)).zfill(9)
+                try:
+                    connection.execute(
+                        'SELECT serial_number, part_number FROM serial WHERE serial_number = ?', (serial,)
+                    ).fetchone()
+                    record('reads')
+                except sqlite3.OperationalError:
+                    record('lock_errors')
+            connection.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(options['writers'])]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'writes_per_sec': stats['writes'] / elapsed,
+            'serials_per_sec': stats['writes'] * batch / elapsed,
+            'reads_per_sec': stats['reads'] / elapsed,
+            'lock_errors': stats['lock_errors'],
+        }
@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.exports import EXPORT_FORMATS, SerialExportService
+
+
+class Command(BaseCommand):
+    help = 'Stream serial number history to a CSV or NDJSON file (optionally gzipped).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv',
+                            help='Output format (default: csv)')
+        parser.add_argument('--output', '-o',
+                            help='Output file path (default: stdout)')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Gzip-compress the output')
+        parser.add_argument('--start', help='Only serials created on/after this date or datetime')
+        parser.add_argument('--end', help='Only serials created on/before this date or datetime')
+        parser.add_argument('--part', help='Only serials for this part number')
+        parser.add_argument('--serial-from', help='First serial number to include')
+        parser.add_argument('--serial-to', help='Last serial number to include')
+        parser.add_argument('--include-archived', action='store_true',
+                            help='Also export serials moved to the archive table')
+        parser.add_argument('--chunk-size', type=int, default=SerialExportService.DEFAULT_CHUNK_SIZE,
+                            help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        try:
+            filters = {
+                'start_date': SerialExportService.parse_date_bound(options['start']),
+                'end_date': SerialExportService.parse_date_bound(options['end'], end_of_day=True),
+                'part_number': options['part'],
+                'serial_from': options['serial_from'],
+                'serial_to': options['serial_to'],
+            }
+            querysets = [SerialExportService.build_queryset(**filters)]
+            if options['include_archived']:
+                querysets.insert(0, SerialExportService.build_queryset(archived=True, **filters))
+            stream = SerialExportService.stream(
+                querysets,
+                export_format=options['format'],
+                compress=options['gzip'],
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            mode = 'wb' if options['gzip'] else 'w'
+            encoding = None if options['gzip'] else 'utf-8'
+            with open(options['output'], mode, encoding=encoding, newline='' if encoding else None) as f:
+                for chunk in stream:
+                    f.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Export written to {options['output']}"))
+        elif options['gzip']:
+            for chunk in stream:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            for chunk in stream:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,116 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.loadsim import DEFAULT_MIX, build_report, load_trace, parse_mix, replay_trace, run_stations
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate several workstations generating, looking up and printing against a running '
+        'server, or replay a recorded trace, and report throughput, latency and serial integrity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8001',
+                            help='Base URL of the running LabelGen server')
+        parser.add_argument('--stations', type=int, default=12, help='Simulated workstations')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to run')
+        parser.add_argument('--mix', default=','.join(f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+                            help='Operation weights, e.g. generate=1,lookup=4,label=2')
+        parser.add_argument('--think-time', type=float, default=0.5,
+                            help='Mean seconds a station waits between operations (0 = no wait)')
+        parser.add_argument('--quantity', default='1-10',
+                            help='Serials per scanned pair, as N or MIN-MAX')
+        parser.add_argument('--max-pairs', type=int, default=3, help='Most part/quantity pairs per generate')
+        parser.add_argument('--parts', type=int, default=50, help='Distinct part numbers used (990-0000 upwards)')
+        parser.add_argument('--miss-rate', type=float, default=0.05, help='Share of lookups for unknown serials')
+        parser.add_argument('--no-labels', action='store_true',
+                            help="Don't request label ZPL for each generated serial")
+        parser.add_argument('--replay', metavar='TRACE',
+                            help='Replay a trace recorded with LOAD_TRACE instead of simulating')
+        parser.add_argument('--speed', type=float, default=1.0, help='Replay speed-up factor')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('-o', '--output', help='Write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['replay']:
+            try:
+                sessions = load_trace(options['replay'])
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read trace {options['replay']}: {e}")
+            if options['speed'] <= 0:
+                raise CommandError('--speed must be positive')
+            self.stdout.write(
+                f"Replaying {sum(len(entries) for entries in sessions.values())} requests from "
+                f"{len(sessions)} station(s) at {options['speed']}x against {options['url']}"
+            )
+            results, elapsed, errors = replay_trace(options['url'], sessions, options['speed'])
+        else:
+            try:
+                mix = parse_mix(options['mix'])
+                low, _, high = options['quantity'].partition('-')
+                quantity = (int(low), int(high or low))
+            except ValueError as e:
+                raise CommandError(str(e))
+            if quantity[0] < 1 or quantity[1] < quantity[0]:
+                raise CommandError('--quantity must be N or MIN-MAX with 1 <= MIN <= MAX')
+            self.stdout.write(
+                f"Running {options['stations']} stations for {options['duration']:.0f}s against {options['url']} "
+                f"(mix {options['mix']}, think {options['think_time']}s)"
+            )
+            results, elapsed, errors = run_stations(options['url'], options['stations'], options['duration'], {
+                'mix': mix,
+                'think_time': options['think_time'],
+                'quantity': quantity,
+                'max_pairs': max(1, options['max_pairs']),
+                'parts': max(1, options['parts']),
+                'miss_rate': options['miss_rate'],
+                'labels': not options['no_labels'],
+            }, seed=options['seed'])
+
+        report = build_report(results, elapsed)
+        self.write_report(report)
+        for error in errors:
+            self.stdout.write(self.style.ERROR(f'Station stopped: {error!r}'))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        serials = report['serials']
+        if serials['duplicates']:
+            raise CommandError(f"{len(serials['duplicates'])} serial(s) were handed out more than once")
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"\n{report['requests']} requests in {report['elapsed_seconds']:.1f}s "
+            f"({report['per_second']:.1f}/s), {report['lock_errors']} lock error(s)\n"
+        )
+        self.stdout.write(f"{'operation':<12}{'requests':>10}{'errors':>8}{'per sec':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, stats in report['operations'].items():
+            self.stdout.write(
+                f"{name:<12}{stats['requests']:>10}{stats['errors']:>8}{stats['per_second']:>10.1f}"
+                f"{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+            )
+
+        serials = report['serials']
+        self.stdout.write(
+            f"\nSerials allocated: {serials['allocated']} ({serials['unique']} unique), "
+            f"range {serials['first']}-{serials['last']}"
+        )
+        if serials['duplicates']:
+            self.stdout.write(self.style.ERROR(
+                f"✗ Duplicates: {', '.join(serials['duplicates'][:20])}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ No duplicate serials'))
+        if serials['gaps']:
+            missing = sum(high - low + 1 for low, high in serials['gaps'])
+            self.stdout.write(self.style.WARNING(
+                f"! {missing} serial(s) in {len(serials['gaps'])} gap(s) were not seen "
+                f"(expected if other clients generated during the run)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ No gaps in the allocated range'))
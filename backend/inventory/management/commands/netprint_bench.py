@@ -0,0 +1,153 @@
+import http.client
+import json
+import socket
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.models import Config
+from inventory.netprint import (
+    ENCODING, PRINTER_DEFAULTS, LocalPrinterSink, NetworkPrintError, NetworkPrintTransport, get_network_printers,
+)
+from inventory.services import LabelTemplateService
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure label throughput of the raw TCP 9100 transport (pooled and pipelined) against one '
+        'connection per label and, optionally, the printer bridge. Uses a local TCP stand-in unless '
+        '--printer names a printer from NETWORK_PRINTERS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--labels', type=int, default=500, help='Labels per mode')
+        parser.add_argument('--label-type', choices=LabelTemplateService.LABEL_TYPES, default='serial')
+        parser.add_argument('--printer', help='Send to this NETWORK_PRINTERS entry instead of a local stand-in')
+        parser.add_argument('--labels-per-write', type=int,
+                            help='Labels pipelined per write (default: the printer setting)')
+        parser.add_argument('--bridge-url', help='Also time the bridge path, e.g. http://localhost:5001')
+        parser.add_argument('--bridge-printer', default='debug_file_printer',
+                            help='Bridge printer ID for --bridge-url')
+        parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if options['labels'] < 1:
+            raise CommandError('--labels must be at least 1')
+        labels = self.build_labels(options['labels'], options['label_type'])
+
+        sink = None
+        if options['printer']:
+            printers = get_network_printers()
+            if options['printer'] not in printers:
+                raise CommandError(f"{options['printer']} is not in NETWORK_PRINTERS")
+            printer = dict(printers[options['printer']])
+            target = f"{options['printer']} ({printer['HOST']}:{printer['PORT']})"
+        else:
+            sink = LocalPrinterSink().start()
+            host, port = sink.address
+            printer = dict(PRINTER_DEFAULTS, HOST=host, PORT=port)
+            target = f'local stand-in on {host}:{port}'
+        if options['labels_per_write']:
+            printer['LABELS_PER_WRITE'] = options['labels_per_write']
+
+        self.stdout.write(
+            f"{len(labels)} {options['label_type']} labels ({sum(map(len, labels)) // len(labels)} bytes each) "
+            f'to {target}'
+        )
+        results = {}
+        try:
+            per_write = printer['LABELS_PER_WRITE']
+            results[f'pooled, {per_write} labels per write'] = self.time_transport(printer, labels, sink)
+            results['pooled, 1 label per write'] = self.time_transport(dict(printer, LABELS_PER_WRITE=1), labels, sink)
+            results['new connection per label'] = self.time_connection_per_label(printer, labels, sink)
+            if options['bridge_url']:
+                results['bridge, one request per label'] = self.time_bridge(
+                    options['bridge_url'], options['bridge_printer'], labels
+                )
+        except (NetworkPrintError, OSError) as e:
+            raise CommandError(str(e))
+        finally:
+            if sink is not None:
+                sink.stop()
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"  {name:<34} {result['labels_per_second']:>10.0f} labels/s   "
+                f"{result['ms_per_label']:>8.3f} ms/label"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({'target': target, 'labels': len(labels), 'modes': results}, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    @staticmethod
+    def build_labels(count, label_type):
+        # The default templates, so no database is needed
+        field = 'serial_label_zpl' if label_type == 'serial' else 'box_label_zpl'
+        template = Config._meta.get_field(field).get_default()
+        return [
+            LabelTemplateService.render(template, str(500 + i).zfill(6), '232-9983', '012345678905')
+            for i in range(count)
+        ]
+
+    @staticmethod
+    def summarize(count, started, sink, expected_bytes):
+        # With a local stand-in, the clock stops when it has every byte
+        if sink is not None and not sink.wait_for(expected_bytes, timeout=30):
+            raise CommandError('The local stand-in did not receive every label')
+        elapsed = time.perf_counter() - started
+        return {
+            'seconds': round(elapsed, 4),
+            'labels_per_second': round(count / elapsed, 1),
+            'ms_per_label': round(elapsed * 1000 / count, 4),
+        }
+
+    def expected_bytes(self, sink, labels):
+        already = 0
+        if sink is not None:
+            with sink.lock:
+                already = len(sink.received)
+        return already + sum(len(label.encode(ENCODING)) for label in labels)
+
+    def time_transport(self, printer, labels, sink):
+        transport = NetworkPrintTransport({'bench': printer})
+        try:
+            # Open the pooled connection first, as a running server would
+            # have, and let the stand-in take that label before the clock starts
+            warm_up = self.expected_bytes(sink, labels[:1])
+            transport.print_labels('bench', labels[:1])
+            if sink is not None:
+                sink.wait_for(warm_up)
+            expected = self.expected_bytes(sink, labels)
+            started = time.perf_counter()
+            transport.print_labels('bench', labels)
+            return self.summarize(len(labels), started, sink, expected)
+        finally:
+            transport.close()
+
+    def time_connection_per_label(self, printer, labels, sink):
+        expected = self.expected_bytes(sink, labels)
+        started = time.perf_counter()
+        for label in labels:
+            with socket.create_connection((printer['HOST'], printer['PORT']), timeout=printer['WRITE_TIMEOUT']) as sock:
+                sock.sendall(label.encode(ENCODING))
+        return self.summarize(len(labels), started, sink, expected)
+
+    def time_bridge(self, bridge_url, printer_id, labels):
+        # What the browser does for each label: POST the ZPL to the bridge
+        url = urlsplit(bridge_url)
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        try:
+            started = time.perf_counter()
+            for label in labels:
+                body = json.dumps({'printer_id': printer_id, 'data': {'zpl': label}})
+                connection.request('POST', '/print', body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                payload = response.read()
+                if response.status != 200:
+                    raise CommandError(f'Bridge returned {response.status}: {payload[:200]!r}')
+            return self.summarize(len(labels), started, None, 0)
+        finally:
+            connection.close()
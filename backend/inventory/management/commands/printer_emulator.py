@@ -0,0 +1,112 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.emulator import EMULATOR_DEFAULTS, EmulatorServer, PrinterEmulator
+from inventory.models import Config
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a ZPL printer emulator that accepts labels on raw TCP (like a network printer) and HTTP '
+        '(like the printer bridge), times them like a real printer and reports labels/minute, '
+        'per-job timing and queue depth.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--tcp-port', type=int, default=9100, help='Raw ZPL port; -1 to disable')
+        parser.add_argument('--http-port', type=int, default=5001,
+                            help='Bridge-style HTTP port; -1 to disable')
+        parser.add_argument('--label-type', choices=('serial', 'box'), default='serial',
+                            help='Take the default label length and DPI from this label size')
+        parser.add_argument('--dpi', type=int, help='Printer resolution (default: the label DPI setting)')
+        parser.add_argument('--speed', type=float, default=EMULATOR_DEFAULTS['SPEED'],
+                            help='Print speed in inches/second when a label has no ^PR')
+        parser.add_argument('--label-length', type=float,
+                            help='Label length in inches when a label has no ^LL (default: the label height)')
+        parser.add_argument('--barcode-time', type=float, default=EMULATOR_DEFAULTS['BARCODE_TIME'],
+                            help='Seconds to render one barcode')
+        parser.add_argument('--buffer', type=int, default=EMULATOR_DEFAULTS['BUFFER'],
+                            help='Bytes of labels held before the printer stops reading')
+        parser.add_argument('--time-scale', type=float, default=1.0,
+                            help='Real seconds per printer second; 0.1 runs ten times faster')
+        parser.add_argument('--report-interval', type=float, default=5.0,
+                            help='Seconds between progress lines; 0 for none')
+        parser.add_argument('-o', '--output', help='Write the final report as JSON to this file')
+
+    @staticmethod
+    def field_default(name):
+        # The default label sizes, so no database is needed
+        return Config._meta.get_field(name).get_default()
+
+    def handle(self, *args, **options):
+        if options['time_scale'] <= 0 or options['speed'] <= 0:
+            raise CommandError('--time-scale and --speed must be positive')
+        if options['tcp_port'] < 0 and options['http_port'] < 0:
+            raise CommandError('Enable at least one of --tcp-port and --http-port')
+
+        emulator = PrinterEmulator({
+            'DPI': options['dpi'] or self.field_default('label_dpi'),
+            'SPEED': options['speed'],
+            'LABEL_LENGTH': options['label_length'] or float(self.field_default(f"{options['label_type']}_label_height")),
+            'BARCODE_TIME': options['barcode_time'],
+            'BUFFER': options['buffer'],
+        }, time_scale=options['time_scale'])
+        try:
+            server = EmulatorServer(
+                emulator,
+                host=options['host'],
+                tcp_port=options['tcp_port'] if options['tcp_port'] >= 0 else None,
+                http_port=options['http_port'] if options['http_port'] >= 0 else None,
+            ).start()
+        except OSError as e:
+            raise CommandError(f'Cannot listen: {e}')
+
+        printer = emulator.options
+        self.stdout.write(
+            f"Emulating a {printer['DPI']} dpi printer at {printer['SPEED']} in/s, "
+            f"{printer['LABEL_LENGTH']} in labels"
+        )
+        for listener in server.servers:
+            host, port = server.address(listener)
+            self.stdout.write(f'  {listener} on {host}:{port}')
+        self.stdout.write('Ctrl+C to stop and print the report.')
+
+        try:
+            while True:
+                time.sleep(options['report_interval'] or 3600)
+                if options['report_interval']:
+                    self.write_progress(emulator.report(jobs=False))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+
+        report = emulator.report()
+        self.write_summary(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def write_progress(self, report):
+        depth = report['queue_depth']
+        self.stdout.write(
+            f"printed {report['labels_printed']}/{report['labels_received']}  "
+            f"queue {depth['current']} (max {depth['max']})  "
+            f"{report['labels_per_minute'] or 0:.0f} labels/min  "
+            f"utilization {(report['utilization'] or 0) * 100:.0f}%  stalls {report['stalls']}"
+        )
+
+    def write_summary(self, report):
+        self.stdout.write('')
+        self.write_progress(report)
+        self.stdout.write(f"  mean queue depth {report['queue_depth']['mean']}")
+        for job in report['jobs']:
+            self.stdout.write(
+                f"  job {job['id']:>4} {job['source']:<4} {job['labels']:>6} labels  "
+                f"wait {job['wait_seconds'] or 0:>7.2f}s  print {job['print_seconds'] or 0:>8.2f}s  "
+                f"{job['labels_per_minute'] or 0:>6.0f} labels/min"
+            )
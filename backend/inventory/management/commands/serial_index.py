@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from inventory.serial_index import SerialIndex, get_index_settings
+
+
+class Command(BaseCommand):
+    help = 'Build the in-memory serial index, report its memory use and check it against the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Verify every database serial is in the index with the same part/UPC')
+        parser.add_argument('--probe', metavar='SERIAL', action='append', default=[],
+                            help='Look up a serial in the index (repeatable)')
+
+    def handle(self, *args, **options):
+        index = SerialIndex(error_rate=get_index_settings()['BLOOM_ERROR_RATE'])
+        index.load()
+
+        usage = index.memory_usage()
+        self.stdout.write(f"Serials indexed:    {usage['serials']}")
+        self.stdout.write(f"Arrays:             {usage['arrays_bytes'] / 1024:.1f} KiB")
+        self.stdout.write(f"Part/UPC tables:    {usage['tables_bytes'] / 1024:.1f} KiB")
+        self.stdout.write(f"Bloom filter:       {usage['bloom_bytes'] / 1024:.1f} KiB "
+                          f"({index.bloom.hash_count} hashes, capacity {index.bloom.capacity})")
+        self.stdout.write(f"Total:              {usage['total_bytes'] / 1024:.1f} KiB")
+        if usage['serials']:
+            self.stdout.write(f"Per million serials: {usage['bytes_per_million'] / 1024 / 1024:.1f} MiB")
+
+        for serial in options['probe']:
+            entry = index.get(serial)
+            if entry is None:
+                self.stdout.write(f"{serial}: not found")
+            else:
+                self.stdout.write(f"{serial}: part {entry[0]}, UPC {entry[1] or '-'}")
+
+        if options['check']:
+            result = index.check()
+            if result['ok']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✓ Index matches database ({result['db_count']} serials)"
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f"✗ Index mismatch: database {result['db_count']}, index {result['index_count']}, "
+                    f"missing {result['missing_count']}, mismatched {result['mismatched_count']}"
+                ))
+                for serial in result['missing']:
+                    self.stdout.write(f"  missing: {serial}")
+                for serial in result['mismatched']:
+                    self.stdout.write(f"  mismatched: {serial}")
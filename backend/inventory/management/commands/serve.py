@@ -0,0 +1,148 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SERVER_DEFAULTS = {
+    'HOST': '127.0.0.1',
+    'PORT': 8001,
+    'THREADS': 8,
+    'CONNECTION_LIMIT': 100,
+    'CHANNEL_TIMEOUT': 120,
+    'BACKLOG': 1024,
+    'ASGI': False,
+}
+
+
+def get_server_settings():
+    server = dict(SERVER_DEFAULTS)
+    server.update(getattr(settings, 'SERVER', {}))
+    return server
+
+
+def parse_addrport(addrport, default_host, default_port):
+    """Split "8001", "0.0.0.0:8001" or "[::1]:8001" into (host, port)."""
+    if not addrport:
+        return default_host, default_port
+    host, sep, port = addrport.rpartition(':')
+    if not sep:
+        host, port = default_host, addrport
+    if not port.isdigit():
+        raise CommandError(f'"{addrport}" is not a valid port number or address:port pair.')
+    return host.strip('[]') or default_host, int(port)
+
+
+class Command(BaseCommand):
+    help = ('Serve LabelGen with the multi-threaded waitress WSGI server, or with '
+            'uvicorn under ASGI (--asgi). Use with DJANGO_SETTINGS_MODULE=labelgen.settings_production.')
+
+    def add_arguments(self, parser):
+        server = get_server_settings()
+        parser.add_argument('addrport', nargs='?',
+                            help='Optional port number, or ipaddr:port (default: SERVER HOST/PORT)')
+        parser.add_argument('--threads', type=int, default=server['THREADS'],
+                            help='Worker threads handling requests')
+        parser.add_argument('--connection-limit', type=int, default=server['CONNECTION_LIMIT'],
+                            help='Maximum simultaneous connections, including idle keep-alive ones')
+        parser.add_argument('--channel-timeout', type=int, default=server['CHANNEL_TIMEOUT'],
+                            help='Seconds before an idle keep-alive connection is closed')
+        parser.add_argument('--backlog', type=int, default=server['BACKLOG'],
+                            help='Listen queue depth for connections not yet accepted')
+        parser.add_argument('--asgi', action='store_true', default=server['ASGI'],
+                            help='Serve labelgen.asgi with uvicorn so async views (lookup, '
+                                 'label render, preview) share one event loop')
+
+    def handle(self, *args, **options):
+        server = get_server_settings()
+        host, port = parse_addrport(options['addrport'], server['HOST'], server['PORT'])
+        for option in ('threads', 'connection_limit', 'channel_timeout', 'backlog'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1")
+
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING(
+                'DEBUG is on; every SQL query is kept in memory. '
+                'Set DJANGO_SETTINGS_MODULE=labelgen.settings_production for production.'
+            ))
+
+        self.ensure_static_files()
+
+        if options['asgi']:
+            self.serve_asgi(host, port, options)
+        else:
+            self.serve_wsgi(host, port, options)
+
+    def ensure_static_files(self):
+        """
+        Bring the hashed static files up to date before serving; a missing or
+        stale manifest would break {% static %} under the production settings.
+        The frozen bundle ships files collected at build time.
+        """
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        from django.core.management import call_command
+
+        if getattr(sys, 'frozen', False) or not hasattr(staticfiles_storage, 'manifest_name'):
+            return
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def disable_persistent_connections(self):
+        """
+        Under ASGI, sync code runs in a fresh worker thread per request, and a
+        persistent connection stays with the thread that opened it, so
+        CONN_MAX_AGE would leave idle SQLite connections behind. Django
+        recommends CONN_MAX_AGE = 0 for ASGI; waitress keeps its fixed thread
+        pool and the configured value.
+        """
+        from django.db import connections
+
+        connections.close_all()
+        for database in connections.settings.values():
+            database['CONN_MAX_AGE'] = 0
+
+    def serve_wsgi(self, host, port, options):
+        try:
+            from waitress import serve
+        except ImportError:
+            raise CommandError('waitress is not installed. Run: pip install waitress')
+
+        from labelgen.wsgi import application
+
+        self.stdout.write(
+            f"Serving on http://{host}:{port}/ with {options['threads']} threads "
+            f"(connection limit {options['connection_limit']}, backlog {options['backlog']})"
+        )
+        serve(
+            application,
+            host=host,
+            port=port,
+            threads=options['threads'],
+            connection_limit=options['connection_limit'],
+            channel_timeout=options['channel_timeout'],
+            backlog=options['backlog'],
+            ident='LabelGen',
+        )
+
+    def serve_asgi(self, host, port, options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('uvicorn is not installed. Run: pip install uvicorn')
+
+        self.disable_persistent_connections()
+        from labelgen.asgi import application
+
+        self.stdout.write(
+            f"Serving ASGI on http://{host}:{port}/ "
+            f"(connection limit {options['connection_limit']}, backlog {options['backlog']})"
+        )
+        uvicorn.run(
+            application,
+            host=host,
+            port=port,
+            backlog=options['backlog'],
+            limit_concurrency=options['connection_limit'],
+            timeout_keep_alive=options['channel_timeout'],
+            lifespan='off',
+            log_level='warning',
+        )
@@ -0,0 +1,182 @@
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Counters, gauges and fixed-bucket histograms keyed by label values. Recording
+is a dict lookup and a few additions under a per-metric lock, so it is cheap
+enough for the lookup and generation hot paths. Values are per process; scrape
+each server process separately if more than one is running.
+"""
+
+import threading
+from bisect import bisect_left
+
+
+# Latency buckets in seconds, from sub-millisecond lookups to slow previews
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Label combinations kept per metric; further ones are folded into "other"
+# so an unbounded label (e.g. part numbers) can't grow memory without limit
+MAX_LABEL_SETS = 500
+OVERFLOW_LABEL = 'other'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        if key not in self._values and len(self._values) >= MAX_LABEL_SETS:
+            key = (OVERFLOW_LABEL,) * len(self.labelnames)
+        return key
+
+    def header(self):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.metric_type}',
+        ]
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = self.header()
+        for key, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        # Non-cumulative counts per bucket, with a final +Inf slot
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        lines = self.header()
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'labelgen_http_request_duration_seconds',
+    'Time to produce a response (first byte for streams), by view.',
+    ('view', 'method'),
+))
+REQUESTS = registry.register(Counter(
+    'labelgen_http_requests_total',
+    'HTTP responses by view and status code.',
+    ('view', 'method', 'status'),
+))
+GENERATE_LOCK_WAIT = registry.register(Histogram(
+    'labelgen_generate_lock_wait_seconds',
+    'Time generate_serials waited to acquire the Config write lock.',
+))
+GENERATE_TRANSACTION = registry.register(Histogram(
+    'labelgen_generate_transaction_seconds',
+    'Time generate_serials held the write lock, through commit.',
+))
+SERIALS_GENERATED = registry.register(Counter(
+    'labelgen_serials_generated_total',
+    'Serial numbers generated, by part number.',
+    ('part_number',),
+))
+SERIAL_LOOKUPS = registry.register(Counter(
+    'labelgen_serial_lookups_total',
+    'Serial lookups by result (hit, miss, or rejected by the in-memory index).',
+    ('result',),
+))
+CSV_IMPORT_ROWS = registry.register(Counter(
+    'labelgen_csv_import_rows_total',
+    'Rows processed by UPC CSV imports.',
+))
+CSV_IMPORT_DURATION = registry.register(Histogram(
+    'labelgen_csv_import_duration_seconds',
+    'Time to apply one UPC CSV import.',
+))
+CSV_IMPORT_RATE = registry.register(Gauge(
+    'labelgen_csv_import_last_rows_per_second',
+    'Rows per second achieved by the most recent UPC CSV import.',
+))
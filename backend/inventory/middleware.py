@@ -0,0 +1,122 @@
+"""
+Request middleware for the inventory app.
+"""
+
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from .loadsim import get_trace_recorder
+from .metrics import REQUEST_DURATION, REQUESTS
+from .profiler import get_profiler
+from .querylog import current_request, get_query_log
+
+
+def _record(request, response, started):
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unmatched'
+    REQUEST_DURATION.observe(time.perf_counter() - started, view=view, method=request.method)
+    REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Record latency and status per view. Streaming responses are timed to the first byte."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.perf_counter()
+            response = await get_response(request)
+            _record(request, response, started)
+            return response
+    else:
+        def middleware(request):
+            started = time.perf_counter()
+            response = get_response(request)
+            _record(request, response, started)
+            return response
+    return middleware
+
+
+@sync_and_async_middleware
+def profiler_middleware(get_response):
+    """
+    Sample requests for the slow-request report (settings.PROFILER). Removed
+    from the chain at startup when the profiler is disabled.
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            state, token = profiler.start(is_async=True)
+            response = None
+            try:
+                response = await get_response(request)
+                return response
+            finally:
+                # Always stop cProfile and tracemalloc, even if the view raised
+                profiler.finish(request, response, state, token)
+    else:
+        def middleware(request):
+            state, token = profiler.start()
+            response = None
+            try:
+                response = get_response(request)
+                return response
+            finally:
+                profiler.finish(request, response, state, token)
+    return middleware
+
+
+@sync_and_async_middleware
+def slow_query_middleware(get_response):
+    """
+    Let the slow-query log see which view ran a statement
+    (settings.SLOW_QUERY_LOG). Removed at startup when the log is disabled.
+    """
+    if get_query_log() is None:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = current_request.set(request)
+            try:
+                return await get_response(request)
+            finally:
+                current_request.reset(token)
+    else:
+        def middleware(request):
+            token = current_request.set(request)
+            try:
+                return get_response(request)
+            finally:
+                current_request.reset(token)
+    return middleware
+
+
+@sync_and_async_middleware
+def trace_middleware(get_response):
+    """
+    Record generate, lookup and label requests for `manage.py loadsim
+    --replay` (settings.LOAD_TRACE). Removed at startup when disabled.
+    """
+    recorder = get_trace_recorder()
+    if recorder is None:
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = time.time()
+            response = await get_response(request)
+            recorder.record(request, response, started)
+            return response
+    else:
+        def middleware(request):
+            started = time.time()
+            response = get_response(request)
+            recorder.record(request, response, started)
+            return response
+    return middleware
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:31
+
+from django.db import migrations, models
+
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def backfill_change_seq(apps, schema_editor):
+    """Assign feed positions to existing serials and UPCs so the feed starts complete."""
+    Config = apps.get_model('inventory', 'Config')
+    Product = apps.get_model('inventory', 'Product')
+    SerialNumber = apps.get_model('inventory', 'SerialNumber')
+    
+    seq = 0
+    last_serial = ''
+    while True:
+        # Keyset batches in serial order (the order the counter handed them out)
+        batch = list(
+            SerialNumber.objects.filter(serial_number__gt=last_serial)
+            .order_by('serial_number')
+            .only('serial_number')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for serial in batch:
+            seq += 1
+            serial.change_seq = seq
+        SerialNumber.objects.bulk_update(batch, ['change_seq'])
+        last_serial = batch[-1].serial_number
+    
+    batch = []
+    for product in Product.objects.filter(upc__isnull=False).order_by('part_number').only('part_number'):
+        seq += 1
+        product.change_seq = seq
+        batch.append(product)
+    Product.objects.bulk_update(batch, ['change_seq'], batch_size=BACKFILL_BATCH_SIZE)
+    
+    if seq:
+        config = Config.objects.first()
+        if config is None:
+            config = Config(pk=1)
+        config.last_change_seq = seq
+        config.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_update_zpl_templates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='config',
+            name='last_change_seq',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Last sequence number handed out to the change feed', verbose_name='Last Change Sequence'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='Change feed position of the latest UPC change', null=True, unique=True, verbose_name='Change Sequence'),
+        ),
+        migrations.AddField(
+            model_name='serialnumber',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='Monotonic change feed position assigned at generation', null=True, unique=True, verbose_name='Change Sequence'),
+        ),
+        migrations.RunPython(backfill_change_seq, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_change_feed_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSerialNumber',
+            fields=[
+                ('serial_number', models.CharField(max_length=20, primary_key=True, serialize=False, verbose_name='Serial Number')),
+                ('upc', models.CharField(blank=True, max_length=12, null=True, verbose_name='UPC')),
+                ('created_at', models.DateTimeField(verbose_name='Created At')),
+                ('change_seq', models.BigIntegerField(blank=True, null=True, verbose_name='Change Sequence')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived At')),
+                ('part_number', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_serial_numbers', to='inventory.product', verbose_name='Part Number')),
+            ],
+            options={
+                'verbose_name': 'Archived Serial Number',
+                'verbose_name_plural': 'Archived Serial Numbers',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_archivedserialnumber'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upc', models.CharField(blank=True, help_text='UPC at generation time, as stored on the serials', max_length=12, null=True, verbose_name='UPC')),
+                ('start_number', models.BigIntegerField(help_text='Numeric value of the first serial in the batch', verbose_name='First Serial Number')),
+                ('end_number', models.BigIntegerField(help_text='Numeric value of the last serial in the batch', verbose_name='Last Serial Number')),
+                ('serial_digits', models.IntegerField(help_text='Zero-padded width the serials were generated with', verbose_name='Serial Digit Count')),
+                ('station', models.CharField(blank=True, default='', help_text='Workstation that generated the batch', max_length=100, verbose_name='Station')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('part_number', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='generation_batches', to='inventory.product', verbose_name='Part Number')),
+            ],
+            options={
+                'verbose_name': 'Generation Batch',
+                'verbose_name_plural': 'Generation Batches',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='inventory_batch_created_idx'), models.Index(fields=['start_number'], name='inventory_batch_start_idx')],
+            },
+        ),
+    ]
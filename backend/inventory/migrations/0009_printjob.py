@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_generationbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrintJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label_type', models.CharField(max_length=10, verbose_name='Label Type')),
+                ('printer', models.CharField(blank=True, default='', help_text='Bridge printer ID the job was sent to', max_length=200, verbose_name='Printer')),
+                ('station', models.CharField(blank=True, default='', help_text='Workstation that started the job', max_length=100, verbose_name='Station')),
+                ('labels', models.JSONField(help_text='Label data in print order: serial_number, part_number, upc', verbose_name='Labels')),
+                ('total', models.IntegerField(verbose_name='Total Labels')),
+                ('confirmed', models.IntegerField(default=0, help_text='Labels the bridge has accepted, counted from the start', verbose_name='Confirmed Labels')),
+                ('status', models.CharField(choices=[('printing', 'Printing'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='printing', max_length=20, verbose_name='Status')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Last Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Print Job',
+                'verbose_name_plural': 'Print Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['station', 'status', '-updated_at'], name='inventory_printjob_open_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_printjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedserialnumber',
+            name='change_seq',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='Kept from SerialNumber so the change feed still returns archived serials', null=True, unique=True, verbose_name='Change Sequence'),
+        ),
+    ]
@@ -20,6 +20,14 @@ class Product(models.Model):
         verbose_name="UPC",
         help_text="12-digit Universal Product Code (optional)"
     )
+    change_seq = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name="Change Sequence",
+        help_text="Change feed position of the latest UPC change"
+    )
 
     class Meta:
         verbose_name = "Product"
@@ -58,6 +66,14 @@ class SerialNumber(models.Model):
         auto_now_add=True,
         verbose_name="Created At"
     )
+    change_seq = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name="Change Sequence",
+        help_text="Monotonic change feed position assigned at generation"
+    )
 
     class Meta:
         verbose_name = "Serial Number"
@@ -68,6 +84,200 @@ class SerialNumber(models.Model):
         return f"{self.serial_number} ({self.part_number})"
 
 
+class ArchivedSerialNumber(models.Model):
+    """
+    Serial numbers moved out of the SerialNumber table by archive_serials.
+    Same columns as SerialNumber; lookups fall through to this table.
+    """
+    serial_number = models.CharField(
+        max_length=20,
+        primary_key=True,
+        verbose_name="Serial Number"
+    )
+    part_number = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        verbose_name="Part Number",
+        related_name='archived_serial_numbers'
+    )
+    upc = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        verbose_name="UPC"
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Created At"
+    )
+    change_seq = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name="Change Sequence",
+        help_text="Kept from SerialNumber so the change feed still returns archived serials"
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Archived At"
+    )
+
+    class Meta:
+        verbose_name = "Archived Serial Number"
+        verbose_name_plural = "Archived Serial Numbers"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.serial_number} ({self.part_number}, archived)"
+
+
+class GenerationBatch(models.Model):
+    """
+    One generate_serials call: a contiguous serial range for one part.
+    Lets a whole run (or part of it) be reprinted without looking up each
+    serial.
+    """
+    part_number = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        verbose_name="Part Number",
+        related_name='generation_batches'
+    )
+    upc = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        verbose_name="UPC",
+        help_text="UPC at generation time, as stored on the serials"
+    )
+    start_number = models.BigIntegerField(
+        verbose_name="First Serial Number",
+        help_text="Numeric value of the first serial in the batch"
+    )
+    end_number = models.BigIntegerField(
+        verbose_name="Last Serial Number",
+        help_text="Numeric value of the last serial in the batch"
+    )
+    serial_digits = models.IntegerField(
+        verbose_name="Serial Digit Count",
+        help_text="Zero-padded width the serials were generated with"
+    )
+    station = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="Station",
+        help_text="Workstation that generated the batch"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Created At"
+    )
+
+    class Meta:
+        verbose_name = "Generation Batch"
+        verbose_name_plural = "Generation Batches"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='inventory_batch_created_idx'),
+            models.Index(fields=['start_number'], name='inventory_batch_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.first_serial}-{self.last_serial} ({self.part_number_id})"
+
+    @property
+    def quantity(self):
+        return self.end_number - self.start_number + 1
+
+    @property
+    def first_serial(self):
+        return str(self.start_number).zfill(self.serial_digits)
+
+    @property
+    def last_serial(self):
+        return str(self.end_number).zfill(self.serial_digits)
+
+
+class PrintJob(models.Model):
+    """
+    Server-side ledger of a multi-label print run.
+    Labels print in order, so progress is a single count of confirmed
+    labels; an interrupted job resumes from labels[confirmed].
+    """
+    STATUS_PRINTING = 'printing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (STATUS_PRINTING, 'Printing'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_CANCELLED, 'Cancelled'),
+    ]
+    
+    label_type = models.CharField(
+        max_length=10,
+        verbose_name="Label Type"
+    )
+    printer = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        verbose_name="Printer",
+        help_text="Bridge printer ID the job was sent to"
+    )
+    station = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name="Station",
+        help_text="Workstation that started the job"
+    )
+    labels = models.JSONField(
+        verbose_name="Labels",
+        help_text="Label data in print order: serial_number, part_number, upc"
+    )
+    total = models.IntegerField(
+        verbose_name="Total Labels"
+    )
+    confirmed = models.IntegerField(
+        default=0,
+        verbose_name="Confirmed Labels",
+        help_text="Labels the bridge has accepted, counted from the start"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PRINTING,
+        verbose_name="Status"
+    )
+    error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name="Last Error"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Created At"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Updated At"
+    )
+    
+    class Meta:
+        verbose_name = "Print Job"
+        verbose_name_plural = "Print Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['station', 'status', '-updated_at'], name='inventory_printjob_open_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Print job {self.pk}: {self.confirmed}/{self.total} {self.label_type} ({self.status})"
+
+
 class Config(models.Model):
     """
     Configuration table for serial number generation settings.
@@ -91,6 +301,12 @@ class Config(models.Model):
         verbose_name="Current Serial Counter",
         help_text="Auto-incrementing counter for next serial number"
     )
+    last_change_seq = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Last Change Sequence",
+        help_text="Last sequence number handed out to the change feed"
+    )
     admin_password = models.CharField(
         max_length=100,
         default='admin',
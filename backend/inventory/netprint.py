@@ -0,0 +1,324 @@
+"""
+Raw TCP printing to network label printers (settings.NETWORK_PRINTERS).
+
+Zebra and Datamax network printers accept ZPL on TCP port 9100 with no
+protocol around it. This transport sends ZPL there straight from the server,
+skipping the browser -> bridge -> spooler hops:
+
+- Connections are pooled per printer and reused between jobs. A pooled
+  connection the printer has closed is noticed before use and replaced.
+- Labels are pipelined: LABELS_PER_WRITE labels go out in one write.
+- Backpressure comes from TCP flow control. SEND_BUFFER keeps the kernel
+  from queueing much more than the printer has taken, so a write blocks
+  while the printer's buffer is full. A write still blocked after
+  WRITE_TIMEOUT fails the job, reporting how many labels were handed over.
+
+Printers in NETWORK_PRINTERS appear on the printer settings page as
+"net:<name>". The browser sends their ZPL to /api/network-print/ instead
+of the bridge, and print jobs send label data to
+/api/network-print/labels/ a chunk at a time.
+"""
+
+import select
+import socket
+import socketserver
+import threading
+import time
+
+from django.conf import settings
+
+
+PRINTER_DEFAULTS = {
+    'PORT': 9100,
+    'CONNECT_TIMEOUT': 3,
+    'WRITE_TIMEOUT': 30,
+    'POOL_SIZE': 2,
+    'LABELS_PER_WRITE': 25,
+    'SEND_BUFFER': 64 * 1024,
+    'IDLE_TIMEOUT': 60,
+}
+
+ENCODING = 'utf-8'
+
+
+def get_network_printers():
+    """Configured network printers, each with PRINTER_DEFAULTS filled in."""
+    printers = {}
+    for name, options in getattr(settings, 'NETWORK_PRINTERS', {}).items():
+        printers[name] = dict(PRINTER_DEFAULTS, **options)
+    return printers
+
+
+class NetworkPrintError(Exception):
+    """A network print failed; labels_sent labels were handed to the printer first."""
+
+    def __init__(self, message, labels_sent=0):
+        super().__init__(message)
+        self.labels_sent = labels_sent
+
+
+class PrinterConnection:
+    """One open socket to a printer."""
+
+    def __init__(self, options):
+        self.sock = socket.create_connection(
+            (options['HOST'], options['PORT']), timeout=options['CONNECT_TIMEOUT']
+        )
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, int(options['SEND_BUFFER']))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(options['WRITE_TIMEOUT'])
+        self.last_used = time.monotonic()
+
+    def is_alive(self, idle_timeout):
+        """
+        False if the printer has closed the connection or it has been idle
+        too long to trust. Status bytes the printer sent are discarded.
+        """
+        if time.monotonic() - self.last_used > idle_timeout:
+            return False
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if readable:
+                return self.sock.recv(4096) != b''
+        except OSError:
+            return False
+        return True
+
+    def send(self, data):
+        self.sock.sendall(data)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class PrinterPool:
+    """Up to POOL_SIZE connections to one printer, reused between jobs."""
+
+    def __init__(self, name, options):
+        self.name = name
+        self.options = options
+        self._slots = threading.BoundedSemaphore(int(options['POOL_SIZE']))
+        self._lock = threading.Lock()
+        self._idle = []
+        self.connections_opened = 0
+
+    def _connect(self):
+        try:
+            connection = PrinterConnection(self.options)
+        except OSError as e:
+            raise NetworkPrintError(
+                f"Cannot connect to {self.name} at {self.options['HOST']}:{self.options['PORT']}: {e}"
+            )
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.options['WRITE_TIMEOUT']):
+            raise NetworkPrintError(f'{self.name} is busy with other jobs')
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return self._connect(), False
+                if connection.is_alive(self.options['IDLE_TIMEOUT']):
+                    return connection, True
+                connection.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, reuse=True):
+        if reuse:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def send(self, chunks, progress=None):
+        """
+        Write (data, label_count) chunks in order on one connection.
+
+        Args:
+            chunks (iterable): (bytes, number of labels in them) pairs
+            progress (callable): called with the running label count after
+                each chunk has been written
+
+        Returns:
+            dict: {'labels', 'bytes', 'writes'}
+        """
+        connection, reused = self.acquire()
+        labels_sent = bytes_sent = writes = 0
+        try:
+            for data, label_count in chunks:
+                try:
+                    connection.send(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    if not (reused and writes == 0):
+                        raise
+                    # The printer dropped an idle connection between the
+                    # liveness check and the first write; nothing went out
+                    connection.close()
+                    connection, reused = self._connect(), False
+                    connection.send(data)
+                labels_sent += label_count
+                bytes_sent += len(data)
+                writes += 1
+                if progress:
+                    progress(labels_sent)
+        except socket.timeout:
+            self.release(connection, reuse=False)
+            raise NetworkPrintError(
+                f"{self.name} stopped accepting data for {self.options['WRITE_TIMEOUT']}s "
+                f"(out of labels or paused?)", labels_sent
+            )
+        except (OSError, NetworkPrintError) as e:
+            self.release(connection, reuse=False)
+            raise NetworkPrintError(f'Print to {self.name} failed: {e}', labels_sent)
+        self.release(connection)
+        return {'labels': labels_sent, 'bytes': bytes_sent, 'writes': writes}
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class NetworkPrintTransport:
+    """Connection pools for every configured network printer."""
+
+    def __init__(self, printers=None):
+        self.printers = get_network_printers() if printers is None else printers
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, name):
+        if name not in self.printers:
+            raise NetworkPrintError(f'Unknown network printer: {name}')
+        with self._lock:
+            if name not in self._pools:
+                self._pools[name] = PrinterPool(name, self.printers[name])
+            return self._pools[name]
+
+    def print_labels(self, name, labels, progress=None):
+        """
+        Send a list of single-label ZPL documents to a printer, pipelined
+        LABELS_PER_WRITE at a time, in order on one connection.
+
+        Returns:
+            dict: {'printer', 'labels', 'bytes', 'writes', 'seconds'}
+        """
+        pool = self.pool(name)
+        per_write = max(1, int(pool.options['LABELS_PER_WRITE']))
+
+        def chunks():
+            for start in range(0, len(labels), per_write):
+                group = labels[start:start + per_write]
+                yield ''.join(group).encode(ENCODING), len(group)
+
+        started = time.perf_counter()
+        result = pool.send(chunks(), progress)
+        result.update(printer=name, seconds=time.perf_counter() - started)
+        return result
+
+    def print_document(self, name, zpl):
+        """Send one ZPL document (any number of labels) in a single write."""
+        pool = self.pool(name)
+        started = time.perf_counter()
+        result = pool.send([(zpl.encode(ENCODING), zpl.count('^XZ'))])
+        result.update(printer=name, seconds=time.perf_counter() - started)
+        return result
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The process-wide transport, created on first use."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = NetworkPrintTransport()
+    return _transport
+
+
+class _SinkHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        if sink.paused.is_set():
+            # Stop reading, like a printer that is out of labels
+            sink.resume.wait()
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                break
+            with sink.received_changed:
+                sink.received += data
+                sink.recv_calls += 1
+                sink.received_changed.notify_all()
+
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # The default backlog of 5 stalls clients that open a connection per label
+    request_queue_size = 128
+
+
+class LocalPrinterSink:
+    """
+    A TCP listener standing in for a network printer: it accepts
+    connections on localhost and keeps every byte it receives. Used by the
+    tests and `manage.py netprint_bench`.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.lock = threading.Lock()
+        self.received_changed = threading.Condition(self.lock)
+        self.received = bytearray()
+        self.connections = 0
+        self.recv_calls = 0
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+        self.server = _SinkServer((host, port), _SinkHandler)
+        self.server.sink = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def labels_received(self):
+        with self.lock:
+            return bytes(self.received).count(b'^XZ')
+
+    def wait_for(self, byte_count, timeout=5):
+        # Woken by every read, so timings don't round up to a polling interval
+        with self.received_changed:
+            return self.received_changed.wait_for(lambda: len(self.received) >= byte_count, timeout)
+
+    def stop(self):
+        self.resume.set()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,172 @@
+"""
+Print job ledger.
+
+A workstation registers a multi-label run before printing it and reports
+how many labels the bridge has accepted as it goes. Labels print strictly in
+order, so progress is one number: after a reload or a bridge timeout the job
+resumes at labels[confirmed] and only the remaining labels get ZPL generated
+and printed again.
+
+Checkpoints are sent every few labels rather than per label, and each one is
+a single UPDATE. Checkpoints that arrive late (a smaller count than already
+recorded) are ignored, and so is anything sent after a job was completed or
+cancelled.
+"""
+
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from .models import PrintJob
+
+
+class PrintJobService:
+    """
+    Creates print jobs, records checkpoints and returns what is left to print.
+    """
+
+    MAX_LABELS = 10000
+    DEFAULT_OPEN_JOBS = 10
+    LABEL_FIELDS = ('serial_number', 'part_number', 'upc')
+    CLIENT_STATUSES = (
+        PrintJob.STATUS_PRINTING,
+        PrintJob.STATUS_COMPLETED,
+        PrintJob.STATUS_FAILED,
+        PrintJob.STATUS_CANCELLED,
+    )
+    # Jobs that can still be resumed and checkpointed
+    OPEN_STATUSES = (PrintJob.STATUS_PRINTING, PrintJob.STATUS_FAILED)
+
+    @staticmethod
+    def clean_labels(labels):
+        """
+        Validate a label list and keep only the fields a label template uses.
+
+        Raises:
+            ValueError: not a non-empty list of dicts with a serial_number
+        """
+        if not isinstance(labels, list) or not labels:
+            raise ValueError('labels must be a non-empty list')
+        if len(labels) > PrintJobService.MAX_LABELS:
+            raise ValueError(f'A print job can have at most {PrintJobService.MAX_LABELS} labels')
+
+        cleaned = []
+        for label in labels:
+            if not isinstance(label, dict) or not label.get('serial_number'):
+                raise ValueError('Each label needs a serial_number')
+            cleaned.append({field: str(label.get(field) or '') for field in PrintJobService.LABEL_FIELDS})
+        return cleaned
+
+    @staticmethod
+    def create(label_type, labels, printer='', station=''):
+        """
+        Register a print job.
+
+        Args:
+            label_type (str): 'serial' or 'box'
+            labels (list): Label data dicts in print order
+            printer (str): Bridge printer ID
+            station (str): Workstation starting the job
+
+        Returns:
+            PrintJob: the new job
+        """
+        if label_type not in ('serial', 'box'):
+            raise ValueError('Invalid label_type. Must be "serial" or "box"')
+        labels = PrintJobService.clean_labels(labels)
+        return PrintJob.objects.create(
+            label_type=label_type,
+            printer=str(printer or '')[:200],
+            station=str(station or '')[:100],
+            labels=labels,
+            total=len(labels),
+        )
+
+    @staticmethod
+    def checkpoint(job_id, confirmed, status=PrintJob.STATUS_PRINTING, error=''):
+        """
+        Record progress with one UPDATE.
+
+        Reaching the total marks the job completed whatever status is sent.
+
+        Args:
+            job_id (int): Print job ID
+            confirmed (int): Labels accepted by the bridge so far
+            status (str): printing, completed, failed or cancelled
+            error (str): Reason the job stopped, for failed jobs
+
+        Returns:
+            bool: True if recorded, False if the job already had more
+            labels confirmed (a late checkpoint) or is completed or cancelled
+
+        Raises:
+            ValueError: invalid count or status
+            PrintJob.DoesNotExist: no such job
+        """
+        confirmed = int(confirmed)
+        if confirmed < 0:
+            raise ValueError('confirmed must not be negative')
+        if status not in PrintJobService.CLIENT_STATUSES:
+            raise ValueError(f'Invalid status: {status}')
+
+        # A checkpoint with an equal count may still change the status of an
+        # open job, but never reopens a completed or cancelled one
+        updated = PrintJob.objects.filter(
+            pk=job_id, confirmed__lte=confirmed, status__in=PrintJobService.OPEN_STATUSES,
+        ).update(
+            confirmed=Least(Value(confirmed), F('total')),
+            status=Case(
+                When(total__lte=confirmed, then=Value(PrintJob.STATUS_COMPLETED)),
+                default=Value(status),
+            ),
+            error=str(error or '')[:1000],
+            updated_at=timezone.now(),
+        )
+        if not updated and not PrintJob.objects.filter(pk=job_id).exists():
+            raise PrintJob.DoesNotExist(f'Print job {job_id} not found')
+        return bool(updated)
+
+    @staticmethod
+    def to_dict(job, include_labels=False):
+        data = {
+            'id': job.pk,
+            'label_type': job.label_type,
+            'printer': job.printer,
+            'station': job.station,
+            'total': job.total,
+            'confirmed': job.confirmed,
+            'status': job.status,
+            'error': job.error,
+            'created_at': job.created_at.isoformat(),
+            'updated_at': job.updated_at.isoformat(),
+        }
+        if include_labels:
+            # Only what is left; the client prints these from index 'confirmed'
+            data['labels'] = job.labels[job.confirmed:]
+        return data
+
+    @staticmethod
+    def resume(job_id):
+        """
+        A job with the labels still to print.
+
+        Raises:
+            PrintJob.DoesNotExist: no such job
+        """
+        return PrintJobService.to_dict(PrintJob.objects.get(pk=job_id), include_labels=True)
+
+    @staticmethod
+    def open_jobs(station, limit=DEFAULT_OPEN_JOBS):
+        """
+        A station's jobs that stopped before finishing, most recent first.
+        Label lists are not loaded.
+        """
+        jobs = (
+            PrintJob.objects.filter(
+                station=station,
+                status__in=PrintJobService.OPEN_STATUSES,
+            )
+            .defer('labels')
+            .order_by('-updated_at')[:limit]
+        )
+        return [PrintJobService.to_dict(job) for job in jobs]
@@ -0,0 +1,243 @@
+"""
+Opt-in request profiler (settings.PROFILER).
+
+While enabled, every request is timed and its SQL counted. A random sample
+of requests (SAMPLE_RATE) is also run under cProfile and tracemalloc. Sampled
+requests and any request slower than SLOW_THRESHOLD_MS are kept in memory,
+and only the KEEP slowest are retained. They are shown on /admin-profiler/.
+
+Only one request is profiled at a time: cProfile and tracemalloc are process
+wide, so a sample that overlaps another profiled request is skipped. Work
+done concurrently by other threads can still appear in a profile and in the
+peak allocation figure.
+
+cProfile only sees the thread that enabled it. For async views under ASGI
+that is the event-loop thread: ORM calls made through sync_to_async run in
+worker threads and show up only as time spent awaiting, while other
+requests' coroutines running on the loop meanwhile are included. Such
+records are marked event_loop_only. SQL counts and times are still complete,
+because they are collected per request through a context variable.
+
+When disabled, the middleware removes itself at startup and no SQL wrapper
+is installed, so requests pay nothing.
+"""
+
+import contextvars
+import cProfile
+import heapq
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+
+# Request statistics for the request being handled in this context; copied
+# into sync_to_async threads, so async views' queries are counted too
+_current = contextvars.ContextVar('labelgen_profiler_request', default=None)
+
+PROFILE_LINES = 40
+SLOWEST_QUERIES = 5
+
+
+def get_profiler_settings():
+    defaults = {
+        'ENABLED': False,
+        'SAMPLE_RATE': 0.01,
+        'SLOW_THRESHOLD_MS': 500,
+        'KEEP': 50,
+        'TRACEMALLOC': True,
+    }
+    defaults.update(getattr(settings, 'PROFILER', {}))
+    return defaults
+
+
+class RequestStats:
+    """SQL and timing collected for one request."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.queries = []
+
+    def add_query(self, sql, elapsed):
+        self.sql_count += 1
+        self.sql_seconds += elapsed
+        # Keep only the slowest few statements
+        entry = (elapsed, self.sql_count, sql)
+        if len(self.queries) < SLOWEST_QUERIES:
+            heapq.heappush(self.queries, entry)
+        elif elapsed > self.queries[0][0]:
+            heapq.heapreplace(self.queries, entry)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - start)
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+class SlowRequestLog:
+    """The KEEP slowest captured requests, slowest first on read."""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._heap = []
+        self._ids = itertools.count(1)
+
+    def add(self, record):
+        record['id'] = next(self._ids)
+        entry = (record['duration_ms'], record['id'], record)
+        with self._lock:
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def would_keep(self, duration_ms):
+        with self._lock:
+            return len(self._heap) < self.keep or duration_ms > self._heap[0][0]
+
+    def records(self):
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [record for _, _, record in entries]
+
+    def get(self, record_id):
+        with self._lock:
+            for _, entry_id, record in self._heap:
+                if entry_id == record_id:
+                    return record
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+
+class RequestProfiler:
+    """Decides what to capture for each request and records it."""
+
+    def __init__(self, options):
+        self.sample_rate = float(options['SAMPLE_RATE'])
+        self.slow_threshold_ms = float(options['SLOW_THRESHOLD_MS'])
+        self.trace_memory = bool(options['TRACEMALLOC'])
+        self.log = SlowRequestLog(int(options['KEEP']))
+        self._profile_lock = threading.Lock()
+
+    def start(self, is_async=False):
+        """
+        Begin a request. Returns (state, token); pass both to finish(), also
+        when the view raised.
+        """
+        stats = RequestStats()
+        token = _current.set(stats)
+        profile = None
+        traced_here = False
+        if random.random() < self.sample_rate and self._profile_lock.acquire(blocking=False):
+            try:
+                profile = cProfile.Profile()
+                profile.enable()
+                if self.trace_memory:
+                    if not tracemalloc.is_tracing():
+                        tracemalloc.start()
+                        traced_here = True
+                    tracemalloc.reset_peak()
+            except ValueError:
+                # Another profiler (e.g. a debugger) is already active
+                profile = None
+                self._profile_lock.release()
+        return (stats, profile, traced_here, is_async, time.perf_counter()), token
+
+    def finish(self, request, response, state, token):
+        """Stop profiling and record the request. response is None if the view raised."""
+        stats, profile, traced_here, is_async, started = state
+        duration_ms = (time.perf_counter() - started) * 1000
+        _current.reset(token)
+
+        peak_bytes = None
+        profile_text = None
+        if profile is not None:
+            try:
+                profile.disable()
+                if self.trace_memory:
+                    peak_bytes = tracemalloc.get_traced_memory()[1]
+                if traced_here:
+                    tracemalloc.stop()
+            finally:
+                self._profile_lock.release()
+
+        if profile is None and duration_ms < self.slow_threshold_ms:
+            return
+        if not self.log.would_keep(duration_ms):
+            return
+        if profile is not None:
+            profile_text = format_profile(profile)
+
+        match = getattr(request, 'resolver_match', None)
+        self.log.add({
+            'path': request.path,
+            'method': request.method,
+            'view': match.view_name if match else 'unmatched',
+            'status': response.status_code if response is not None else 500,
+            'duration_ms': round(duration_ms, 2),
+            'recorded_at': timezone.now(),
+            'sampled': profile is not None,
+            'event_loop_only': profile is not None and is_async,
+            'sql_count': stats.sql_count,
+            'sql_ms': round(stats.sql_seconds * 1000, 2),
+            'slowest_queries': [
+                {'ms': round(elapsed * 1000, 2), 'sql': sql}
+                for elapsed, _, sql in sorted(stats.queries, reverse=True)
+            ],
+            'peak_alloc_kb': round(peak_bytes / 1024, 1) if peak_bytes is not None else None,
+            'profile': profile_text,
+        })
+
+
+def format_profile(profile):
+    """Top functions by cumulative time, as pstats prints them."""
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).strip_dirs().sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """
+    The process-wide profiler, created on first use. Returns None when
+    settings.PROFILER['ENABLED'] is false.
+    """
+    global _profiler
+    options = get_profiler_settings()
+    if not options['ENABLED']:
+        return None
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = RequestProfiler(options)
+            connection_created.connect(_install_wrapper, dispatch_uid='labelgen_profiler')
+            # Connections opened before the profiler started
+            for connection in connections.all(initialized_only=True):
+                _install_wrapper(None, connection)
+    return _profiler
@@ -0,0 +1,219 @@
+"""
+Slow-query log (settings.SLOW_QUERY_LOG).
+
+When enabled, every database connection gets an execute wrapper that times
+each statement. Statements over THRESHOLD_MS are logged to the
+'inventory.slow_queries' logger with the view that ran them and their
+parameters. SQLite's EXPLAIN QUERY PLAN is captured for each one. Statements
+are also aggregated by normalized SQL shape for the /admin-slow-queries/
+report, which flags full scans of the large tables in FLAG_TABLES.
+
+The plan is read on a raw cursor, so it never passes through the wrappers
+and is not timed, counted or logged itself.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+
+logger = logging.getLogger('inventory.slow_queries')
+
+# The request being handled in this context, set by slow_query_middleware
+current_request = contextvars.ContextVar('labelgen_slow_query_request', default=None)
+
+# Parameters of statements on these tables are never logged
+REDACTED_TABLES = ('inventory_config', 'django_session')
+MAX_PARAMS_REPR = 200
+
+EXPLAINABLE_RE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+SCAN_RE = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'%s(?:\s*,\s*%s)+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def get_query_log_settings():
+    defaults = {
+        'ENABLED': False,
+        'THRESHOLD_MS': 50,
+        'EXPLAIN': True,
+        'KEEP_SHAPES': 200,
+        'FLAG_TABLES': ('inventory_serialnumber', 'inventory_product'),
+    }
+    defaults.update(getattr(settings, 'SLOW_QUERY_LOG', {}))
+    return defaults
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape: literals become ?, and IN lists of any
+    length compare equal.
+    """
+    shape = _STRING_RE.sub('?', sql)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _PLACEHOLDER_LIST_RE.sub('%s, ...', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def scanned_tables(plan):
+    """Tables a plan reads with a full scan (including full index scans)."""
+    tables = []
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        if match and match.group(1) not in tables:
+            tables.append(match.group(1))
+    return tables
+
+
+def format_params(sql, params):
+    if any(table in sql for table in REDACTED_TABLES):
+        return '<redacted>'
+    text = repr(params)
+    if len(text) > MAX_PARAMS_REPR:
+        text = text[:MAX_PARAMS_REPR] + '...'
+    return text
+
+
+def explain_query_plan(connection, sql, params):
+    """
+    EXPLAIN QUERY PLAN detail lines for a statement, or [] when it can't be
+    explained. SQLite never executes the statement itself.
+    """
+    if connection.vendor != 'sqlite' or not EXPLAINABLE_RE.match(sql):
+        return []
+    from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+
+    # Django's cursor class for placeholder conversion, on the raw
+    # connection so the execute wrappers aren't re-entered
+    cursor = connection.connection.cursor(factory=SQLiteCursorWrapper)
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception:
+        return []
+    finally:
+        cursor.close()
+
+
+class QueryShapeLog:
+    """Slow statements aggregated by normalized shape."""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def add(self, shape, sql, params, elapsed_ms, view, plan, flagged):
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.keep:
+                    # Make room by dropping the shape with the least total time
+                    least = min(self._shapes, key=lambda key: self._shapes[key]['total_ms'])
+                    del self._shapes[least]
+                entry = self._shapes[shape] = {
+                    'shape': shape,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'views': {},
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['views'][view] = entry['views'].get(view, 0) + 1
+            entry['last_seen'] = timezone.now()
+            if elapsed_ms >= entry['max_ms']:
+                entry['max_ms'] = elapsed_ms
+                entry['example_sql'] = sql
+                entry['example_params'] = params
+            if plan:
+                entry['plan'] = plan
+                entry['flagged'] = flagged
+
+    def entries(self):
+        """Aggregated shapes, flagged scans first, then by total time."""
+        with self._lock:
+            entries = [dict(entry, views=dict(entry['views'])) for entry in self._shapes.values()]
+        for entry in entries:
+            entry['avg_ms'] = entry['total_ms'] / entry['count']
+            entry.setdefault('plan', [])
+            entry.setdefault('flagged', [])
+        return sorted(entries, key=lambda entry: (not entry['flagged'], -entry['total_ms']))
+
+    def clear(self):
+        with self._lock:
+            self._shapes = {}
+
+
+class SlowQueryLog:
+    """Times statements and records the ones over the threshold."""
+
+    def __init__(self, options):
+        self.threshold = float(options['THRESHOLD_MS']) / 1000
+        self.explain = bool(options['EXPLAIN'])
+        self.flag_tables = tuple(options['FLAG_TABLES'])
+        self.shapes = QueryShapeLog(int(options['KEEP_SHAPES']))
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                self.record(context['connection'], sql, params, many, elapsed)
+
+    def record(self, connection, sql, params, many, elapsed):
+        request = current_request.get()
+        match = getattr(request, 'resolver_match', None) if request is not None else None
+        if match is not None:
+            view = match.view_name
+        elif request is not None:
+            view = 'unmatched'
+        else:
+            view = '-'
+
+        if many:
+            params = next(iter(params), None)
+        plan = explain_query_plan(connection, sql, params) if self.explain else []
+        flagged = [table for table in scanned_tables(plan) if table in self.flag_tables]
+        params_text = format_params(sql, params)
+        elapsed_ms = elapsed * 1000
+
+        logger.warning(
+            'Slow query (%.1f ms, %s, %s): %s params=%s%s',
+            elapsed_ms, connection.alias, view, sql, params_text,
+            ''.join(f'\n  plan: {detail}' for detail in plan),
+        )
+        self.shapes.add(normalize_sql(sql), sql, params_text, elapsed_ms, view, plan, flagged)
+
+
+_query_log = None
+_query_log_lock = threading.Lock()
+
+
+def get_query_log():
+    """The process-wide slow-query log, or None when it is disabled."""
+    global _query_log
+    options = get_query_log_settings()
+    if not options['ENABLED']:
+        return None
+    with _query_log_lock:
+        if _query_log is None:
+            _query_log = SlowQueryLog(options)
+    return _query_log
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """connection_created handler that adds the timing wrapper when enabled."""
+    query_log = get_query_log()
+    if query_log is not None and query_log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_log)
@@ -0,0 +1,116 @@
+"""
+Database routers.
+
+SystemAppsRouter keeps Django's own apps (sessions, auth, admin, contenttypes)
+in the 'system' database so their writes do not contend with inventory tables.
+
+ReadReplicaRouter sends ORM reads to the read-only 'reader' alias, but only
+while a view decorated with @read_only_db is running. Everything else,
+including all writes and the generation path, stays on 'default'.
+"""
+
+import functools
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+READ_ALIAS = 'reader'
+SYSTEM_ALIAS = 'system'
+SYSTEM_APPS = {'admin', 'auth', 'contenttypes', 'sessions'}
+
+_read_only = ContextVar('inventory_read_only_db', default=False)
+
+
+def read_db_alias():
+    """
+    Return the read-only alias, or 'default' when it is not configured.
+    Use with QuerySet.using() for querysets evaluated after the view returns,
+    such as streamed responses and template-rendered listings.
+    """
+    if READ_ALIAS in connections.settings:
+        return READ_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+def read_only_db(view_func):
+    """
+    Decorator for views that only read from the database.
+    ORM reads made while the view runs are routed to the read-only alias.
+    """
+    if iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapper(*args, **kwargs):
+            token = _read_only.set(True)
+            try:
+                return await view_func(*args, **kwargs)
+            finally:
+                _read_only.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view_func)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+def system_db_alias():
+    """Return the system alias, or 'default' when it is not configured."""
+    if SYSTEM_ALIAS in connections.settings:
+        return SYSTEM_ALIAS
+    return DEFAULT_DB_ALIAS
+
+
+class SystemAppsRouter:
+    """Routes Django's built-in apps to the 'system' alias."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in SYSTEM_APPS:
+            return system_db_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in SYSTEM_APPS:
+            return system_db_alias()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label in SYSTEM_APPS and obj2._meta.app_label in SYSTEM_APPS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label in SYSTEM_APPS:
+            return db == system_db_alias()
+        if db == SYSTEM_ALIAS:
+            return False
+        return None
+
+
+class ReadReplicaRouter:
+    """Routes reads from @read_only_db views to the 'reader' alias."""
+
+    def db_for_read(self, model, **hints):
+        if _read_only.get():
+            return read_db_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same database file
+        databases = {DEFAULT_DB_ALIAS, READ_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_ALIAS:
+            return False
+        return None
@@ -0,0 +1,266 @@
+"""
+Scan ingest: part/quantity scans parsed one at a time as they arrive.
+
+A ScanStreamParser is a two-state machine (expecting a part, expecting a
+quantity) fed one scan at a time. Each scan completes at most a pair or two,
+so nothing waits for the whole block. A missing quantity does not shift
+every later line the way strict alternation did. The pair is reported as
+invalid and parsing carries on.
+
+GS1-128 and GS1 DataMatrix compound barcodes carry part and quantity in one
+scan: AI 240 (additional product identification) for the part, and AI 30
+(variable count) or AI 37 (count of trade items) for the quantity. A scan is
+read as GS1 when it starts with a GS1 symbology identifier (]C1, ]d2, ]Q3,
+]e0; enable AIM IDs on the scanner), uses the bracketed (240)...(30)...
+form starting with a known AI, or contains the FNC1 separator. Bracketed
+values get the same length checks as raw ones.
+
+Part and quantity patterns come from settings.SCAN_PARSER. They are
+compiled once per pattern and matched against the whole scan.
+"""
+
+import functools
+import re
+
+from django.conf import settings
+
+
+GS1_SYMBOLOGY_IDS = (']C1', ']d2', ']Q3', ']e0')
+
+AI_PART = '240'
+AI_QUANTITIES = ('30', '37')
+
+# Application identifiers a compound scan may carry: AI -> (data length,
+# fixed). Only fixed-length data may run into the next AI without a separator.
+GS1_AIS = {
+    '00': (18, True), '01': (14, True), '02': (14, True),
+    '10': (20, False), '11': (6, True), '12': (6, True), '13': (6, True),
+    '15': (6, True), '16': (6, True), '17': (6, True), '20': (2, True),
+    '21': (20, False), '22': (20, False), '240': (30, False), '241': (30, False),
+    '250': (30, False), '30': (8, False), '37': (8, False), '400': (30, False),
+    '410': (13, True), '411': (13, True), '412': (13, True), '413': (13, True),
+    '414': (13, True), '415': (13, True), '420': (20, False), '90': (30, False),
+}
+# 31nn-36nn measures: a four-digit AI (the last digit is the decimal point
+# position) and six digits of data
+GS1_MEASURE_PREFIXES = ('31', '32', '33', '34', '35', '36')
+
+BRACKETED_AI_RE = re.compile(r'\((\d{2,4})\)([^(]*)')
+
+
+def get_scan_settings():
+    defaults = {
+        'PART_PATTERN': r'\S.*',
+        'QUANTITY_PATTERN': r'0*[1-9][0-9]{0,5}',
+        'GS1': True,
+        'GS1_SEPARATOR': '\x1d',
+    }
+    defaults.update(getattr(settings, 'SCAN_PARSER', {}))
+    return defaults
+
+
+@functools.lru_cache(maxsize=32)
+def compiled_pattern(pattern):
+    return re.compile(pattern)
+
+
+def is_ascii_digits(text):
+    # str.isdigit() also accepts characters such as '²' that int() rejects
+    return text.isascii() and text.isdecimal()
+
+
+def match_pattern(pattern, value):
+    return compiled_pattern(pattern).fullmatch(value) is not None
+
+
+class GS1Error(ValueError):
+    """A scan looked like GS1 but could not be decoded."""
+
+
+def _ai_definition(ai):
+    """(data length, fixed) for an AI a compound scan may carry, or None."""
+    if len(ai) == 4 and ai.isdigit() and ai[:2] in GS1_MEASURE_PREFIXES:
+        return 6, True
+    return GS1_AIS.get(ai)
+
+
+def looks_like_gs1(scan, separator='\x1d'):
+    if scan.startswith(GS1_SYMBOLOGY_IDS) or separator in scan:
+        return True
+    # A part number may start with "(": only a known AI makes it bracketed GS1
+    match = BRACKETED_AI_RE.match(scan)
+    return match is not None and _ai_definition(match.group(1)) is not None
+
+
+def _ai_at(data, position):
+    """The AI starting at position and its (data length, fixed) definition."""
+    if data[position:position + 2] in GS1_MEASURE_PREFIXES:
+        return data[position:position + 4], (6, True)
+    for length in (2, 3):
+        ai = data[position:position + length]
+        if ai in GS1_AIS:
+            return ai, GS1_AIS[ai]
+    raise GS1Error(f'Unknown GS1 application identifier at "{data[position:position + 4]}"')
+
+
+def _check_length(ai, value, length, fixed):
+    if fixed and len(value) != length:
+        raise GS1Error(f'AI ({ai}) needs {length} characters')
+    if not fixed and not 1 <= len(value) <= length:
+        raise GS1Error(f'AI ({ai}) needs 1 to {length} characters')
+
+
+def parse_gs1(scan, separator='\x1d'):
+    """
+    Decode a GS1 element string into {AI: data}.
+
+    Args:
+        scan (str): The scan, with or without a symbology identifier, in
+            raw (FNC1-separated) or bracketed form
+        separator (str): The character the scanner sends for FNC1
+
+    Raises:
+        GS1Error: unknown AI, or data of the wrong length
+    """
+    if scan.startswith(GS1_SYMBOLOGY_IDS):
+        scan = scan[3:]
+    if scan.startswith('('):
+        elements = {}
+        for ai, value in BRACKETED_AI_RE.findall(scan):
+            definition = _ai_definition(ai)
+            if definition is None:
+                raise GS1Error(f'Unknown GS1 application identifier ({ai})')
+            value = value.strip(separator)
+            _check_length(ai, value, *definition)
+            elements[ai] = value
+        return elements
+
+    elements = {}
+    data = scan.lstrip(separator)
+    position = 0
+    while position < len(data):
+        ai, (length, fixed) = _ai_at(data, position)
+        position += len(ai)
+        if fixed:
+            value = data[position:position + length]
+            if separator in value:
+                raise GS1Error(f'AI ({ai}) needs {length} characters')
+            position += length
+        else:
+            end = data.find(separator, position)
+            end = len(data) if end < 0 else end
+            value = data[position:end]
+            position = end
+        _check_length(ai, value, length, fixed)
+        elements[ai] = value
+        while data[position:position + 1] == separator:
+            position += 1
+    return elements
+
+
+class ScanStreamParser:
+    """
+    Turns a stream of scans into part/quantity pairs.
+
+    feed() takes one scan and returns the pairs it completed (usually none
+    or one). finish() flushes a part still waiting for its quantity.
+    """
+
+    EXPECT_PART = 'part'
+    EXPECT_QUANTITY = 'quantity'
+
+    def __init__(self, options=None):
+        self.options = dict(get_scan_settings(), **(options or {}))
+        self.state = self.EXPECT_PART
+        self.pending_part = None
+        self.pending_source = None
+
+    def validate_pair(self, part_number, quantity_text, source='scan'):
+        """
+        A pair dict: {'part_number', 'quantity', 'valid', 'error', 'source'}.
+        """
+        part_number = (part_number or '').strip()
+        quantity_text = str(quantity_text if quantity_text is not None else '').strip()
+        error = None
+        quantity = int(quantity_text) if is_ascii_digits(quantity_text) else None
+        if not match_pattern(self.options['PART_PATTERN'], part_number):
+            error = 'Invalid part number format'
+        elif quantity is None or not match_pattern(self.options['QUANTITY_PATTERN'], quantity_text):
+            error = f'Invalid quantity: {quantity_text}' if quantity_text else 'Missing quantity'
+        return {
+            'part_number': part_number,
+            'quantity': quantity,
+            'valid': error is None,
+            'error': error,
+            'source': source,
+        }
+
+    def _take_pending(self, quantity_text=''):
+        pair = self.validate_pair(self.pending_part, quantity_text, self.pending_source)
+        self.pending_part = self.pending_source = None
+        self.state = self.EXPECT_PART
+        return pair
+
+    def _feed_gs1(self, scan):
+        try:
+            elements = parse_gs1(scan, self.options['GS1_SEPARATOR'])
+        except GS1Error as e:
+            return [{
+                'part_number': scan, 'quantity': None, 'valid': False, 'error': str(e), 'source': 'gs1',
+            }]
+        part = elements.get(AI_PART)
+        quantity = next((elements[ai] for ai in AI_QUANTITIES if ai in elements), None)
+
+        if part is None and quantity is None:
+            return [{
+                'part_number': scan, 'quantity': None, 'valid': False,
+                'error': 'GS1 barcode has no part number (240) or quantity (30/37)', 'source': 'gs1',
+            }]
+        if part is None:
+            # A GS1 quantity on its own answers the part before it
+            if self.state == self.EXPECT_QUANTITY:
+                return [self._take_pending(quantity)]
+            return [self.validate_pair('', quantity, 'gs1')]
+
+        completed = []
+        if self.state == self.EXPECT_QUANTITY:
+            completed.append(self._take_pending())
+        if quantity is None:
+            self.pending_part, self.pending_source = part, 'gs1'
+            self.state = self.EXPECT_QUANTITY
+        else:
+            completed.append(self.validate_pair(part, quantity, 'gs1'))
+        return completed
+
+    def feed(self, scan):
+        """
+        Args:
+            scan (str): One scan, as read from the scanner
+
+        Returns:
+            list: pair dicts completed by this scan
+        """
+        scan = (scan or '').strip('\r\n\t ')
+        if not scan:
+            return []
+        if self.options['GS1'] and looks_like_gs1(scan, self.options['GS1_SEPARATOR']):
+            return self._feed_gs1(scan)
+
+        if self.state == self.EXPECT_PART:
+            self.pending_part, self.pending_source = scan, 'scan'
+            self.state = self.EXPECT_QUANTITY
+            return []
+
+        if is_ascii_digits(scan) or not match_pattern(self.options['PART_PATTERN'], scan):
+            return [self._take_pending(scan)]
+        # A part where the quantity should be: the last part had no quantity
+        completed = [self._take_pending()]
+        self.pending_part, self.pending_source = scan, 'scan'
+        self.state = self.EXPECT_QUANTITY
+        return completed
+
+    def finish(self):
+        """Pairs left at the end of the stream: a part with no quantity."""
+        if self.state == self.EXPECT_QUANTITY:
+            return [self._take_pending()]
+        return []
@@ -0,0 +1,399 @@
+"""
+Printer pool scheduler (settings.PRINTER_POOLS).
+
+A pool is a group of network printers (NETWORK_PRINTERS names) with their
+relative speeds. A serial range is split into one contiguous chunk per
+printer, sized by speed, so each roll comes out in serial order.
+
+Each printer then pulls its labels LABELS_PER_WRITE at a time, so a slow
+printer is only handed more work as its buffer drains. When a printer runs
+out of work it takes the tail of the printer with the most time left, judged
+by the rate each has actually printed at. A printer that fails hands all its
+unprinted labels to the others. A stolen tail is contiguous too, so a roll is
+at most a few ascending runs of serials.
+
+Labels in a write that failed part-way are printed again elsewhere, so a
+failure can duplicate up to LABELS_PER_WRITE labels but never loses one.
+"""
+
+import itertools
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .netprint import ENCODING, get_network_printers, get_transport
+from .services import LabelTemplateService
+
+
+KEEP_RUNS = 20
+
+
+def get_printer_pools():
+    """PRINTER_POOLS: {pool name: {network printer name: relative speed}}."""
+    return getattr(settings, 'PRINTER_POOLS', {})
+
+
+def split_range(first, last, speeds):
+    """
+    Split first..last into contiguous chunks proportional to speed.
+
+    Args:
+        first (int): First serial number
+        last (int): Last serial number (inclusive)
+        speeds (list): (printer, relative speed) pairs, in roll order
+
+    Returns:
+        list: (printer, first, last) chunks; printers with no labels are left out
+    """
+    count = last - first + 1
+    total_speed = sum(speed for _, speed in speeds)
+    exact = [count * speed / total_speed for _, speed in speeds]
+    sizes = [int(share) for share in exact]
+    # The labels lost to rounding go to the largest remainders
+    by_remainder = sorted(range(len(speeds)), key=lambda i: exact[i] - sizes[i], reverse=True)
+    for i in by_remainder[:count - sum(sizes)]:
+        sizes[i] += 1
+
+    chunks = []
+    start = first
+    for (printer, _), size in zip(speeds, sizes):
+        if size:
+            chunks.append((printer, start, start + size - 1))
+            start += size
+    return chunks
+
+
+class PrinterAssignment:
+    """The serials one printer of a pool has been given, and its progress."""
+
+    def __init__(self, printer, speed, per_write):
+        self.printer = printer
+        self.speed = speed
+        self.per_write = max(1, int(per_write))
+        self.next = 0
+        self.end = -1
+        self.confirmed_to = 0
+        self.segments = []
+        self.sent = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+
+    @property
+    def remaining(self):
+        return max(0, self.end - self.next + 1)
+
+    def assign(self, first, last):
+        self.next = self.confirmed_to = first
+        self.end = last
+        self.segments.append([first, last])
+        # A printer that ran out and then took over another's tail is busy again
+        self.finished = None
+
+    def rate(self, now):
+        """Labels per second printed so far, or None before the first write."""
+        if not self.sent or self.started is None or now <= self.started:
+            return None
+        return self.sent / (now - self.started)
+
+
+class PoolSchedule:
+    """
+    Hands out labels to the printers of a pool and moves work between them.
+    All methods are thread safe; each printer's sender calls take() for its
+    next write and confirm() once the write has gone out.
+    """
+
+    def __init__(self, printers, first, last, clock=time.monotonic):
+        """
+        Args:
+            printers (list): (name, relative speed, labels per write) in roll order
+            first (int): First serial number
+            last (int): Last serial number (inclusive)
+        """
+        self.clock = clock
+        self.first = first
+        self.last = last
+        self.lock = threading.Lock()
+        self.assignments = {name: PrinterAssignment(name, speed, per_write) for name, speed, per_write in printers}
+        self.reassignments = []
+        for name, chunk_first, chunk_last in split_range(first, last, [(name, speed) for name, speed, _ in printers]):
+            self.assignments[name].assign(chunk_first, chunk_last)
+
+    def take(self, printer):
+        """
+        The next serial numbers for a printer to send, taking over another
+        printer's tail when its own are used up. Empty when there is no
+        work left for it.
+        """
+        with self.lock:
+            assignment = self.assignments[printer]
+            if assignment.error is not None:
+                return range(0)
+            if assignment.remaining == 0 and not self._steal_for(assignment):
+                if assignment.finished is None:
+                    assignment.finished = self.clock()
+                return range(0)
+            if assignment.started is None:
+                assignment.started = self.clock()
+            count = min(assignment.per_write, assignment.remaining)
+            numbers = range(assignment.next, assignment.next + count)
+            assignment.next += count
+            return numbers
+
+    def confirm(self, printer, count):
+        """Record that a printer's oldest count unconfirmed labels were sent."""
+        with self.lock:
+            assignment = self.assignments[printer]
+            assignment.sent += count
+            assignment.confirmed_to += count
+
+    def fail(self, printer, error):
+        """
+        Take a printer out of the pool. Labels it was given but did not
+        confirm become available to the other printers.
+        """
+        with self.lock:
+            assignment = self.assignments[printer]
+            assignment.error = str(error)
+            assignment.next = assignment.confirmed_to
+            assignment.finished = self.clock()
+
+    def unassigned(self):
+        """Labels left with failed printers."""
+        with self.lock:
+            return sum(a.remaining for a in self.assignments.values() if a.error is not None)
+
+    def healthy_printers(self):
+        with self.lock:
+            return [name for name, a in self.assignments.items() if a.error is None]
+
+    def _time_left(self, assignment, now):
+        rate = assignment.rate(now)
+        return assignment.remaining / (rate or assignment.speed)
+
+    def _steal_for(self, thief):
+        now = self.clock()
+        victims = [a for a in self.assignments.values() if a is not thief and a.remaining > 0]
+        if not victims:
+            return False
+
+        failed = [a for a in victims if a.error is not None]
+        if failed:
+            # Everything a failed printer had left
+            victim = failed[0]
+            take = victim.remaining
+        else:
+            victim = max(victims, key=lambda a: self._time_left(a, now))
+            thief_rate = thief.rate(now)
+            victim_rate = victim.rate(now)
+            if thief_rate is None or victim_rate is None:
+                thief_rate, victim_rate = thief.speed, victim.speed
+            # Split what is left so both should finish together
+            take = int(victim.remaining * thief_rate / (thief_rate + victim_rate))
+            if take < thief.per_write or victim.remaining - take < 1:
+                return False
+
+        new_first = victim.end - take + 1
+        new_last = victim.end
+        victim.end = new_first - 1
+        segment = victim.segments[-1]
+        segment[1] = victim.end
+        if segment[1] < segment[0]:
+            victim.segments.pop()
+        thief.assign(new_first, new_last)
+        self.reassignments.append({
+            'from': victim.printer,
+            'to': thief.printer,
+            'first': new_first,
+            'last': new_last,
+            'count': take,
+            'failed': victim.error is not None,
+        })
+        return True
+
+    def report(self, serial_digits):
+        now = self.clock()
+        with self.lock:
+            printers = []
+            for assignment in self.assignments.values():
+                elapsed = ((assignment.finished or now) - assignment.started) if assignment.started else 0.0
+                printers.append({
+                    'printer': assignment.printer,
+                    'speed': assignment.speed,
+                    'sent': assignment.sent,
+                    'remaining': assignment.remaining,
+                    'segments': [
+                        [str(first).zfill(serial_digits), str(last).zfill(serial_digits)]
+                        for first, last in assignment.segments
+                    ],
+                    'seconds': round(elapsed, 3),
+                    'labels_per_second': round(assignment.sent / elapsed, 1) if elapsed else None,
+                    'error': assignment.error,
+                })
+            return {
+                'total': self.last - self.first + 1,
+                'sent': sum(a.sent for a in self.assignments.values()),
+                'printers': printers,
+                'reassignments': [
+                    dict(move, first=str(move['first']).zfill(serial_digits), last=str(move['last']).zfill(serial_digits))
+                    for move in self.reassignments
+                ],
+            }
+
+
+class LabelRun:
+    """The labels a pool prints: a contiguous serial range of one part."""
+
+    def __init__(self, template, part_number, upc, serial_digits):
+        self.template = template
+        self.part_number = part_number
+        self.upc = upc
+        self.serial_digits = serial_digits
+
+    def zpl(self, numbers):
+        serials = [str(number).zfill(self.serial_digits) for number in numbers]
+        return LabelTemplateService.render_many(self.template, serials, self.part_number, self.upc)
+
+
+def job_streams(schedule, labels):
+    """
+    The initial per-printer jobs of a schedule as ZPL documents, for
+    printing without the scheduler (no work is moved between printers).
+    """
+    streams = []
+    for name, assignment in schedule.assignments.items():
+        if assignment.remaining:
+            numbers = range(assignment.next, assignment.end + 1)
+            streams.append({
+                'printer': name,
+                'first_serial': str(numbers[0]).zfill(labels.serial_digits),
+                'last_serial': str(numbers[-1]).zfill(labels.serial_digits),
+                'count': len(numbers),
+                'zpl': labels.zpl(numbers),
+            })
+    return streams
+
+
+def zpl_chunks(schedule, printer, labels):
+    """A printer's job stream: (ZPL bytes, label count) for each write."""
+    while True:
+        numbers = schedule.take(printer)
+        if not numbers:
+            return
+        yield labels.zpl(numbers).encode(ENCODING), len(numbers)
+
+
+def run_pool(schedule, labels, transport):
+    """
+    Print a schedule on its printers, one sending thread per printer, until
+    every label is sent or no printer is left working.
+    """
+    def send(printer):
+        sent = 0
+
+        def progress(total_sent):
+            nonlocal sent
+            schedule.confirm(printer, total_sent - sent)
+            sent = total_sent
+
+        try:
+            transport.pool(printer).send(zpl_chunks(schedule, printer, labels), progress)
+        except Exception as e:
+            # Any error, not only NetworkPrintError, hands the printer's
+            # unconfirmed labels back to the others
+            schedule.fail(printer, e)
+
+    printers = schedule.healthy_printers()
+    while printers:
+        threads = [threading.Thread(target=send, args=(printer,), daemon=True) for printer in printers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # A printer that failed after the others finished left work behind
+        printers = schedule.healthy_printers() if schedule.unassigned() else []
+
+
+def build_schedule(pool_name, first, last):
+    """
+    A schedule for a configured pool.
+
+    Raises:
+        ValueError: unknown pool, or a pool printer missing from NETWORK_PRINTERS
+    """
+    pools = get_printer_pools()
+    if pool_name not in pools:
+        raise ValueError(f'Unknown printer pool: {pool_name}')
+    network_printers = get_network_printers()
+    printers = []
+    for name, speed in pools[pool_name].items():
+        if name not in network_printers:
+            raise ValueError(f'Printer {name} in pool {pool_name} is not in NETWORK_PRINTERS')
+        if speed <= 0:
+            raise ValueError(f'Printer {name} in pool {pool_name} needs a positive speed')
+        printers.append((name, float(speed), network_printers[name]['LABELS_PER_WRITE']))
+    return PoolSchedule(printers, first, last)
+
+
+class PoolRuns:
+    """Pool print runs in this process, the most recent KEEP_RUNS kept."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = {}
+        self._order = itertools.count()
+
+    def start(self, pool_name, schedule, labels, transport=None):
+        """Print a schedule in a background thread; returns the run ID."""
+        run_id = uuid.uuid4().hex
+        run = {
+            'id': run_id,
+            'pool': pool_name,
+            'schedule': schedule,
+            'labels': labels,
+            'status': 'printing',
+            'error': None,
+            'started_at': timezone.now(),
+            'order': next(self._order),
+        }
+        with self._lock:
+            self._runs[run_id] = run
+            if len(self._runs) > KEEP_RUNS:
+                oldest = min(self._runs.values(), key=lambda r: r['order'])
+                del self._runs[oldest['id']]
+
+        def target():
+            try:
+                run_pool(schedule, labels, transport or get_transport())
+            except Exception as e:
+                # Otherwise the run would show as printing forever
+                run['error'] = str(e) or e.__class__.__name__
+                run['status'] = 'failed'
+                return
+            run['status'] = 'completed' if schedule.report(labels.serial_digits)['sent'] >= (
+                schedule.last - schedule.first + 1
+            ) else 'failed'
+
+        threading.Thread(target=target, daemon=True).start()
+        return run_id
+
+    def status(self, run_id):
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is None:
+            return None
+        return dict(
+            run['schedule'].report(run['labels'].serial_digits),
+            id=run['id'],
+            pool=run['pool'],
+            status=run['status'],
+            error=run['error'],
+            started_at=run['started_at'].isoformat(),
+        )
+
+
+pool_runs = PoolRuns()
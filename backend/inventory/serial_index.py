@@ -0,0 +1,432 @@
+"""
+Optional in-memory serial index.
+
+Holds every generated serial (hot and archived) in compact parallel arrays so
+that serial -> (part, upc) is answered without SQLite, with a Bloom filter in
+front so mis-scans are rejected in a few hash operations. Enabled with
+settings.SERIAL_INDEX['ENABLED'].
+
+The index follows new serials in two ways: generation in this process adds
+them on commit, and other processes' serials are picked up by an incremental
+sync on the change_seq index at most every SYNC_INTERVAL seconds. Because of
+that interval a miss on a serial that could have been generated since the
+last sync (numeric, as wide as the newest serial and above every indexed
+number) is confirmed with a sync first. Any other miss is final without a
+query.
+"""
+
+import hashlib
+import math
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import ArchivedSerialNumber, SerialNumber
+
+
+MAX_NUMERIC_KEY = 2 ** 64 - 1
+LOAD_CHUNK_SIZE = 5000
+
+
+def get_index_settings():
+    defaults = {
+        'ENABLED': False,
+        'SYNC_INTERVAL': 5,
+        'BLOOM_ERROR_RATE': 0.01,
+    }
+    defaults.update(getattr(settings, 'SERIAL_INDEX', {}))
+    return defaults
+
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter using double hashing over one blake2b digest.
+    No false negatives; false positives at roughly error_rate when holding
+    up to capacity items.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def memory_bytes(self):
+        return len(self.bits)
+
+
+class SerialIndex:
+    """
+    Sorted parallel arrays of serial keys with interned part/UPC tables.
+
+    Numeric serials are stored as (integer value, digit count) so "000500"
+    and "500" stay distinct; anything else goes into a small fallback dict.
+    """
+
+    def __init__(self, error_rate=0.01):
+        self.error_rate = error_rate
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.keys = array('Q')
+        self.widths = array('B')
+        self.part_ids = array('I')
+        self.upc_ids = array('I')
+        self.parts = []
+        self.part_lookup = {}
+        # UPC id 0 means "no UPC"
+        self.upcs = [None]
+        self.upc_lookup = {None: 0}
+        self.other = {}
+        self.bloom = BloomFilter(1, self.error_rate)
+        self.last_seq = 0
+        # Digit count of the serial with the highest change_seq
+        self.newest_width = None
+        self.last_sync = 0.0
+        self.loaded = False
+
+    # -- encoding -----------------------------------------------------------
+
+    @staticmethod
+    def _encode(serial_number):
+        """Return (key, width) for a numeric serial, or None."""
+        if serial_number.isdigit() and len(serial_number) < 256:
+            key = int(serial_number)
+            if key <= MAX_NUMERIC_KEY:
+                return key, len(serial_number)
+        return None
+
+    def _intern(self, table, lookup, value):
+        index = lookup.get(value)
+        if index is None:
+            index = len(table)
+            table.append(value)
+            lookup[value] = index
+        return index
+
+    def _find(self, key, width):
+        """Position of (key, width) in the arrays, or -1."""
+        position = bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.widths[position] == width:
+                return position
+            position += 1
+        return -1
+
+    def __len__(self):
+        return len(self.keys) + len(self.other)
+
+    # -- building -----------------------------------------------------------
+
+    def _append_unsorted(self, serial_number, part_number, upc):
+        encoded = self._encode(serial_number)
+        part_id = self._intern(self.parts, self.part_lookup, part_number)
+        upc_id = self._intern(self.upcs, self.upc_lookup, upc)
+        if encoded is None:
+            self.other[serial_number] = (part_id, upc_id)
+        else:
+            self.keys.append(encoded[0])
+            self.widths.append(encoded[1])
+            self.part_ids.append(part_id)
+            self.upc_ids.append(upc_id)
+
+    def _sort(self):
+        """Restore (key, width) order after an unordered bulk append."""
+        keys, widths = self.keys, self.widths
+        if all(
+            (keys[i - 1], widths[i - 1]) <= (keys[i], widths[i])
+            for i in range(1, len(keys))
+        ):
+            return
+        order = sorted(range(len(keys)), key=lambda i: (keys[i], widths[i]))
+        self.keys = array('Q', (keys[i] for i in order))
+        self.widths = array('B', (widths[i] for i in order))
+        self.part_ids = array('I', (self.part_ids[i] for i in order))
+        self.upc_ids = array('I', (self.upc_ids[i] for i in order))
+
+    def _rebuild_bloom(self):
+        # Leave headroom so generation can add serials without an early rebuild
+        capacity = max(len(self) * 2, 100000)
+        bloom = BloomFilter(capacity, self.error_rate)
+        widths = self.widths
+        for i, key in enumerate(self.keys):
+            bloom.add(str(key).zfill(widths[i]))
+        for serial_number in self.other:
+            bloom.add(serial_number)
+        self.bloom = bloom
+
+    def load(self):
+        """Load every hot and archived serial from the database."""
+        with self._lock:
+            self._reset()
+            last_seq = 0
+            newest = None
+            for model in (ArchivedSerialNumber, SerialNumber):
+                rows = model.objects.order_by().values_list(
+                    'serial_number', 'part_number_id', 'upc', 'change_seq'
+                ).iterator(chunk_size=LOAD_CHUNK_SIZE)
+                for serial_number, part_number, upc, change_seq in rows:
+                    self._append_unsorted(serial_number, part_number, upc)
+                    if change_seq and change_seq > last_seq:
+                        last_seq, newest = change_seq, serial_number
+            self._sort()
+            self._rebuild_bloom()
+            self.last_seq = last_seq
+            self.newest_width = len(newest) if newest else None
+            self.last_sync = time.monotonic()
+            self.loaded = True
+
+    def add(self, serial_number, part_number, upc, change_seq=None):
+        """Add one serial, keeping the arrays sorted."""
+        with self._lock:
+            encoded = self._encode(serial_number)
+            if encoded is not None and self._find(*encoded) >= 0:
+                return
+            if encoded is None and serial_number in self.other:
+                return
+
+            part_id = self._intern(self.parts, self.part_lookup, part_number)
+            upc_id = self._intern(self.upcs, self.upc_lookup, upc)
+            if encoded is None:
+                self.other[serial_number] = (part_id, upc_id)
+            else:
+                key, width = encoded
+                if not self.keys or (self.keys[-1], self.widths[-1]) < (key, width):
+                    # Generation hands out increasing serials, so this is the usual path
+                    self.keys.append(key)
+                    self.widths.append(width)
+                    self.part_ids.append(part_id)
+                    self.upc_ids.append(upc_id)
+                else:
+                    position = bisect_left(self.keys, key)
+                    while (position < len(self.keys) and self.keys[position] == key
+                           and self.widths[position] < width):
+                        position += 1
+                    self.keys.insert(position, key)
+                    self.widths.insert(position, width)
+                    self.part_ids.insert(position, part_id)
+                    self.upc_ids.insert(position, upc_id)
+
+            if self.bloom.count >= self.bloom.capacity:
+                self._rebuild_bloom()
+            else:
+                self.bloom.add(serial_number)
+            if change_seq and change_seq > self.last_seq:
+                self.last_seq = change_seq
+                self.newest_width = len(serial_number)
+
+    def sync(self):
+        """Pick up serials generated by other processes since the last sync."""
+        # Read outside the lock so lookups on other threads don't wait for
+        # the query; add() skips serials a concurrent sync already added
+        rows = list(
+            SerialNumber.objects.filter(change_seq__gt=self.last_seq).order_by('change_seq')
+            .values_list('serial_number', 'part_number_id', 'upc', 'change_seq')
+        )
+        with self._lock:
+            for serial_number, part_number, upc, change_seq in rows:
+                self.add(serial_number, part_number, upc, change_seq)
+            self.last_sync = time.monotonic()
+
+    def may_be_new(self, serial_number):
+        """
+        Whether a serial the index did not find could have been generated
+        since the last sync: numeric, as wide as the newest serial, and above
+        every indexed number. Anything else is a mis-scan.
+        """
+        encoded = self._encode(serial_number)
+        if encoded is None:
+            return False
+        key, width = encoded
+        with self._lock:
+            if self.newest_width is not None and width != self.newest_width:
+                return False
+            return not self.keys or key > self.keys[-1]
+
+    def confirm(self, serial_number):
+        """
+        Check a serial the index did not find, after a sync.
+
+        The index can be up to SYNC_INTERVAL behind serials generated by other
+        processes; reading the change_seq tail first makes the miss final.
+        Serials that cannot be new (see may_be_new) are not synced for.
+        """
+        if not self.may_be_new(serial_number):
+            return False
+        self.sync()
+        return serial_number in self
+
+    def sync_if_stale(self, interval):
+        if time.monotonic() - self.last_sync >= interval:
+            self.sync()
+
+    # -- queries ------------------------------------------------------------
+
+    def get(self, serial_number):
+        """
+        Look up a serial.
+
+        Returns:
+            tuple or None: (part_number, upc), or None when the serial is unknown
+        """
+        if serial_number not in self.bloom:
+            return None
+        with self._lock:
+            encoded = self._encode(serial_number)
+            if encoded is None:
+                ids = self.other.get(serial_number)
+                if ids is None:
+                    return None
+                part_id, upc_id = ids
+            else:
+                position = self._find(*encoded)
+                if position < 0:
+                    return None
+                part_id, upc_id = self.part_ids[position], self.upc_ids[position]
+            return self.parts[part_id], self.upcs[upc_id]
+
+    def __contains__(self, serial_number):
+        return self.get(serial_number) is not None
+
+    def memory_usage(self):
+        """Approximate bytes held by the index, total and per million serials."""
+        arrays = sum(
+            values.itemsize * len(values)
+            for values in (self.keys, self.widths, self.part_ids, self.upc_ids)
+        )
+        tables = sum(sys.getsizeof(value) for value in self.parts + self.upcs[1:])
+        tables += sys.getsizeof(self.part_lookup) + sys.getsizeof(self.upc_lookup)
+        other = sys.getsizeof(self.other) + sum(
+            sys.getsizeof(serial_number) for serial_number in self.other
+        )
+        bloom = self.bloom.memory_bytes()
+        total = arrays + tables + other + bloom
+        count = len(self)
+        return {
+            'serials': count,
+            'arrays_bytes': arrays,
+            'tables_bytes': tables + other,
+            'bloom_bytes': bloom,
+            'total_bytes': total,
+            'bytes_per_million': int(total / count * 1000000) if count else 0,
+        }
+
+    def check(self, sample_limit=10):
+        """
+        Compare the index against the database.
+
+        Returns:
+            dict: {
+                'ok': bool,
+                'db_count': int,
+                'index_count': int,
+                'missing': [serials in the database but not the index],
+                'mismatched': [serials whose part/UPC differ]
+            }
+        """
+        missing = []
+        mismatched = []
+        missing_count = 0
+        mismatched_count = 0
+        db_count = 0
+        for model in (ArchivedSerialNumber, SerialNumber):
+            rows = model.objects.order_by().values_list(
+                'serial_number', 'part_number_id', 'upc'
+            ).iterator(chunk_size=LOAD_CHUNK_SIZE)
+            for serial_number, part_number, upc in rows:
+                db_count += 1
+                entry = self.get(serial_number)
+                if entry is None:
+                    missing_count += 1
+                    if len(missing) < sample_limit:
+                        missing.append(serial_number)
+                elif entry != (part_number, upc):
+                    mismatched_count += 1
+                    if len(mismatched) < sample_limit:
+                        mismatched.append(serial_number)
+
+        index_count = len(self)
+        return {
+            'ok': not missing_count and not mismatched_count and db_count == index_count,
+            'db_count': db_count,
+            'index_count': index_count,
+            'missing_count': missing_count,
+            'mismatched_count': mismatched_count,
+            'missing': missing,
+            'mismatched': mismatched,
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_serial_index():
+    """
+    Return the process-wide index, loading it on first use.
+    Returns None when the index is disabled.
+    """
+    global _index
+    config = get_index_settings()
+    if not config['ENABLED']:
+        return None
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SerialIndex(error_rate=config['BLOOM_ERROR_RATE'])
+                index.load()
+                _index = index
+    else:
+        _index.sync_if_stale(config['SYNC_INTERVAL'])
+    return _index
+
+
+async def aget_serial_index():
+    """
+    Async version of get_serial_index(). Only the first load and the
+    periodic sync touch the database; those run in a worker thread.
+    """
+    config = get_index_settings()
+    if not config['ENABLED']:
+        return None
+    if _index is not None and time.monotonic() - _index.last_sync < config['SYNC_INTERVAL']:
+        return _index
+    return await sync_to_async(get_serial_index)()
+
+
+def index_generated_serials(serials, part_number, upc, first_seq):
+    """Add freshly generated serials to the index if it is loaded."""
+    if _index is None:
+        return
+    for offset, serial_number in enumerate(serials):
+        _index.add(serial_number, part_number, upc, first_seq + offset)
@@ -3,9 +3,16 @@ Service layer for business logic.
 Handles serial number generation, bulk processing, and printing coordination.
 """
 
+import time
+
 from django.db import transaction
 from django.db.models import F
-from .models import Product, SerialNumber, Config
+from .models import Product, SerialNumber, Config, GenerationBatch
+from .feed import ChangeFeedService
+from .serial_index import index_generated_serials
+from .scans import ScanStreamParser, get_scan_settings, match_pattern
+from .events import publish_generated
+from .metrics import GENERATE_LOCK_WAIT, GENERATE_TRANSACTION, SERIALS_GENERATED
 
 
 class SerialNumberGenerator:
@@ -26,20 +33,33 @@ class SerialNumberGenerator:
         )
         return config
     
+    @staticmethod
+    async def aget_config():
+        """Async version of get_config() for async views."""
+        config, created = await Config.objects.aget_or_create(
+            pk=1,
+            defaults={
+                'serial_start': 500,
+                'serial_digits': 6,
+                'current_serial': 500
+            }
+        )
+        return config
+    
     @staticmethod
     def format_serial(number, digit_count):
         """Format a number with leading zeros based on digit count."""
         return str(number).zfill(digit_count)
     
     @staticmethod
-    @transaction.atomic
-    def generate_serials(part_number, quantity):
+    def generate_serials(part_number, quantity, station=''):
         """
         Generate a batch of serial numbers for a given part number.
         
         Args:
             part_number (str): The part number (e.g., "232-9983")
             quantity (int): How many serial numbers to generate
+            station (str): Workstation recorded on the GenerationBatch
             
         Returns:
             dict: {
@@ -47,12 +67,28 @@ class SerialNumberGenerator:
                 'start': first serial number,
                 'end': last serial number,
                 'part_number': part number instance,
-                'upc': UPC code or None
+                'upc': UPC code or None,
+                'batch_id': GenerationBatch id
             }
         """
-        # Lock the config record to prevent race conditions
-        config = Config.objects.select_for_update().get(pk=1)
+        started = time.perf_counter()
+        with transaction.atomic():
+            # Lock the config record to prevent race conditions. On SQLite the
+            # write lock is taken by BEGIN IMMEDIATE when the transaction opens,
+            # so the wait is measured from before the atomic block.
+            config = Config.objects.select_for_update().get(pk=1)
+            locked = time.perf_counter()
+            result = SerialNumberGenerator._generate_locked(config, part_number, quantity, station)
         
+        finished = time.perf_counter()
+        GENERATE_LOCK_WAIT.observe(locked - started)
+        GENERATE_TRANSACTION.observe(finished - locked)
+        SERIALS_GENERATED.inc(quantity, part_number=part_number)
+        return result
+    
+    @staticmethod
+    def _generate_locked(config, part_number, quantity, station=''):
+        """Body of generate_serials(), run while holding the Config lock."""
         # Get or create the product
         product, created = Product.objects.get_or_create(
             part_number=part_number
@@ -62,6 +98,9 @@ class SerialNumberGenerator:
         start_serial = config.current_serial
         end_serial = start_serial + quantity - 1
         
+        # Reserve change feed positions under the same lock
+        first_seq = ChangeFeedService.reserve(config, quantity)
+        
         # Generate formatted serial numbers
         serials = []
         serial_records = []
@@ -79,16 +118,42 @@ class SerialNumberGenerator:
                 SerialNumber(
                     serial_number=formatted_serial,
                     part_number=product,
-                    upc=product.upc  # Denormalized for fast label printing
+                    upc=product.upc,  # Denormalized for fast label printing
+                    change_seq=first_seq + i
                 )
             )
         
         # Bulk create serial number records
         SerialNumber.objects.bulk_create(serial_records)
         
-        # Update the config counter atomically
+        # Record the run so it can be reprinted as a range later
+        batch = GenerationBatch.objects.create(
+            part_number=product,
+            upc=product.upc,
+            start_number=start_serial,
+            end_number=end_serial,
+            serial_digits=config.serial_digits,
+            station=station[:100]
+        )
+        
+        # Update the config counters atomically
         config.current_serial = end_serial + 1
-        config.save()
+        config.save(update_fields=['current_serial', 'last_change_seq'])
+        
+        # Keep the in-memory serial index current once the batch is committed
+        upc = product.upc
+        transaction.on_commit(
+            lambda: index_generated_serials(serials, part_number, upc, first_seq)
+        )
+        
+        # Tell bulk generation pages the counter moved
+        serial_digits = config.serial_digits
+        transaction.on_commit(
+            lambda: publish_generated(
+                part_number, quantity, serials[0], serials[-1],
+                end_serial + 1, serial_digits
+            )
+        )
         
         return {
             'serials': serials,
@@ -96,7 +161,8 @@ class SerialNumberGenerator:
             'end': serials[-1],
             'part_number': product,
             'upc': product.upc,
-            'quantity': quantity
+            'quantity': quantity,
+            'batch_id': batch.pk
         }
 
 
@@ -106,9 +172,9 @@ class BulkScanParser:
     """
     
     @staticmethod
-    def parse_scan_input(scan_data):
+    def parse_scan_input(scan_data, options=None):
         """
-        Parse alternating Part Number and Quantity scans.
+        Parse a block of scans, one per line.
         
         Input format (each line is a separate scan):
         232-9983
@@ -116,63 +182,56 @@ class BulkScanParser:
         243-0012
         1
         
+        A GS1 compound barcode on one line gives a whole pair. A part with
+        no quantity after it becomes an invalid pair instead of shifting the
+        lines that follow.
+        
         Args:
             scan_data (str): Multi-line string of scanned barcodes
+            options (dict): Overrides for settings.SCAN_PARSER
             
         Returns:
             list: [{
                 'part_number': str,
                 'quantity': int,
                 'valid': bool,
-                'error': str or None
+                'error': str or None,
+                'source': 'scan' or 'gs1'
             }]
         """
-        lines = [line.strip() for line in scan_data.strip().split('\n') if line.strip()]
-        
-        if len(lines) % 2 != 0:
-            raise ValueError("Scan data must have an even number of lines (Part → Qty pairs)")
+        return BulkScanParser.parse_scans(scan_data.splitlines(), options)
+    
+    @staticmethod
+    def parse_scans(scans, options=None):
+        """
+        Parse scans in the order they were read (see parse_scan_input).
         
-        pairs = []
-        for i in range(0, len(lines), 2):
-            part_number = lines[i]
-            quantity_str = lines[i + 1]
-            
-            # Validate part number format (XXX-XXXX)
-            part_valid = BulkScanParser.validate_part_number(part_number)
-            
-            # Validate quantity (positive integer)
-            try:
-                quantity = int(quantity_str)
-                qty_valid = quantity > 0
-                qty_error = None if qty_valid else "Quantity must be positive"
-            except ValueError:
-                quantity = None
-                qty_valid = False
-                qty_error = f"Invalid quantity: {quantity_str}"
+        Args:
+            scans (iterable): One string per scan
+            options (dict): Overrides for settings.SCAN_PARSER
             
-            pairs.append({
-                'part_number': part_number,
-                'quantity': quantity,
-                'valid': part_valid and qty_valid,
-                'error': None if (part_valid and qty_valid) else (
-                    f"Invalid part number format" if not part_valid else qty_error
-                )
-            })
-        
+        Returns:
+            list: pair dicts
+        """
+        parser = ScanStreamParser(options)
+        pairs = []
+        for scan in scans:
+            pairs.extend(parser.feed(scan))
+        pairs.extend(parser.finish())
         return pairs
     
+    @staticmethod
+    def validate_pair(part_number, quantity):
+        """Validate a part/quantity pair entered separately; returns a pair dict."""
+        return ScanStreamParser().validate_pair(part_number, quantity)
+    
     @staticmethod
     def validate_part_number(part_number):
         """
-        Validate part number format (XXX-XXXX).
-        Can be made more flexible if needed.
+        Validate a part number against SCAN_PARSER['PART_PATTERN'].
+        The default accepts anything non-empty; use r'\d{3}-\d{4}' for XXX-XXXX.
         """
-        import re
-        # Allow flexible format for now, just check it's not empty
-        # Can uncomment regex for strict validation:
-        # pattern = r'^\d{3}-\d{4}$'
-        # return bool(re.match(pattern, part_number))
-        return bool(part_number and len(part_number) > 0)
+        return match_pattern(get_scan_settings()['PART_PATTERN'], part_number or '')
 
 
 class BulkGenerationService:
@@ -181,12 +240,13 @@ class BulkGenerationService:
     """
     
     @staticmethod
-    def process_bulk_scans(pairs):
+    def process_bulk_scans(pairs, station=''):
         """
         Process validated part/quantity pairs and generate serial numbers.
         
         Args:
             pairs (list): List of validated part/quantity dicts
+            station (str): Workstation the scans came from
             
         Returns:
             dict: {
@@ -215,7 +275,8 @@ class BulkGenerationService:
             try:
                 result = SerialNumberGenerator.generate_serials(
                     pair['part_number'],
-                    pair['quantity']
+                    pair['quantity'],
+                    station
                 )
                 results.append({
                     'part_number': pair['part_number'],
@@ -223,7 +284,8 @@ class BulkGenerationService:
                     'success': True,
                     'serial_range': f"{result['start']}-{result['end']}",
                     'serials': result['serials'],
-                    'upc': result['upc']
+                    'upc': result['upc'],
+                    'batch_id': result['batch_id']
                 })
                 total_serials += pair['quantity']
                 success_count += 1
@@ -242,3 +304,52 @@ class BulkGenerationService:
             'success_count': success_count,
             'error_count': error_count
         }
+
+
+class LabelTemplateService:
+    """
+    Fills label ZPL templates with serial, part and UPC values.
+    """
+    
+    LABEL_TYPES = ('serial', 'box')
+    
+    @staticmethod
+    def get_template(config, label_type):
+        """
+        Return the configured template for a label type.
+        
+        Raises:
+            ValueError: label_type is not 'serial' or 'box'
+        """
+        if label_type == 'serial':
+            return config.serial_label_zpl
+        if label_type == 'box':
+            return config.box_label_zpl
+        raise ValueError('Invalid label_type. Must be "serial" or "box"')
+    
+    @staticmethod
+    def fill_product(template, part_number, upc):
+        """Substitute the part and UPC placeholders, leaving {{serial}}."""
+        upc = upc or ''
+        # UPC-A barcodes take the first 11 digits; the printer adds the check digit
+        upc_11 = upc[:11] if len(upc) >= 11 else upc
+        zpl = template.replace('{{part}}', part_number or '')
+        zpl = zpl.replace('{{upc_full}}', upc)
+        return zpl.replace('{{upc_11_digits}}', upc_11)
+    
+    @staticmethod
+    def render(template, serial_number, part_number, upc):
+        """ZPL for one label."""
+        zpl = template.replace('{{serial}}', serial_number or '')
+        return LabelTemplateService.fill_product(zpl, part_number, upc)
+    
+    @staticmethod
+    def render_many(template, serials, part_number, upc):
+        """
+        ZPL for consecutive labels of one part, as a single document.
+        
+        The part and UPC are filled in once; each label then only
+        substitutes its serial.
+        """
+        product_zpl = LabelTemplateService.fill_product(template, part_number, upc)
+        return ''.join(product_zpl.replace('{{serial}}', serial) for serial in serials)
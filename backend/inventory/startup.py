@@ -0,0 +1,157 @@
+"""
+Fast startup for the tray app.
+
+Running the migrate command on every launch loads the whole migration graph
+even when nothing has changed. Instead, a fingerprint of the migration files
+shipped with the app is stored in a stamp file next to the database after a
+successful migrate, together with the number of rows in each database's
+django_migrations table. On the next launch, if the fingerprint and the row
+counts still match, migrate and the Config check are skipped.
+"""
+
+import hashlib
+import json
+import pkgutil
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .db import migrated_aliases
+
+
+STAMP_FILENAME = '.schema_fingerprint.json'
+
+
+class StartupTimer:
+    """Records how long each startup step takes and prints a breakdown."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = []
+
+    def step(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def report(self):
+        lines = ['Startup timing:']
+        for name, elapsed in self.steps:
+            lines.append(f'  {name:<24} {elapsed * 1000:8.1f} ms')
+        total = time.perf_counter() - self.started
+        lines.append(f"  {'total':<24} {total * 1000:8.1f} ms")
+        return '\n'.join(lines)
+
+
+def stamp_path():
+    return settings.BASE_DIR / STAMP_FILENAME
+
+
+def migration_fingerprint():
+    """
+    Hash the names of every installed app's migration modules.
+    Adding, removing or renaming a migration changes the fingerprint.
+    """
+    digest = hashlib.sha256()
+    for app_config in sorted(apps.get_app_configs(), key=lambda app: app.label):
+        try:
+            module = import_module(f'{app_config.name}.migrations')
+        except ImportError:
+            continue
+        names = sorted(
+            name for _, name, is_pkg in pkgutil.iter_modules(getattr(module, '__path__', []))
+            if not is_pkg and name[:1] not in ('_', '~')
+        )
+        digest.update(app_config.label.encode('utf-8'))
+        for name in names:
+            digest.update(b'\0' + name.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def applied_migration_count(alias):
+    """Rows in django_migrations on an alias, or None if it can't be read."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM django_migrations')
+            return cursor.fetchone()[0]
+    except DatabaseError:
+        return None
+
+
+def read_stamp():
+    try:
+        with open(stamp_path(), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_stamp(fingerprint):
+    stamp = {
+        'fingerprint': fingerprint,
+        'databases': {
+            alias: {
+                'name': str(connections[alias].settings_dict['NAME']),
+                'applied': applied_migration_count(alias),
+            }
+            for alias in migrated_aliases()
+        },
+    }
+    try:
+        with open(stamp_path(), 'w', encoding='utf-8') as f:
+            json.dump(stamp, f, indent=2)
+    except OSError:
+        # A read-only install directory just means no fast path next time
+        pass
+
+
+def schema_is_current(fingerprint):
+    """True when the stamp matches the shipped migrations and every database."""
+    stamp = read_stamp()
+    if stamp.get('fingerprint') != fingerprint:
+        return False
+
+    databases = stamp.get('databases', {})
+    for alias in migrated_aliases():
+        recorded = databases.get(alias)
+        if not recorded or recorded.get('name') != str(connections[alias].settings_dict['NAME']):
+            return False
+        # Catches a database file that was replaced or restored from backup
+        if applied_migration_count(alias) != recorded.get('applied'):
+            return False
+    return True
+
+
+def ensure_schema(timer=None):
+    """
+    Migrate every database and create the Config row, unless the stamp shows
+    nothing has changed since the last successful run.
+
+    Returns:
+        bool: True if migrate ran, False if it was skipped
+    """
+    timer = timer or StartupTimer()
+    fingerprint = timer.step('fingerprint', migration_fingerprint)
+    if timer.step('schema check', schema_is_current, fingerprint):
+        return False
+
+    from django.core.management import call_command
+    from .models import Config
+
+    for alias in migrated_aliases():
+        timer.step(f'migrate {alias}', call_command,
+                   'migrate', '--noinput', database=alias, verbosity=0)
+
+    def ensure_config():
+        if not Config.objects.exists():
+            Config.objects.create()
+
+    timer.step('config check', ensure_config)
+    write_stamp(fingerprint)
+    return True
@@ -0,0 +1,657 @@
+// Theme management with system preference
+(function() {
+    const themeToggle = document.getElementById('themeToggle');
+    const prefersDark = window.matchMedia('(prefers-color-scheme: dark)');
+
+    // Get saved theme or use system preference
+    function getTheme() {
+        const saved = localStorage.getItem('theme');
+        if (saved) return saved;
+        return prefersDark.matches ? 'dark' : 'light';
+    }
+
+    // Apply theme
+    function setTheme(theme) {
+        document.body.setAttribute('data-theme', theme);
+        localStorage.setItem('theme', theme);
+        updateIcon(theme);
+    }
+
+    // Update icon based on theme
+    function updateIcon(theme) {
+        const icon = themeToggle.querySelector('i');
+        if (theme === 'dark') {
+            icon.className = 'fas fa-moon';
+            themeToggle.title = 'Switch to light mode';
+        } else {
+            icon.className = 'fas fa-sun';
+            themeToggle.title = 'Switch to dark mode';
+        }
+    }
+
+    // Toggle theme
+    themeToggle.addEventListener('click', () => {
+        const current = document.body.getAttribute('data-theme') || getTheme();
+        const next = current === 'dark' ? 'light' : 'dark';
+        setTheme(next);
+    });
+
+    // Listen for system preference changes
+    prefersDark.addEventListener('change', (e) => {
+        if (!localStorage.getItem('theme')) {
+            setTheme(e.matches ? 'dark' : 'light');
+        }
+    });
+
+    // Initialize theme
+    setTheme(getTheme());
+})();
+
+// Printer bridge status check
+(function() {
+    const BRIDGE_URL = 'http://localhost:5001';
+    const statusEl = document.getElementById('printerStatus');
+
+    async function checkPrinterBridge() {
+        try {
+            const response = await fetch(`${BRIDGE_URL}/health`, {
+                method: 'GET',
+                signal: AbortSignal.timeout(2000) // 2 second timeout
+            });
+
+            if (response.ok) {
+                statusEl.className = 'printer-status is-online';
+                statusEl.innerHTML = '<span class="icon is-small"><i class="fas fa-circle"></i></span><span>Bridge Online</span>';
+            } else {
+                throw new Error('Bridge unhealthy');
+            }
+        } catch (error) {
+            statusEl.className = 'printer-status is-offline';
+            statusEl.innerHTML = '<span class="icon is-small"><i class="fas fa-circle"></i></span><span>Bridge Offline</span>';
+        }
+    }
+
+    // Check on page load
+    checkPrinterBridge();
+})();
+
+// Mobile navbar burger toggle
+(function() {
+    const burger = document.querySelector('.navbar-burger');
+    const menu = document.getElementById('navbarMain');
+
+    if (burger && menu) {
+        burger.addEventListener('click', () => {
+            burger.classList.toggle('is-active');
+            menu.classList.toggle('is-active');
+        });
+    }
+})();
+
+// Helper function to show notifications
+function showNotification(message, type = 'info') {
+    const container = document.getElementById('notificationContainer');
+    const notification = document.createElement('div');
+    notification.className = `notification is-${type}`;
+    notification.innerHTML = `
+        <button class="delete"></button>
+        ${message}
+    `;
+
+    container.appendChild(notification);
+
+    // Add delete functionality
+    const deleteBtn = notification.querySelector('.delete');
+    deleteBtn.addEventListener('click', () => {
+        notification.remove();
+    });
+
+    // Auto-remove after 5 seconds
+    setTimeout(() => {
+        notification.remove();
+    }, 5000);
+}
+
+// Escape text for interpolation into innerHTML templates. Part numbers,
+// station names and print errors come from scans and other workstations.
+function escapeHtml(value) {
+    return String(value ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+// Audio feedback for errors (optional - can be enabled later)
+function playErrorSound() {
+    // Add beep sound for scanner errors if needed
+    // const audio = new Audio('/static/inventory/error.mp3');
+    // audio.play();
+}
+
+// ============================================================================
+// PRINTER BRIDGE INTEGRATION
+// ============================================================================
+// Orchestrates between Django (central ZPL generation) and Bridge (local printing)
+const PrinterBridge = {
+    BRIDGE_URL: 'http://localhost:5001',
+    DJANGO_URL: window.location.origin,
+    NETWORK_PREFIX: 'net:',
+
+    /**
+     * Fetch available printers from local bridge
+     * @returns {Promise<Array>} Array of printer objects
+     */
+    async getPrinters() {
+        try {
+            const controller = new AbortController();
+            const timeoutId = setTimeout(() => controller.abort(), 5000);
+
+            const response = await fetch(`${this.BRIDGE_URL}/printers`, {
+                method: 'GET',
+                signal: controller.signal
+            });
+
+            clearTimeout(timeoutId);
+
+            if (!response.ok) {
+                throw new Error(`Bridge returned ${response.status}`);
+            }
+
+            const data = await response.json();
+
+            if (!data.success) {
+                // Still return printers even if discovery had issues
+                console.warn('Printer discovery had issues:', data.error);
+            }
+
+            return data.printers || [];
+        } catch (error) {
+            console.error('Failed to fetch printers:', error);
+
+            let errorMsg = 'Cannot connect to printer bridge.';
+            if (error.name === 'AbortError') {
+                errorMsg += ' Timeout - is the bridge running on this workstation?';
+            } else if (error.message.includes('Failed to fetch')) {
+                errorMsg += ' Make sure the bridge is running: cd bridge && go run main.go';
+            } else {
+                errorMsg += ' ' + error.message;
+            }
+
+            showNotification(errorMsg, 'danger');
+            throw error;
+        }
+    },
+
+    /**
+     * Get localStorage key for printer selection
+     * @param {string} labelType - 'serial' or 'box'
+     * @returns {string} localStorage key
+     */
+    _getStorageKey(labelType) {
+        // Include Django URL in key for multi-server support
+        return `labelgen_${labelType}_printer_${this.DJANGO_URL}`;
+    },
+
+    /**
+     * Get saved printer selection from localStorage
+     * @param {string} labelType - 'serial' or 'box'
+     * @returns {string|null} Printer ID or null
+     */
+    getSelectedPrinter(labelType) {
+        const key = this._getStorageKey(labelType);
+        return localStorage.getItem(key);
+    },
+
+    /**
+     * Save printer selection to localStorage
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {string} printerId - Printer ID to save
+     */
+    setSelectedPrinter(labelType, printerId) {
+        const key = this._getStorageKey(labelType);
+        localStorage.setItem(key, printerId);
+    },
+
+    /**
+     * Generate ZPL from Django backend
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {Object} data - Label data (serial_number, part_number, upc)
+     * @returns {Promise<string>} ZPL code
+     */
+    async generateZPL(labelType, data) {
+        try {
+            const response = await fetch(`${this.DJANGO_URL}/api/generate-label-zpl/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this._getCSRFToken()
+                },
+                body: JSON.stringify({
+                    label_type: labelType,
+                    ...data
+                })
+            });
+
+            if (!response.ok) {
+                throw new Error(`Django returned ${response.status}`);
+            }
+
+            const result = await response.json();
+
+            if (!result.success) {
+                throw new Error(result.error || 'Failed to generate ZPL');
+            }
+
+            return result.zpl;
+        } catch (error) {
+            console.error('Failed to generate ZPL:', error);
+            showNotification(`ZPL generation failed: ${error.message}`, 'danger');
+            throw error;
+        }
+    },
+
+    /**
+     * Generate ZPL for a whole generation batch, or a sub-range of it, in one request
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {number} batchId - Generation batch ID
+     * @param {string} start - Optional first serial (defaults to the batch start)
+     * @param {string} end - Optional last serial (defaults to the batch end)
+     * @returns {Promise<Object>} {zpl, count, first_serial, last_serial}
+     */
+    async generateBatchZPL(labelType, batchId, start = '', end = '') {
+        try {
+            const response = await fetch(`${this.DJANGO_URL}/api/batch-label-zpl/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this._getCSRFToken()
+                },
+                body: JSON.stringify({
+                    label_type: labelType,
+                    batch_id: batchId,
+                    start: start,
+                    end: end
+                })
+            });
+
+            const result = await response.json();
+
+            if (!result.success) {
+                throw new Error(result.error || `Django returned ${response.status}`);
+            }
+
+            return result;
+        } catch (error) {
+            console.error('Failed to generate batch ZPL:', error);
+            showNotification(`ZPL generation failed: ${error.message}`, 'danger');
+            throw error;
+        }
+    },
+
+    /**
+     * Send ZPL to printer via local bridge
+     * @param {string} printerId - Printer ID
+     * @param {string} zpl - ZPL code to print
+     * @returns {Promise<Object>} Print result
+     */
+    async sendToPrinter(printerId, zpl) {
+        if (printerId.startsWith(this.NETWORK_PREFIX)) {
+            return this.sendToNetworkPrinter(printerId, zpl);
+        }
+        try {
+            const response = await fetch(`${this.BRIDGE_URL}/print`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    printer_id: printerId,
+                    data: {
+                        zpl: zpl
+                    }
+                }),
+                signal: AbortSignal.timeout(10000)
+            });
+
+            if (!response.ok) {
+                throw new Error(`Bridge returned ${response.status}`);
+            }
+
+            const result = await response.json();
+
+            if (!result.success) {
+                throw new Error(result.error || 'Print failed');
+            }
+
+            return result;
+        } catch (error) {
+            console.error('Failed to print:', error);
+            showNotification(`Print failed: ${error.message}`, 'danger');
+            throw error;
+        }
+    },
+
+    /**
+     * Send ZPL to a network printer through Django (raw TCP 9100, no bridge)
+     * @param {string} printerId - "net:<name>" printer ID
+     * @param {string} zpl - ZPL code to print
+     * @returns {Promise<Object>} Print result
+     */
+    async sendToNetworkPrinter(printerId, zpl) {
+        try {
+            const response = await fetch(`${this.DJANGO_URL}/api/network-print/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this._getCSRFToken()
+                },
+                body: JSON.stringify({
+                    printer: printerId,
+                    zpl: zpl
+                })
+            });
+
+            const result = await response.json();
+
+            if (!result.success) {
+                throw new Error(result.error || `Django returned ${response.status}`);
+            }
+
+            return result;
+        } catch (error) {
+            console.error('Failed to print:', error);
+            showNotification(`Print failed: ${error.message}`, 'danger');
+            throw error;
+        }
+    },
+
+    /**
+     * Print label data on a network printer in one request; the server
+     * renders the ZPL and pipelines it over its pooled connection
+     * @param {string} printerId - "net:<name>" printer ID
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {Array<Object>} labels - Label data objects in print order
+     * @returns {Promise<number>} Labels sent; on failure the thrown error's
+     *     labelsSent says how many the printer took first
+     */
+    async sendLabelsToNetworkPrinter(printerId, labelType, labels) {
+        const response = await fetch(`${this.DJANGO_URL}/api/network-print/labels/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this._getCSRFToken()
+            },
+            body: JSON.stringify({
+                printer: printerId,
+                label_type: labelType,
+                labels: labels
+            })
+        });
+
+        const result = await response.json();
+
+        if (!result.success) {
+            const error = new Error(result.error || `Django returned ${response.status}`);
+            error.labelsSent = result.labels_sent || 0;
+            throw error;
+        }
+
+        return result.data.labels;
+    },
+
+    /**
+     * Network printers configured on the server (NETWORK_PRINTERS)
+     * @returns {Promise<Array>} Printer objects shaped like the bridge's
+     */
+    async getNetworkPrinters() {
+        try {
+            const response = await fetch(`${this.DJANGO_URL}/api/network-printers/`);
+            const result = await response.json();
+            return (result.success ? result.data.printers : []).map(printer => ({
+                id: printer.id,
+                name: printer.name,
+                connection: 'network 9100',
+                description: `${printer.host}:${printer.port}`,
+                type: 'ZPL',
+                status: 'sent from server'
+            }));
+        } catch (error) {
+            console.error('Failed to fetch network printers:', error);
+            return [];
+        }
+    },
+
+    /**
+     * Complete print workflow: Generate ZPL + Print
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {Object} data - Label data (serial_number, part_number, upc)
+     * @param {string} printerId - Optional printer ID (defaults to saved selection)
+     * @param {boolean} silent - If true, don't show success notification (for batch operations)
+     * @returns {Promise<Object>} Print result
+     */
+    async printLabel(labelType, data, printerId = null, silent = false) {
+        // Use provided printer or get saved selection
+        const selectedPrinter = printerId || this.getSelectedPrinter(labelType);
+
+        if (!selectedPrinter) {
+            const msg = `No printer selected for ${labelType} labels. Please select a printer in Printer Settings.`;
+            showNotification(msg, 'warning');
+            throw new Error(msg);
+        }
+
+        try {
+            // Step 1: Generate ZPL from Django
+            const zpl = await this.generateZPL(labelType, data);
+
+            // Step 2: Send to printer via bridge
+            const result = await this.sendToPrinter(selectedPrinter, zpl);
+
+            if (!silent) {
+                showNotification(`Label printed successfully!`, 'success');
+            }
+            return result;
+        } catch (error) {
+            // Error already shown in sub-functions
+            throw error;
+        }
+    },
+
+    /**
+     * Call a print job ledger endpoint
+     * @param {string} path - API path
+     * @param {string} method - 'GET' or 'POST'
+     * @param {Object} body - JSON body for POST
+     * @param {boolean} keepalive - Let the request outlive the page
+     * @returns {Promise<Object>} The response's data
+     */
+    async _ledgerRequest(path, method = 'GET', body = null, keepalive = false) {
+        const response = await fetch(`${this.DJANGO_URL}${path}`, {
+            method: method,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this._getCSRFToken()
+            },
+            body: body ? JSON.stringify(body) : null,
+            keepalive: keepalive
+        });
+
+        const result = await response.json();
+
+        if (!result.success) {
+            throw new Error(result.error || `Django returned ${response.status}`);
+        }
+
+        return result.data;
+    },
+
+    /**
+     * Unfinished print jobs for this workstation
+     * @returns {Promise<Array>} Jobs (without label lists), most recent first
+     */
+    async getOpenPrintJobs() {
+        const data = await this._ledgerRequest('/api/print-jobs/');
+        return data.jobs;
+    },
+
+    /**
+     * Batch print multiple labels, recorded in the server-side print job ledger.
+     * Stops at the first label that fails so the job can be resumed from there.
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {Array<Object>} dataArray - Array of label data objects
+     * @param {string} printerId - Optional printer ID
+     * @param {Function} progressCallback - Called after each print with (current, total)
+     * @returns {Promise<Object>} Summary with job_id and success/failure counts
+     */
+    async printBatch(labelType, dataArray, printerId = null, progressCallback = null) {
+        const selectedPrinter = printerId || this.getSelectedPrinter(labelType);
+
+        if (!selectedPrinter) {
+            const msg = `No printer selected for ${labelType} labels.`;
+            showNotification(msg, 'warning');
+            throw new Error(msg);
+        }
+
+        const job = await this._ledgerRequest('/api/print-jobs/', 'POST', {
+            label_type: labelType,
+            labels: dataArray,
+            printer: selectedPrinter
+        });
+
+        return this._runPrintJob(job.id, labelType, dataArray, 0, selectedPrinter, progressCallback);
+    },
+
+    /**
+     * Continue an interrupted print job from its last checkpoint.
+     * Only the labels that were not confirmed are generated and printed.
+     * @param {number} jobId - Print job ID
+     * @param {string} printerId - Optional printer ID (defaults to saved selection)
+     * @param {Function} progressCallback - Called after each print with (current, total)
+     * @returns {Promise<Object>} Summary with job_id and success/failure counts
+     */
+    async resumePrintJob(jobId, printerId = null, progressCallback = null) {
+        const job = await this._ledgerRequest(`/api/print-jobs/${jobId}/resume/`);
+        const selectedPrinter = printerId || this.getSelectedPrinter(job.label_type);
+
+        if (!selectedPrinter) {
+            const msg = `No printer selected for ${job.label_type} labels.`;
+            showNotification(msg, 'warning');
+            throw new Error(msg);
+        }
+
+        return this._runPrintJob(job.id, job.label_type, job.labels, job.confirmed, selectedPrinter, progressCallback);
+    },
+
+    // Checkpoints go to the ledger every CHECKPOINT_EVERY labels or
+    // CHECKPOINT_INTERVAL_MS, whichever comes first, without pausing the loop
+    CHECKPOINT_EVERY: 10,
+    CHECKPOINT_INTERVAL_MS: 2000,
+
+    // Labels sent to a network printer per /api/network-print/labels/ request
+    NETWORK_LABELS_PER_REQUEST: 100,
+
+    /**
+     * Print a job's remaining labels and checkpoint progress
+     * @param {number} jobId - Print job ID
+     * @param {string} labelType - 'serial' or 'box'
+     * @param {Array<Object>} labels - Labels still to print
+     * @param {number} offset - Labels of the job already confirmed
+     * @param {string} printerId - Printer ID
+     * @param {Function} progressCallback - Called after each print (or network chunk) with (current, total)
+     * @returns {Promise<Object>} Summary with job_id and success/failure counts
+     */
+    async _runPrintJob(jobId, labelType, labels, offset, printerId, progressCallback) {
+        const total = offset + labels.length;
+        let confirmed = offset;
+        let recorded = offset;
+        let lastCheckpoint = Date.now();
+        let pending = null;
+        const errors = [];
+
+        const checkpoint = (status = 'printing', error = '', keepalive = false) => {
+            recorded = confirmed;
+            lastCheckpoint = Date.now();
+            return this._ledgerRequest(`/api/print-jobs/${jobId}/checkpoint/`, 'POST', {
+                confirmed: confirmed,
+                status: status,
+                error: error
+            }, keepalive).catch(err => console.warn('Print job checkpoint failed:', err));
+        };
+
+        // Record progress if the tab is closed or reloaded mid-job
+        const onPageHide = () => checkpoint('printing', '', true);
+        window.addEventListener('pagehide', onPageHide);
+
+        // Network printers take a chunk of labels per request; bridge
+        // printers one label per request
+        const perRequest = printerId.startsWith(this.NETWORK_PREFIX) ? this.NETWORK_LABELS_PER_REQUEST : 1;
+
+        try {
+            for (let i = 0; i < labels.length; i += perRequest) {
+                const chunk = labels.slice(i, i + perRequest);
+                try {
+                    if (perRequest > 1) {
+                        confirmed += await this.sendLabelsToNetworkPrinter(printerId, labelType, chunk);
+                    } else {
+                        await this.printLabel(labelType, chunk[0], printerId, true); // silent mode
+                        confirmed++;
+                    }
+                } catch (error) {
+                    confirmed += error.labelsSent || 0;
+                    const failed = confirmed - offset;
+                    errors.push({ index: confirmed, data: labels[failed], error: error.message });
+                    break;
+                }
+
+                if (progressCallback) {
+                    progressCallback(confirmed, total, confirmed - offset, 0);
+                }
+
+                const due = confirmed - recorded >= this.CHECKPOINT_EVERY ||
+                    Date.now() - lastCheckpoint >= this.CHECKPOINT_INTERVAL_MS;
+                if (due && !pending) {
+                    pending = checkpoint().finally(() => { pending = null; });
+                }
+            }
+        } finally {
+            window.removeEventListener('pagehide', onPageHide);
+            if (pending) {
+                await pending;
+            }
+            await checkpoint(errors.length ? 'failed' : 'completed', errors.length ? errors[0].error : '');
+        }
+
+        return {
+            job_id: jobId,
+            total: total,
+            successful: confirmed - offset,
+            failed: total - confirmed,
+            confirmed: confirmed,
+            errors
+        };
+    },
+
+    /**
+     * Get CSRF token from cookie
+     * @returns {string} CSRF token
+     */
+    _getCSRFToken() {
+        const name = 'csrftoken';
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+};
+
+// Make PrinterBridge available globally
+window.PrinterBridge = PrinterBridge;
@@ -1,3 +1,1849 @@
-from django.test import TestCase
+"""
+Tests for the inventory app.
 
-# Create your tests here.
+ViewBudgetTests holds the query-count and latency budgets for every view.
+The other classes test one feature each against a minimal fixture.
+
+Each view in inventory/urls.py has a maximum number of SQL statements (across
+all database aliases) and a time budget, checked against a database with a
+realistic number of products and serials. A new N+1 query or an extra config
+read fails the test and lists the statements that ran. Adding a URL without
+a budget fails test_every_view_has_a_budget.
+
+The query counts are exact ceilings and always checked. Wall-clock time
+depends on the machine, so the time budgets are only checked when
+LABELGEN_TIMING_BUDGETS=1 is set, e.g. on the reference workstation before
+a release. Labelary is mocked, so the
+suite needs no network access. Network printing is tested against a local
+TCP stand-in printer and the ZPL printer emulator.
+"""
+
+import asyncio
+import gzip
+import http.client
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from bundle_config import is_excluded, keep_data_file
+
+from . import metrics, startup, urls as inventory_urls
+from .archive import SerialArchiveService
+from .asgi_static import WHITENOISE_MIDDLEWARE, get_asgi_application
+from .batches import GenerationBatchService
+from .benchmarks import compare_to_baseline, percentile, run_suite, summarize
+from .db import get_sqlite_pragmas, pragma_statements
+from .emulator import EMULATOR_DEFAULTS, EmulatedLabel, EmulatorServer, PrinterEmulator, split_formats
+from .events import SUBSCRIBER_QUEUE_SIZE, SerialEventBroker, broker, format_event, serial_state, stream_events
+from .exports import SerialExportService
+from .loadsim import LoadResults, check_serials, parse_mix, record_response
+from .middleware import profiler_middleware
+from .feed import ChangeFeedService
+from .management.commands.serve import Command as ServeCommand, get_server_settings, parse_addrport
+from .models import ArchivedSerialNumber, Config, GenerationBatch, PrintJob, Product, SerialNumber
+from .netprint import PRINTER_DEFAULTS, LocalPrinterSink, NetworkPrintError, NetworkPrintTransport
+from .profiler import RequestProfiler, SlowRequestLog, _sql_wrapper
+from .querylog import SlowQueryLog, format_params, normalize_sql, scanned_tables
+from .routers import ReadReplicaRouter, SystemAppsRouter, read_only_db
+from .scans import GS1Error, ScanStreamParser, looks_like_gs1, parse_gs1
+from .scheduler import LabelRun, PoolRuns, PoolSchedule, run_pool, split_range
+from .serial_index import BloomFilter, SerialIndex
+from .services import BulkScanParser, LabelTemplateService, SerialNumberGenerator
+
+
+PRODUCTS = 500
+SERIALS = 5000
+
+# Wall-clock budgets are opt-in; shared CI runners are too noisy for them
+CHECK_TIME_BUDGETS = os.environ.get('LABELGEN_TIMING_BUDGETS', '') not in ('', '0')
+
+
+def create_serials(count, part_number='232-9983', upc='012345678905', first=500, first_seq=1):
+    """Serials first..first+count-1 of one part, with consecutive change_seq values."""
+    product, _ = Product.objects.get_or_create(part_number=part_number, defaults={'upc': upc})
+    return SerialNumber.objects.bulk_create(
+        SerialNumber(
+            serial_number=str(first + i).zfill(6),
+            part_number=product,
+            upc=product.upc,
+            change_seq=first_seq + i,
+        )
+        for i in range(count)
+    )
+
+
+def make_admin_client():
+    client = Client()
+    session = client.session
+    session['admin_authenticated'] = True
+    session.save()
+    return client
+
+
+def post_json(client, name, data, args=None):
+    return client.post(reverse(f'inventory:{name}', args=args), json.dumps(data), content_type='application/json')
+
+
+# URL name -> (maximum queries, time budget in milliseconds)
+BUDGETS = {
+    'home': (0, 50),
+    'bulk_generate': (1, 50),            # config for the next serial
+    'process_bulk_scans': (35, 250),     # 5 pairs x (lock, product, insert, batch, counter, savepoints)
+    'parse_scan': (0, 50),
+    'serial_events': (1, 50),
+    'box_label': (0, 50),
+    'lookup_serial': (2, 50),            # hot table, then the archive on a miss
+    'export_serials': (1, 500),          # one streamed query for all 5000 serials
+    'change_feed': (3, 250),             # serial, archived serial and UPC pages
+    'reprint': (0, 50),
+    'recent_batches': (1, 50),
+    'batch_label_zpl': (2, 50),          # one batch row and the config, for any number of labels
+    'print_jobs': (1, 50),               # insert a job, or list the station's open jobs
+    'print_job_checkpoint': (1, 50),     # a single UPDATE per checkpoint
+    'print_job_resume': (1, 50),
+    'network_printers': (0, 50),
+    'network_print': (0, 50),
+    'network_print_labels': (1, 50),     # config, for any number of labels
+    'pool_print': (2, 50),               # batch and config
+    'pool_print_status': (0, 50),
+    'printer_settings': (0, 50),
+    'metrics': (0, 50),
+    'admin_login': (0, 50),
+    'admin_logout': (0, 50),
+    'admin_upc': (3, 500),               # session, config, one product listing query
+    'admin_upload_csv': (118, 500),      # 25 rows; per-row get_or_create and change_seq reservation
+    'admin_update_upc': (7, 50),
+    'admin_download_template': (0, 50),
+    'admin_profiler': (1, 50),           # session
+    'admin_slow_queries': (1, 50),       # session
+    'preview_zpl': (2, 50),              # session, config
+    'generate_label_zpl': (1, 50),       # config
+}
+
+
+class ViewBudgetTests(TransactionTestCase):
+    # Not TestCase: its open transaction would lock the tables against the
+    # read-only alias, which reads the same test database on its own connection
+    databases = '__all__'
+
+    def setUp(self):
+        Config.objects.create(pk=1, current_serial=500 + SERIALS, last_change_seq=SERIALS)
+        products = Product.objects.bulk_create(
+            Product(part_number=f'{i // 100:03d}-{i % 100:04d}', upc=f'{i:012d}' if i % 3 else None)
+            for i in range(PRODUCTS)
+        )
+        SerialNumber.objects.bulk_create(
+            SerialNumber(
+                serial_number=str(500 + i).zfill(6),
+                part_number=products[i % PRODUCTS],
+                upc=products[i % PRODUCTS].upc,
+                change_seq=i + 1,
+            )
+            for i in range(SERIALS)
+        )
+        # One 50-serial batch per run of generated serials
+        GenerationBatch.objects.bulk_create(
+            GenerationBatch(
+                part_number=products[i],
+                upc=products[i].upc,
+                start_number=500 + i * 50,
+                end_number=549 + i * 50,
+                serial_digits=6,
+                station=f'station-{i % 4}',
+            )
+            for i in range(SERIALS // 50)
+        )
+
+        self.admin_client = make_admin_client()
+
+    def assertWithinBudget(self, name, make_request):
+        """
+        Run make_request once to warm caches, then again while counting
+        queries on every alias and timing it.
+        """
+        max_queries, budget_ms = BUDGETS[name]
+        self.consume(make_request())
+
+        with ExitStack() as stack:
+            captures = [
+                (alias, stack.enter_context(CaptureQueriesContext(connections[alias])))
+                for alias in connections
+            ]
+            start = time.perf_counter()
+            response = self.consume(make_request())
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.assertLess(response.status_code, 500, f'{name} returned {response.status_code}')
+        queries = [
+            f"[{alias}] {query['sql']}"
+            for alias, capture in captures
+            for query in capture.captured_queries
+        ]
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{name} ran {len(queries)} queries (budget {max_queries}):\n' + '\n'.join(queries),
+        )
+        if CHECK_TIME_BUDGETS:
+            self.assertLessEqual(
+                elapsed_ms, budget_ms,
+                f'{name} took {elapsed_ms:.1f} ms (budget {budget_ms} ms)',
+            )
+        return response
+
+    @staticmethod
+    def consume(response):
+        # Streamed bodies run their queries while being read
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def post_json(self, client, name, data, args=None):
+        return post_json(client, name, data, args)
+
+    def test_every_view_has_a_budget(self):
+        names = {pattern.name for pattern in inventory_urls.urlpatterns}
+        self.assertEqual(sorted(names - set(BUDGETS)), [], 'Add a budget for each new view')
+        self.assertEqual(sorted(set(BUDGETS) - names), [], 'Remove budgets for views that no longer exist')
+
+    def test_pages(self):
+        for name in ('home', 'bulk_generate', 'box_label', 'reprint', 'printer_settings', 'admin_login'):
+            with self.subTest(name=name):
+                self.assertWithinBudget(name, lambda: self.client.get(reverse(f'inventory:{name}')))
+
+    def test_process_bulk_scans(self):
+        pairs = [{'part_number': f'{i:03d}-0001', 'quantity': '10'} for i in range(5)]
+        response = self.assertWithinBudget(
+            'process_bulk_scans', lambda: self.post_json(self.client, 'process_bulk_scans', {'pairs': pairs})
+        )
+        self.assertEqual(response.json()['data']['total_serials'], 50)
+
+    def test_parse_scan(self):
+        self.assertWithinBudget(
+            'parse_scan', lambda: self.post_json(self.client, 'parse_scan', {'scan': ']C1240232-9983\x1d3012'})
+        )
+
+    def test_serial_events(self):
+        self.assertWithinBudget('serial_events', lambda: self.client.get(reverse('inventory:serial_events')))
+
+    def test_lookup_serial(self):
+        response = self.assertWithinBudget(
+            'lookup_serial', lambda: self.client.get(reverse('inventory:lookup_serial'), {'serial': '002500'})
+        )
+        self.assertTrue(response.json()['success'])
+
+    def test_lookup_serial_miss(self):
+        # A miss also checks the archive table
+        self.assertWithinBudget(
+            'lookup_serial', lambda: self.client.get(reverse('inventory:lookup_serial'), {'serial': '999999'})
+        )
+
+    def test_export_serials(self):
+        self.assertWithinBudget('export_serials', lambda: self.client.get(reverse('inventory:export_serials')))
+
+    def test_change_feed(self):
+        response = self.assertWithinBudget(
+            'change_feed', lambda: self.client.get(reverse('inventory:change_feed'), {'cursor': 0, 'limit': 1000})
+        )
+        self.assertEqual(len(response.json()['data']['changes']), 1000)
+
+    def test_recent_batches(self):
+        response = self.assertWithinBudget('recent_batches', lambda: self.client.get(reverse('inventory:recent_batches')))
+        self.assertEqual(len(response.json()['data']['batches']), 25)
+
+    def test_batch_label_zpl(self):
+        batch = GenerationBatch.objects.get(start_number=750)
+        self.assertWithinBudget('batch_label_zpl', lambda: self.post_json(
+            self.client, 'batch_label_zpl', {'batch_id': batch.pk, 'label_type': 'serial'},
+        ))
+
+    def test_print_job_ledger(self):
+        labels = [
+            {'serial_number': str(500 + i).zfill(6), 'part_number': '000-0001', 'upc': '000000000001'}
+            for i in range(500)
+        ]
+        response = self.assertWithinBudget('print_jobs', lambda: self.post_json(
+            self.client, 'print_jobs', {'label_type': 'serial', 'labels': labels, 'printer': 'zebra-1'}
+        ))
+        job_id = response.json()['data']['id']
+
+        checkpoints = iter(range(10, 190, 10))
+        self.assertWithinBudget('print_job_checkpoint', lambda: self.post_json(
+            self.client, 'print_job_checkpoint', {'confirmed': next(checkpoints)}, args=[job_id]
+        ))
+        self.assertWithinBudget(
+            'print_job_resume', lambda: self.client.get(reverse('inventory:print_job_resume', args=[job_id]))
+        )
+
+    def test_network_print(self):
+        sink = LocalPrinterSink().start()
+        self.addCleanup(sink.stop)
+        host, port = sink.address
+        labels = [{'serial_number': str(500 + i).zfill(6), 'part_number': '000-0001', 'upc': ''} for i in range(100)]
+
+        with override_settings(NETWORK_PRINTERS={'zebra-1': {'HOST': host, 'PORT': port}}), \
+                mock.patch('inventory.views.get_transport', return_value=NetworkPrintTransport()):
+            self.assertWithinBudget('network_printers', lambda: self.client.get(reverse('inventory:network_printers')))
+            self.assertWithinBudget('network_print', lambda: self.post_json(
+                self.client, 'network_print', {'printer': 'net:zebra-1', 'zpl': '^XA^FDone^FS^XZ'}
+            ))
+            self.assertWithinBudget('network_print_labels', lambda: self.post_json(
+                self.client, 'network_print_labels', {'printer': 'net:zebra-1', 'label_type': 'serial', 'labels': labels}
+            ))
+
+    def test_pool_print(self):
+        sinks = [LocalPrinterSink().start() for _ in range(2)]
+        for sink in sinks:
+            self.addCleanup(sink.stop)
+        printers = {
+            f'zebra-{i}': {'HOST': sink.address[0], 'PORT': sink.address[1]} for i, sink in enumerate(sinks)
+        }
+        pools = {'line-1': {'zebra-0': 1.0, 'zebra-1': 1.0}}
+        batch = GenerationBatch.objects.get(start_number=750)
+        request = {'pool': 'line-1', 'batch_id': batch.pk, 'label_type': 'serial'}
+
+        with override_settings(NETWORK_PRINTERS=printers, PRINTER_POOLS=pools), \
+                mock.patch('inventory.scheduler.get_transport', return_value=NetworkPrintTransport()):
+            response = self.assertWithinBudget('pool_print', lambda: self.post_json(self.client, 'pool_print', request))
+            run_id = response.json()['data']['id']
+            self.assertWithinBudget('pool_print_status', lambda: self.client.get(
+                reverse('inventory:pool_print_status', args=[run_id])
+            ))
+
+    def test_metrics(self):
+        self.assertWithinBudget('metrics', lambda: self.client.get(reverse('inventory:metrics')))
+
+    def test_admin_logout(self):
+        self.assertWithinBudget('admin_logout', lambda: self.client.get(reverse('inventory:admin_logout')))
+
+    def test_admin_upc(self):
+        response = self.assertWithinBudget(
+            'admin_upc', lambda: self.admin_client.get(reverse('inventory:admin_upc'))
+        )
+        self.assertContains(response, '004-0099')
+
+    def test_admin_upload_csv(self):
+        rounds = iter(range(1, 10))
+
+        def upload():
+            # 20 existing parts get new UPCs and 5 new parts are created each time
+            n = next(rounds)
+            rows = ['PartNumber,UPC']
+            rows += [f'{i // 100:03d}-{i % 100:04d},{n:02d}{i:010d}' for i in range(20)]
+            rows += [f'NEW-{n}{i:03d},{n:02d}{i:010d}' for i in range(5)]
+            csv_file = io.BytesIO('\n'.join(rows).encode('utf-8'))
+            csv_file.name = 'upc.csv'
+            return self.admin_client.post(reverse('inventory:admin_upload_csv'), {'csv_file': csv_file})
+
+        self.assertWithinBudget('admin_upload_csv', upload)
+
+    def test_admin_update_upc(self):
+        upcs = iter(f'{i:012d}' for i in range(900000, 900010))
+        self.assertWithinBudget('admin_update_upc', lambda: self.post_json(
+            self.admin_client, 'admin_update_upc', {'part_number': '001-0001', 'upc': next(upcs)}
+        ))
+
+    def test_admin_download_template(self):
+        self.assertWithinBudget(
+            'admin_download_template', lambda: self.admin_client.get(reverse('inventory:admin_download_template'))
+        )
+
+    def test_admin_reports(self):
+        for name in ('admin_profiler', 'admin_slow_queries'):
+            with self.subTest(name=name):
+                self.assertWithinBudget(name, lambda: self.admin_client.get(reverse(f'inventory:{name}')))
+
+    def test_preview_zpl(self):
+        with mock.patch('inventory.views.post_to_labelary', mock.AsyncMock(return_value=b'\x89PNG')):
+            response = self.assertWithinBudget('preview_zpl', lambda: self.post_json(
+                self.admin_client, 'preview_zpl', {'zpl': '^XA^XZ', 'label_type': 'box'}
+            ))
+        self.assertTrue(response.json()['success'])
+
+    def test_generate_label_zpl(self):
+        response = self.assertWithinBudget('generate_label_zpl', lambda: self.post_json(
+            self.client, 'generate_label_zpl',
+            {'label_type': 'box', 'serial_number': '000500', 'part_number': '000-0000', 'upc': '012345678901'},
+        ))
+        self.assertIn('000500', response.json()['zpl'])
+
+
+class GenerationBatchTests(TransactionTestCase):
+    """Finding a serial's batch when ranges overlap, and reprinting from a batch."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        Config.objects.create(pk=1, current_serial=500)
+        SerialNumberGenerator.generate_serials('AAA-0001', 50)
+        # The first run is archived and the counter is moved back over it
+        SerialNumber.objects.update(created_at=timezone.now() - timedelta(days=365))
+        SerialArchiveService.archive(timezone.now() - timedelta(days=90))
+        Config.objects.filter(pk=1).update(current_serial=500)
+        SerialNumberGenerator.generate_serials('BBB-0002', 20)
+        self.first, self.second = GenerationBatch.objects.order_by('pk')
+
+    def test_containing_resolves_overlapping_ranges_through_the_serial(self):
+        self.assertEqual(GenerationBatchService.containing('000510'), self.second)
+        self.assertEqual(GenerationBatchService.containing('000530'), self.first)
+        self.assertIsNone(GenerationBatchService.containing('000600'))
+        # Same number, other digit count
+        self.assertIsNone(GenerationBatchService.containing('00510'))
+        self.assertIsNone(GenerationBatchService.containing('not-a-serial'))
+
+    def test_recent_batches_containing_serial(self):
+        response = self.client.get(reverse('inventory:recent_batches'), {'serial': '000510'})
+        [batch] = response.json()['data']['batches']
+        self.assertEqual(
+            (batch['part_number'], batch['first_serial'], batch['last_serial']), ('BBB-0002', '000500', '000519'),
+        )
+
+    def test_batch_label_zpl_from_a_serial(self):
+        response = post_json(
+            self.client, 'batch_label_zpl', {'batch_id': self.first.pk, 'label_type': 'serial', 'start': '000530'},
+        )
+        data = response.json()
+        self.assertEqual((data['count'], data['first_serial'], data['last_serial']), (20, '000530', '000549'))
+        self.assertEqual(data['zpl'].count('^XA'), 20)
+
+    def test_batch_label_zpl_outside_batch(self):
+        response = post_json(self.client, 'batch_label_zpl', {'batch_id': self.second.pk, 'start': '000530'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PrintJobLedgerTests(TestCase):
+    """Registering, checkpointing and resuming print jobs through the ledger views."""
+
+    def setUp(self):
+        labels = [
+            {'serial_number': str(500 + i).zfill(6), 'part_number': '000-0001', 'upc': '000000000001'}
+            for i in range(50)
+        ]
+        response = post_json(self.client, 'print_jobs', {'label_type': 'serial', 'labels': labels, 'printer': 'zebra-1'})
+        self.job_id = response.json()['data']['id']
+
+    def checkpoint(self, confirmed, **data):
+        return post_json(self.client, 'print_job_checkpoint', dict(data, confirmed=confirmed), args=[self.job_id])
+
+    def test_resume_skips_confirmed_labels(self):
+        self.checkpoint(20)
+        # A late checkpoint doesn't move the job backwards
+        self.assertFalse(self.checkpoint(15).json()['data']['recorded'])
+
+        job = self.client.get(reverse('inventory:print_job_resume', args=[self.job_id])).json()['data']
+        self.assertEqual((job['confirmed'], job['status']), (20, 'printing'))
+        self.assertEqual(job['labels'][0]['serial_number'], '000520')
+        self.assertEqual(len(job['labels']), 30)
+
+    def test_completed_jobs_leave_the_open_list(self):
+        open_jobs = self.client.get(reverse('inventory:print_jobs')).json()['data']['jobs']
+        self.assertEqual([job['id'] for job in open_jobs], [self.job_id])
+
+        self.checkpoint(50)
+        self.assertEqual(PrintJob.objects.get(pk=self.job_id).status, 'completed')
+        self.assertEqual(self.client.get(reverse('inventory:print_jobs')).json()['data']['jobs'], [])
+
+    def test_failed_job_keeps_its_error(self):
+        self.checkpoint(10, status='failed', error='<b>Paper out</b>')
+        [job] = self.client.get(reverse('inventory:print_jobs')).json()['data']['jobs']
+        # Returned as text; the page escapes it before display
+        self.assertEqual((job['status'], job['error']), ('failed', '<b>Paper out</b>'))
+
+    def test_finished_jobs_ignore_later_checkpoints(self):
+        self.checkpoint(10)
+        self.assertTrue(self.checkpoint(10, status='cancelled').json()['data']['recorded'])
+        # A checkpoint already in flight when the job was dismissed
+        self.assertFalse(self.checkpoint(10).json()['data']['recorded'])
+        self.assertEqual(PrintJob.objects.get(pk=self.job_id).status, 'cancelled')
+
+    def test_equal_count_checkpoints_change_open_jobs(self):
+        self.checkpoint(20)
+        self.assertTrue(self.checkpoint(20, status='failed', error='Bridge timeout').json()['data']['recorded'])
+        # Resumed from the failed job's count
+        self.assertTrue(self.checkpoint(20).json()['data']['recorded'])
+        self.assertTrue(self.checkpoint(20, status='completed').json()['data']['recorded'])
+        self.assertEqual(PrintJob.objects.get(pk=self.job_id).status, 'completed')
+        self.assertFalse(self.checkpoint(20, status='failed').json()['data']['recorded'])
+
+
+class NetworkPrintViewTests(TestCase):
+    """The network printer views, against a local stand-in printer."""
+
+    def setUp(self):
+        self.sink = LocalPrinterSink().start()
+        self.addCleanup(self.sink.stop)
+        host, port = self.sink.address
+        transport = NetworkPrintTransport({'zebra-1': dict(PRINTER_DEFAULTS, HOST=host, PORT=port, LABELS_PER_WRITE=10)})
+        self.addCleanup(transport.close)
+        printers = override_settings(NETWORK_PRINTERS={'zebra-1': {'HOST': host, 'PORT': port}})
+        printers.enable()
+        self.addCleanup(printers.disable)
+        patcher = mock.patch('inventory.views.get_transport', return_value=transport)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_network_printers(self):
+        printers = self.client.get(reverse('inventory:network_printers')).json()['data']['printers']
+        self.assertEqual([printer['id'] for printer in printers], ['net:zebra-1'])
+
+    def test_network_print(self):
+        zpl = '^XA^FDone^FS^XZ^XA^FDtwo^FS^XZ'
+        response = post_json(self.client, 'network_print', {'printer': 'net:zebra-1', 'zpl': zpl})
+        self.assertEqual(response.json()['data']['labels'], 2)
+        missing = post_json(self.client, 'network_print', {'printer': 'net:nope', 'zpl': '^XA^XZ'})
+        self.assertEqual(missing.status_code, 404)
+        self.assertTrue(self.sink.wait_for(len(zpl)))
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_network_print_labels(self):
+        Config.objects.create(pk=1, serial_label_zpl='^XA^FD{{serial}} {{part}}^FS^XZ')
+        labels = [{'serial_number': str(500 + i).zfill(6), 'part_number': '232-9983', 'upc': ''} for i in range(25)]
+        response = post_json(
+            self.client, 'network_print_labels', {'printer': 'zebra-1', 'label_type': 'serial', 'labels': labels},
+        )
+        self.assertEqual(response.json()['data']['labels'], 25)
+
+        expected = ''.join(f"^XA^FD{label['serial_number']} 232-9983^FS^XZ" for label in labels).encode()
+        self.assertTrue(self.sink.wait_for(len(expected)))
+        self.assertEqual(bytes(self.sink.received), expected)
+        # Pipelined 10 labels per write on one connection
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_network_print_labels_rejects_bad_labels(self):
+        for labels in ([], [{'part_number': '232-9983'}], 'not a list'):
+            with self.subTest(labels=labels):
+                response = post_json(self.client, 'network_print_labels', {'printer': 'zebra-1', 'labels': labels})
+                self.assertEqual(response.status_code, 400)
+
+    def test_network_print_labels_reports_labels_sent_on_failure(self):
+        error = NetworkPrintError('zebra-1 stopped accepting data', labels_sent=20)
+        with mock.patch.object(NetworkPrintTransport, 'print_labels', side_effect=error):
+            response = post_json(self.client, 'network_print_labels', {
+                'printer': 'zebra-1', 'labels': [{'serial_number': '000500'}],
+            })
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json()['labels_sent'], 20)
+
+
+class NetworkPrintTransportTests(SimpleTestCase):
+    """Raw TCP printing against a local stand-in printer."""
+
+    def setUp(self):
+        self.sink = LocalPrinterSink().start()
+        self.addCleanup(self.sink.stop)
+        host, port = self.sink.address
+        self.options = dict(PRINTER_DEFAULTS, HOST=host, PORT=port, LABELS_PER_WRITE=10)
+        self.transport = NetworkPrintTransport({'zebra': self.options})
+        self.addCleanup(self.transport.close)
+        self.labels = [f'^XA^FD{i:06d}^FS^XZ' for i in range(95)]
+
+    def test_labels_arrive_in_order_pipelined_on_one_connection(self):
+        progress = []
+        result = self.transport.print_labels('zebra', self.labels, progress.append)
+        self.transport.print_labels('zebra', self.labels[:5])
+
+        expected = ''.join(self.labels + self.labels[:5]).encode()
+        self.assertTrue(self.sink.wait_for(len(expected)))
+        self.assertEqual(bytes(self.sink.received), expected)
+        self.assertEqual((result['labels'], result['writes']), (95, 10))
+        self.assertEqual(progress[-1], 95)
+        # The second job reused the pooled connection
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_reconnects_when_the_printer_drops_an_idle_connection(self):
+        self.transport.print_labels('zebra', self.labels[:1])
+        pool = self.transport.pool('zebra')
+        # Simulate the printer closing the idle socket
+        pool._idle[0].sock.shutdown(2)
+        self.transport.print_labels('zebra', self.labels[1:3])
+
+        self.assertTrue(self.sink.wait_for(len(''.join(self.labels[:3]))))
+        self.assertEqual(pool.connections_opened, 2)
+
+    def test_backpressure_times_out_with_labels_sent(self):
+        # The printer stops reading; writes block once the buffers fill
+        self.sink.paused.set()
+        transport = NetworkPrintTransport({'zebra': dict(
+            self.options, WRITE_TIMEOUT=0.5, SEND_BUFFER=4096, LABELS_PER_WRITE=1,
+        )})
+        self.addCleanup(transport.close)
+        big_labels = ['^XA' + 'x' * 8192 + '^XZ'] * 2000
+
+        with self.assertRaises(NetworkPrintError) as raised:
+            transport.print_labels('zebra', big_labels)
+        self.assertLess(raised.exception.labels_sent, len(big_labels))
+
+    def test_unknown_printer(self):
+        with self.assertRaises(NetworkPrintError):
+            self.transport.print_labels('missing', self.labels)
+
+
+class PrinterPoolSchedulerTests(SimpleTestCase):
+    """Splitting runs across printer pools and moving work between them."""
+
+    def setUp(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def test_split_range_is_contiguous_and_proportional(self):
+        chunks = split_range(500, 2499, [('a', 1.0), ('b', 1.0), ('c', 0.5)])
+        self.assertEqual(chunks, [('a', 500, 1299), ('b', 1300, 2099), ('c', 2100, 2499)])
+        # Rounding leftovers still cover every serial exactly once
+        chunks = split_range(1, 10, [('a', 1.0), ('b', 1.0), ('c', 1.0)])
+        self.assertEqual([last - first + 1 for _, first, last in chunks], [4, 3, 3])
+        self.assertEqual(chunks[-1][2], 10)
+
+    def drain(self, schedule, printer, seconds_per_write):
+        """Send a printer's labels until it has none left, advancing the clock."""
+        numbers = []
+        while True:
+            chunk = schedule.take(printer)
+            if not chunk:
+                return numbers
+            self.now += seconds_per_write
+            schedule.confirm(printer, len(chunk))
+            numbers.extend(chunk)
+
+    def test_idle_printer_takes_the_tail_of_a_slow_one(self):
+        schedule = PoolSchedule([('fast', 1.0, 10), ('slow', 1.0, 10)], 0, 199, clock=self.clock)
+        # The slow printer manages one write while the fast one does all of its own
+        slow_first = list(schedule.take('slow'))
+        self.now += 1
+        schedule.confirm('slow', len(slow_first))
+        fast_numbers = self.drain(schedule, 'fast', 0.1)
+        slow_numbers = slow_first + self.drain(schedule, 'slow', 1.0)
+
+        self.assertEqual(sorted(fast_numbers + slow_numbers), list(range(200)))
+        self.assertEqual(schedule.reassignments[0]['from'], 'slow')
+        report = schedule.report(6)
+        segments = {printer['printer']: printer['segments'] for printer in report['printers']}
+        # The fast printer's roll is its own chunk, then one stolen run, each ascending
+        self.assertEqual(len(segments['fast']), 2)
+        self.assertEqual(fast_numbers, sorted(fast_numbers))
+        self.assertGreater(len(fast_numbers), 150)
+
+    def test_failed_printer_hands_over_unconfirmed_labels(self):
+        schedule = PoolSchedule([('a', 1.0, 10), ('b', 1.0, 10)], 0, 99, clock=self.clock)
+        schedule.confirm('b', len(schedule.take('b')))
+        schedule.take('b')  # in flight when the printer fails
+        schedule.fail('b', 'connection reset')
+        a_numbers = self.drain(schedule, 'a', 0.1)
+
+        # b's range is 50..99 and it confirmed 50..59 before failing
+        self.assertEqual(sorted(a_numbers), list(range(50)) + list(range(60, 100)))
+        self.assertTrue(schedule.reassignments[0]['failed'])
+        self.assertEqual(schedule.report(6)['sent'], 100)
+
+    def test_run_pool_moves_work_off_a_stalled_printer(self):
+        fast, slow = LocalPrinterSink().start(), LocalPrinterSink()
+        slow.paused.set()
+        slow.start()
+        for sink in (fast, slow):
+            self.addCleanup(sink.stop)
+        transport = NetworkPrintTransport({
+            name: dict(PRINTER_DEFAULTS, HOST=sink.address[0], PORT=sink.address[1],
+                       SEND_BUFFER=4096, LABELS_PER_WRITE=5)
+            for name, sink in (('fast', fast), ('slow', slow))
+        })
+        self.addCleanup(transport.close)
+        # Large labels so the stalled printer's buffers fill quickly
+        labels = LabelRun('^XA^FD{{serial}}^FS^FX' + 'x' * 8000 + '^XZ', '232-9983', '', 6)
+        schedule = PoolSchedule([('fast', 1.0, 5), ('slow', 1.0, 5)], 1, 400)
+        threading.Timer(1.0, slow.resume.set).start()
+        run_pool(schedule, labels, transport)
+        label_bytes = len(labels.zpl([1]))
+        self.assertTrue(fast.wait_for(label_bytes * schedule.assignments['fast'].sent))
+        self.assertTrue(slow.wait_for(label_bytes * schedule.assignments['slow'].sent))
+
+        printed = {}
+        for name, sink in (('fast', fast), ('slow', slow)):
+            with sink.lock:
+                printed[name] = [int(serial) for serial in re.findall(rb'\^FD(\d+)\^FS', bytes(sink.received))]
+        self.assertEqual(sorted(printed['fast'] + printed['slow']), list(range(1, 401)))
+        self.assertGreater(len(printed['fast']), 200)
+        self.assertEqual(printed['slow'], sorted(printed['slow']))
+
+
+    def test_printer_that_takes_over_work_is_busy_again(self):
+        schedule = PoolSchedule([('a', 1.0, 10), ('b', 1.0, 10)], 0, 99, clock=self.clock)
+        self.drain(schedule, 'a', 0.1)
+        finished = schedule.assignments['a'].finished
+        self.assertIsNotNone(finished)
+
+        schedule.fail('b', 'paper out')
+        self.assertTrue(schedule.take('a'))
+        self.assertIsNone(schedule.assignments['a'].finished)
+        self.drain(schedule, 'a', 0.1)
+        self.assertGreater(schedule.assignments['a'].finished, finished)
+
+    def test_sender_errors_fail_the_printer(self):
+        transport = mock.Mock()
+        transport.pool.return_value.send.side_effect = ValueError('bad template')
+        schedule = PoolSchedule([('a', 1.0, 10)], 0, 9)
+        run_pool(schedule, LabelRun('^XA^XZ', '232-9983', '', 6), transport)
+        self.assertEqual(schedule.report(6)['printers'][0]['error'], 'bad template')
+
+    def wait_for_run(self, runs, run_id):
+        deadline = time.monotonic() + 5
+        while runs.status(run_id)['status'] == 'printing' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return runs.status(run_id)
+
+    def test_pool_run_that_raises_is_failed(self):
+        runs = PoolRuns()
+        schedule = PoolSchedule([('a', 1.0, 10)], 0, 9)
+        with mock.patch('inventory.scheduler.run_pool', side_effect=RuntimeError('scheduler bug')):
+            run_id = runs.start('line-1', schedule, LabelRun('^XA^XZ', '232-9983', '', 6), transport=mock.Mock())
+            status = self.wait_for_run(runs, run_id)
+        self.assertEqual((status['status'], status['error']), ('failed', 'scheduler bug'))
+
+
+class PoolPrintViewTests(TestCase):
+    """Printing a generation batch across a pool of local stand-in printers."""
+
+    def setUp(self):
+        self.sinks = [LocalPrinterSink().start() for _ in range(2)]
+        for sink in self.sinks:
+            self.addCleanup(sink.stop)
+        printers = {
+            f'zebra-{i}': {'HOST': sink.address[0], 'PORT': sink.address[1]} for i, sink in enumerate(self.sinks)
+        }
+        pools = override_settings(NETWORK_PRINTERS=printers, PRINTER_POOLS={'line-1': {'zebra-0': 1.0, 'zebra-1': 1.0}})
+        pools.enable()
+        self.addCleanup(pools.disable)
+        transport = NetworkPrintTransport()
+        self.addCleanup(transport.close)
+        patcher = mock.patch('inventory.scheduler.get_transport', return_value=transport)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Config.objects.create(pk=1, current_serial=550)
+        product = Product.objects.create(part_number='232-9983')
+        batch = GenerationBatch.objects.create(
+            part_number=product, start_number=500, end_number=549, serial_digits=6,
+        )
+        self.request = {'pool': 'line-1', 'batch_id': batch.pk, 'label_type': 'serial'}
+
+    def test_dry_run_splits_the_batch(self):
+        response = post_json(self.client, 'pool_print', dict(self.request, dry_run=True))
+        jobs = response.json()['data']['jobs']
+        self.assertEqual(
+            [(job['printer'], job['first_serial'], job['last_serial']) for job in jobs],
+            [('zebra-0', '000500', '000524'), ('zebra-1', '000525', '000549')],
+        )
+
+    def test_pool_print_runs_to_completion(self):
+        run_id = post_json(self.client, 'pool_print', self.request).json()['data']['id']
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            status = self.client.get(reverse('inventory:pool_print_status', args=[run_id])).json()['data']
+            if status['status'] != 'printing':
+                break
+            time.sleep(0.01)
+        self.assertEqual((status['status'], status['sent'], status['error']), ('completed', 50, None))
+
+    def test_unknown_pool(self):
+        response = post_json(self.client, 'pool_print', dict(self.request, pool='line-9'))
+        self.assertEqual(response.status_code, 404)
+
+
+class PrinterEmulatorTests(SimpleTestCase):
+    """The ZPL printer emulator's timing model and its TCP and HTTP listeners."""
+
+    # A hundredth of real time: a 2 inch label at 4 in/s takes about 5 ms
+    TIME_SCALE = 0.01
+
+    def start_server(self, options=None, time_scale=TIME_SCALE, **listeners):
+        emulator = PrinterEmulator(options, time_scale=time_scale)
+        server = EmulatorServer(emulator, **listeners).start()
+        self.addCleanup(server.stop)
+        return emulator, server
+
+    def test_label_timing_follows_zpl_commands(self):
+        label = EmulatedLabel(b'^XA^LL406^PR2^PQ3^BY2^BCN,70^FD000500^FS^BUN,70^FD01234567890^FS^XZ',
+                              EMULATOR_DEFAULTS)
+        self.assertEqual((label.length, label.speed, label.copies, label.barcodes), (2.0, 2, 3, 2))
+        self.assertAlmostEqual(label.print_seconds, 3 * (2.0 + EMULATOR_DEFAULTS['LABEL_GAP']) / 2)
+
+        # Formats split across reads are completed by the next read
+        formats, rest = split_formats(b'~JA^XA^FD1^FS^XZ^XA^FD2')
+        self.assertEqual((formats, rest), ([b'~JA^XA^FD1^FS^XZ'], b'^XA^FD2'))
+        formats, rest = split_formats(rest + b'^FS^XZ')
+        self.assertEqual((formats, rest), ([b'^XA^FD2^FS^XZ'], b''))
+
+    def test_tcp_job_timing_and_queue_depth(self):
+        emulator, server = self.start_server(tcp_port=0)
+        host, port = server.address('tcp')
+        transport = NetworkPrintTransport({'emulator': dict(PRINTER_DEFAULTS, HOST=host, PORT=port)})
+        self.addCleanup(transport.close)
+        template = Config._meta.get_field('serial_label_zpl').get_default()
+        labels = [LabelTemplateService.render(template, str(500 + i).zfill(6), '', '') for i in range(20)]
+        transport.print_labels('emulator', labels)
+        self.assertTrue(emulator.wait_idle(labels=20))
+
+        report = emulator.report()
+        job = report['jobs'][0]
+        self.assertEqual((report['jobs_received'], job['source'], job['printed']), (1, 'tcp', 20))
+        # Labels after the first are formatted while the previous one prints
+        per_label = (EMULATOR_DEFAULTS['LABEL_LENGTH'] + EMULATOR_DEFAULTS['LABEL_GAP']) / EMULATOR_DEFAULTS['SPEED']
+        self.assertAlmostEqual(job['print_seconds'], 20 * per_label, delta=0.1)
+        self.assertAlmostEqual(job['labels_per_minute'], 60 / per_label, delta=10)
+        self.assertEqual(report['stalls'], 0)
+        self.assertGreater(report['queue_depth']['max'], 1)
+
+    def test_full_buffer_stops_reading(self):
+        # Real time and a tiny buffer: the sender is held back by TCP flow control
+        emulator, server = self.start_server({'BUFFER': 2000}, time_scale=1.0, tcp_port=0)
+        host, port = server.address('tcp')
+        transport = NetworkPrintTransport({'emulator': dict(
+            PRINTER_DEFAULTS, HOST=host, PORT=port, WRITE_TIMEOUT=0.5, SEND_BUFFER=4096, LABELS_PER_WRITE=1,
+        )})
+        self.addCleanup(transport.close)
+
+        with self.assertRaises(NetworkPrintError) as raised:
+            transport.print_labels('emulator', ['^XA' + 'x' * 8192 + '^XZ'] * 500)
+        self.assertLess(raised.exception.labels_sent, 500)
+        self.assertLess(emulator.report()['queue_depth']['max'], 5)
+
+    def test_http_accepts_bridge_requests_and_reports_status(self):
+        emulator, server = self.start_server(tcp_port=None, http_port=0)
+        connection = http.client.HTTPConnection(*server.address('http'), timeout=5)
+        self.addCleanup(connection.close)
+
+        def request(method, path, body=None):
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            connection.request(method, path, json.dumps(body) if body is not None else None, headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        status, data = request('GET', '/printers')
+        printer_id = data['printers'][0]['id']
+        status, data = request('POST', '/print', {
+            'printer_id': printer_id, 'data': {'zpl': '^XA^FD1^FS^XZ^XA^FD2^FS^PQ2^XZ'},
+        })
+        self.assertEqual((status, data['success']), (200, True))
+        status, data = request('POST', '/print', {'printer_id': printer_id, 'data': {'zpl': 'nothing'}})
+        self.assertEqual(status, 400)
+
+        self.assertTrue(emulator.wait_idle(labels=3))
+        status, report = request('GET', '/status')
+        self.assertEqual((report['jobs_received'], report['labels_printed']), (1, 3))
+        self.assertEqual(report['jobs'][0]['source'], 'http')
+
+
+class ScanStreamParserTests(SimpleTestCase):
+    """Scans parsed one at a time, including GS1 compound barcodes."""
+
+    def test_gs1_element_strings(self):
+        self.assertEqual(parse_gs1(']C10100012345678905240232-9983\x1d3012'),
+                         {'01': '00012345678905', '240': '232-9983', '30': '12'})
+        self.assertEqual(parse_gs1('(240)232-9983(37)5'), {'240': '232-9983', '37': '5'})
+        # A custom FNC1 stand-in, and a fixed-length AI needing no separator
+        self.assertEqual(parse_gs1(']d23103000125240A1|375', separator='|'),
+                         {'3103': '000125', '240': 'A1', '37': '5'})
+        with self.assertRaises(GS1Error):
+            parse_gs1(']C10112345')
+        with self.assertRaises(GS1Error):
+            parse_gs1(']C1990abc')
+
+    def test_bracketed_values_are_length_checked(self):
+        self.assertEqual(parse_gs1('(240)232-9983(3103)000125'), {'240': '232-9983', '3103': '000125'})
+        for scan in ('(01)12345', '(240)' + 'x' * 31, '(240)232-9983(30)', '(240)232-9983(99)1'):
+            with self.subTest(scan=scan), self.assertRaises(GS1Error):
+                parse_gs1(scan)
+
+    def test_parenthesized_part_numbers_are_not_gs1(self):
+        self.assertTrue(looks_like_gs1('(240)232-9983(30)5'))
+        self.assertTrue(looks_like_gs1('(3103)000125'))
+        for scan in ('(A)232-9983', '(99)232', '(1)232', '(OLD) 232-9983'):
+            with self.subTest(scan=scan):
+                self.assertFalse(looks_like_gs1(scan))
+        parser = ScanStreamParser()
+        self.assertEqual(parser.feed('(A)232-9983'), [])
+        pair, = parser.feed('4')
+        self.assertEqual((pair['part_number'], pair['quantity'], pair['source']), ('(A)232-9983', 4, 'scan'))
+
+    def test_feed_returns_pairs_as_they_complete(self):
+        parser = ScanStreamParser()
+        self.assertEqual(parser.feed('232-9983'), [])
+        self.assertEqual(parser.state, ScanStreamParser.EXPECT_QUANTITY)
+        pair, = parser.feed('12')
+        self.assertEqual((pair['part_number'], pair['quantity'], pair['valid']), ('232-9983', 12, True))
+        pair, = parser.feed(']C1240243-0012\x1d301')
+        self.assertEqual((pair['part_number'], pair['quantity'], pair['source']), ('243-0012', 1, 'gs1'))
+        self.assertEqual(parser.finish(), [])
+
+    def test_missing_quantity_does_not_shift_later_pairs(self):
+        pairs = BulkScanParser.parse_scan_input('232-9983\n243-0012\n4\n(240)111-2222(30)2\n0\n555-0000\n')
+        self.assertEqual(
+            [(p['part_number'], p['quantity'], p['error']) for p in pairs],
+            [('232-9983', None, 'Missing quantity'), ('243-0012', 4, None), ('111-2222', 2, None),
+             ('0', None, 'Missing quantity'), ('555-0000', None, 'Missing quantity')],
+        )
+
+    def test_patterns_are_configurable(self):
+        with override_settings(SCAN_PARSER={'PART_PATTERN': r'\d{3}-\d{4}', 'GS1_SEPARATOR': '~'}):
+            self.assertFalse(BulkScanParser.validate_part_number('ABC'))
+            pairs = BulkScanParser.parse_scans(['ABC', '5', ']C1240232-9983~302'])
+        self.assertEqual([p['valid'] for p in pairs], [False, True])
+        self.assertEqual(pairs[0]['error'], 'Invalid part number format')
+        # GS1 decoding can be turned off; the scan is then a plain part number
+        pairs = BulkScanParser.parse_scans(['(240)232-9983', '3'], {'GS1': False})
+        self.assertEqual(pairs[0]['part_number'], '(240)232-9983')
+
+
+    def test_non_ascii_digit_quantities_are_invalid(self):
+        parser = ScanStreamParser()
+        for quantity in ('\u00b2', '\u0661\u0662', '\uff15'):
+            with self.subTest(quantity=quantity):
+                pair = parser.validate_pair('232-9983', quantity)
+                self.assertEqual((pair['quantity'], pair['valid']), (None, False))
+                self.assertEqual(pair['error'], f'Invalid quantity: {quantity}')
+        # Not read as a quantity, so the part before it is left without one
+        self.assertEqual(parser.feed('ABC'), [])
+        pair, = parser.feed('\u00b2')
+        self.assertEqual((pair['part_number'], pair['error']), ('ABC', 'Missing quantity'))
+
+
+class ScanViewTests(TestCase):
+    """Raw scans posted to the bulk generation and scan preview endpoints."""
+
+    def setUp(self):
+        Config.objects.create(pk=1, current_serial=500)
+
+    def test_process_bulk_scans_from_raw_scans(self):
+        # Plain part/quantity scans mixed with GS1 compound barcodes
+        scans = ['000-0001', '10', ']C1240001-0001\x1d3010', '(240)002-0001(37)10', '003-0001', '10',
+                 ']d2' + '30' + '10' + '\x1d' + '240004-0001']
+        data = post_json(self.client, 'process_bulk_scans', {'scans': scans}).json()['data']
+        self.assertEqual([r['part_number'] for r in data['results']], [f'{i:03d}-0001' for i in range(5)])
+        self.assertEqual(data['total_serials'], 50)
+
+    def test_parse_scan(self):
+        data = post_json(self.client, 'parse_scan', {'scan': ']C1240232-9983\x1d3012'}).json()['data']
+        self.assertEqual((data['part_number'], data['quantity'], data['complete']), ('232-9983', 12, True))
+
+    def test_parse_scan_rejects_non_ascii_quantities(self):
+        response = post_json(self.client, 'parse_scan', {'scan': '(240)232-9983(30)\u00b2'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['quantity'], data['valid'], data['complete']), (None, False, True))
+        data = post_json(self.client, 'parse_scan', {'scan': '232-9983'}).json()['data']
+        self.assertEqual((data['part_number'], data['complete']), ('232-9983', False))
+        data = post_json(self.client, 'parse_scan', {'scan': '(A)232-9983'}).json()['data']
+        self.assertEqual((data['part_number'], data['complete']), ('(A)232-9983', False))
+
+
+class SerialExportTests(TestCase):
+    """Streaming CSV/NDJSON export of serial history."""
+
+    def setUp(self):
+        create_serials(5)
+        create_serials(3, part_number='243-0012', upc=None, first=505, first_seq=6)
+
+    def test_csv_is_streamed_in_row_chunks(self):
+        chunks = list(SerialExportService.stream(SerialExportService.build_queryset(), 'csv', chunk_size=3))
+        # Header, then blocks of at most three rows
+        self.assertEqual(chunks[0], 'serial_number,part_number,upc,created_at\r\n')
+        self.assertEqual([chunk.count('\n') for chunk in chunks[1:]], [3, 3, 2])
+        rows = [line.split(',') for line in ''.join(chunks[1:]).splitlines()]
+        self.assertEqual([row[0] for row in rows], [str(500 + i).zfill(6) for i in range(8)])
+        self.assertEqual(rows[-1][1:3], ['243-0012', ''])
+
+    def test_gzip_ndjson(self):
+        data = b''.join(SerialExportService.stream(SerialExportService.build_queryset(), 'ndjson', compress=True))
+        records = [json.loads(line) for line in gzip.decompress(data).decode().splitlines()]
+        self.assertEqual(len(records), 8)
+        self.assertEqual(records[0]['serial_number'], '000500')
+        self.assertEqual(set(records[0]), {'serial_number', 'part_number', 'upc', 'created_at'})
+
+    def test_filters(self):
+        old = timezone.now() - timedelta(days=10)
+        SerialNumber.objects.filter(serial_number__lt='000502').update(created_at=old)
+
+        def serials(**filters):
+            return [row[0] for row in SerialExportService.build_queryset(**filters)]
+
+        self.assertEqual(serials(part_number='243-0012'), ['000505', '000506', '000507'])
+        self.assertEqual(serials(serial_from='000503', serial_to='000505'), ['000503', '000504', '000505'])
+        # A bare end date covers that whole day
+        end = SerialExportService.parse_date_bound(timezone.localdate(old).isoformat(), end_of_day=True)
+        self.assertEqual(serials(end_date=end), ['000500', '000501'])
+        start = SerialExportService.parse_date_bound(timezone.localdate(old + timedelta(days=1)).isoformat())
+        self.assertEqual(len(serials(start_date=start)), 6)
+
+    def test_archived_rows_stream_first(self):
+        ArchivedSerialNumber.objects.create(
+            serial_number='000400', part_number_id='232-9983', created_at=timezone.now(),
+        )
+        querysets = [SerialExportService.build_queryset(archived=True), SerialExportService.build_queryset()]
+        lines = ''.join(SerialExportService.stream(querysets, 'csv')).splitlines()
+        self.assertEqual([line[:6] for line in lines[1:3]], ['000400', '000500'])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            SerialExportService.stream(SerialExportService.build_queryset(), 'xml')
+        with self.assertRaises(ValueError):
+            SerialExportService.parse_date_bound('last tuesday')
+
+
+class ChangeFeedTests(TestCase):
+    """Sequence stamping of serials and UPC changes, and paging the feed."""
+
+    databases = {'default', 'system'}
+
+    def setUp(self):
+        Config.objects.create(pk=1, current_serial=500)
+
+    def test_pages_interleave_serials_and_upc_changes_in_seq_order(self):
+        SerialNumberGenerator.generate_serials('232-9983', 3)
+        with transaction.atomic():
+            Product.objects.create(
+                part_number='243-0012', upc='012345678905', change_seq=ChangeFeedService.reserve_locked(1),
+            )
+        SerialNumberGenerator.generate_serials('232-9983', 2)
+
+        first = ChangeFeedService.fetch(0, limit=3)
+        self.assertEqual([c['seq'] for c in first['changes']], [1, 2, 3])
+        self.assertEqual((first['next_cursor'], first['has_more']), (3, True))
+        second = ChangeFeedService.fetch(first['next_cursor'], limit=3)
+        self.assertEqual([(c['seq'], c['type']) for c in second['changes']], [(4, 'upc'), (5, 'serial'), (6, 'serial')])
+        self.assertFalse(second['has_more'])
+        # Polling at the end returns nothing and keeps the cursor
+        self.assertEqual(ChangeFeedService.fetch(6), {'changes': [], 'next_cursor': 6, 'has_more': False})
+
+    def test_upc_changes_take_the_next_sequence(self):
+        SerialNumberGenerator.generate_serials('232-9983', 2)
+        client = make_admin_client()
+        post_json(client, 'admin_update_upc', {'part_number': '232-9983', 'upc': '012345678905'})
+        self.assertEqual(Product.objects.get(pk='232-9983').change_seq, 3)
+        # Saving the same UPC again is not a change
+        post_json(client, 'admin_update_upc', {'part_number': '232-9983', 'upc': '012345678905'})
+        self.assertEqual(Config.objects.get(pk=1).last_change_seq, 3)
+
+    def test_backfill_numbers_existing_rows(self):
+        create_serials(3, first=500)
+        SerialNumber.objects.update(change_seq=None)
+        Product.objects.create(part_number='243-0012', upc='012345678905')
+        Product.objects.create(part_number='243-0013')
+
+        backfill = importlib.import_module('inventory.migrations.0006_change_feed_sequence').backfill_change_seq
+        backfill(django_apps, None)
+
+        self.assertEqual(
+            list(SerialNumber.objects.order_by('serial_number').values_list('change_seq', flat=True)), [1, 2, 3]
+        )
+        # Products with a UPC follow the serials; those without have no change yet
+        self.assertEqual(
+            dict(Product.objects.values_list('part_number', 'change_seq')),
+            {'232-9983': 4, '243-0012': 5, '243-0013': None},
+        )
+        self.assertEqual(Config.objects.get(pk=1).last_change_seq, 5)
+
+
+class AdminConfigSaveTests(TransactionTestCase):
+    """Admin page saves must not write back a stale change feed counter."""
+
+    # The page lists products from the read-only alias
+    databases = '__all__'
+
+    def setUp(self):
+        Config.objects.create(pk=1, current_serial=500)
+
+    def test_admin_config_save_keeps_the_feed_counter(self):
+        stale = Config.objects.get(pk=1)
+        # Serials are generated after the admin page read the config
+        SerialNumberGenerator.generate_serials('232-9983', 5)
+        with mock.patch('inventory.views.SerialNumberGenerator.get_config', return_value=stale):
+            make_admin_client().post(reverse('inventory:admin_upc'), {
+                'update_config': '1', 'serial_digits': 6, 'current_serial': 600,
+            })
+        config = Config.objects.get(pk=1)
+        self.assertEqual((config.current_serial, config.last_change_seq), (600, 5))
+        # The next run continues the sequence instead of reusing 1..5
+        SerialNumberGenerator.generate_serials('232-9983', 1)
+        self.assertEqual(SerialNumber.objects.get(serial_number='000600').change_seq, 6)
+
+
+class SqlitePragmaTests(TestCase):
+    """The PRAGMA profile applied to every SQLite connection."""
+
+    def test_alias_overrides(self):
+        pragmas = get_sqlite_pragmas('reader')
+        self.assertNotIn('PRAGMA journal_mode=WAL', pragma_statements(pragmas))
+        self.assertIn('PRAGMA query_only=ON', pragma_statements(pragmas))
+        self.assertIn('PRAGMA journal_mode=WAL', pragma_statements(get_sqlite_pragmas('default')))
+
+    def test_rejects_values_that_could_inject_sql(self):
+        with self.assertRaises(ValueError):
+            pragma_statements({'cache_size': '1; DROP TABLE inventory_product'})
+        with self.assertRaises(ValueError):
+            pragma_statements({'Bad-Name': 1})
+
+    def test_applied_to_new_connections(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -65536)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    """Reads go to the read-only alias only inside @read_only_db views."""
+
+    router = ReadReplicaRouter()
+
+    def test_reads_are_routed_only_inside_read_only_views(self):
+        self.assertIsNone(self.router.db_for_read(SerialNumber))
+
+        @read_only_db
+        def view():
+            return self.router.db_for_read(SerialNumber), self.router.db_for_write(SerialNumber)
+
+        self.assertEqual(view(), ('reader', None))
+        # The flag is reset once the view returns
+        self.assertIsNone(self.router.db_for_read(SerialNumber))
+
+    def test_async_views(self):
+        @read_only_db
+        async def view():
+            return self.router.db_for_read(Product)
+
+        self.assertEqual(async_to_sync(view)(), 'reader')
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_reader_is_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate('reader', 'inventory'))
+        self.assertIsNone(self.router.allow_migrate('default', 'inventory'))
+
+
+class SystemAppsRouterTests(TestCase):
+    """Django's own apps live in the 'system' database, inventory in 'default'."""
+
+    databases = {'default', 'system'}
+    router = SystemAppsRouter()
+
+    def test_system_apps_use_the_system_alias(self):
+        self.assertEqual(self.router.db_for_read(Session), 'system')
+        self.assertEqual(self.router.db_for_write(Session), 'system')
+        self.assertIsNone(self.router.db_for_read(SerialNumber))
+        self.assertIsNone(self.router.db_for_write(SerialNumber))
+
+    def test_migrations_stay_on_their_own_database(self):
+        self.assertTrue(self.router.allow_migrate('system', 'sessions'))
+        self.assertFalse(self.router.allow_migrate('default', 'sessions'))
+        self.assertFalse(self.router.allow_migrate('system', 'inventory'))
+        self.assertIsNone(self.router.allow_migrate('default', 'inventory'))
+
+    def test_sessions_are_stored_in_the_system_database(self):
+        key = make_admin_client().session.session_key
+        self.assertTrue(Session.objects.using('system').filter(session_key=key).exists())
+        self.assertNotIn('django_session', connections['default'].introspection.table_names())
+
+
+class SerialArchiveTests(TestCase):
+    """Batched moves to the archive table and lookups that fall through to it."""
+
+    def setUp(self):
+        create_serials(6)
+        self.cutoff = timezone.now() - timedelta(days=90)
+        # 000501, 000503, 000505 are old enough to archive
+        SerialNumber.objects.filter(serial_number__in=['000501', '000503', '000505']).update(
+            created_at=self.cutoff - timedelta(days=1),
+        )
+
+    def test_archive_moves_old_rows_in_batches(self):
+        progress = []
+        self.assertEqual(SerialArchiveService.archive(self.cutoff, batch_size=2, progress_callback=progress.append), 3)
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(
+            sorted(SerialNumber.objects.values_list('serial_number', flat=True)), ['000500', '000502', '000504'],
+        )
+        self.assertEqual(
+            dict(ArchivedSerialNumber.objects.values_list('serial_number', 'change_seq')),
+            {'000501': 2, '000503': 4, '000505': 6},
+        )
+        # Running again finds nothing left to move
+        self.assertEqual(SerialArchiveService.archive(self.cutoff, batch_size=2), 0)
+
+    def test_lookup_falls_through_to_the_archive(self):
+        SerialArchiveService.archive(self.cutoff)
+        self.assertFalse(SerialArchiveService.lookup('000500')['archived'])
+        archived = SerialArchiveService.lookup('000501')
+        self.assertEqual((archived['part_number'], archived['archived']), ('232-9983', True))
+        self.assertIsNone(SerialArchiveService.lookup('999999'))
+        self.assertTrue(async_to_sync(SerialArchiveService.alookup)('000503')['archived'])
+
+    def test_change_feed_still_returns_archived_serials(self):
+        SerialArchiveService.archive(self.cutoff)
+        page = ChangeFeedService.fetch(0, limit=4)
+        self.assertEqual([c['serial_number'] for c in page['changes']], ['000500', '000501', '000502', '000503'])
+        self.assertTrue(page['has_more'])
+        self.assertEqual([c['seq'] for c in ChangeFeedService.fetch(page['next_cursor'])['changes']], [5, 6])
+
+
+class SerialIndexTests(TestCase):
+    """The Bloom filter and the in-memory serial index against the database."""
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'A{i}')
+        self.assertTrue(all(f'A{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'B{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_add_keeps_serials_of_different_widths_apart(self):
+        index = SerialIndex()
+        index.add('000502', '232-9983', '012345678905')
+        index.add('000500', '232-9983', '012345678905')
+        index.add('500', '243-0012', None)
+        index.add('RMA-7', '243-0012', None)
+        self.assertEqual(list(index.keys), [500, 500, 502])
+        self.assertEqual(index.get('000500'), ('232-9983', '012345678905'))
+        self.assertEqual(index.get('500'), ('243-0012', None))
+        self.assertEqual(index.get('RMA-7'), ('243-0012', None))
+        self.assertIsNone(index.get('000501'))
+        self.assertEqual(len(index), 4)
+
+    def test_sync_and_check_follow_the_database(self):
+        create_serials(3)
+        index = SerialIndex()
+        index.load()
+        self.assertTrue(index.check()['ok'])
+
+        # Serials generated by another process after the load
+        create_serials(2, first=503, first_seq=4)
+        report = index.check()
+        self.assertFalse(report['ok'])
+        self.assertEqual(report['missing'], ['000503', '000504'])
+
+        index.sync()
+        self.assertEqual(index.last_seq, 5)
+        self.assertTrue(index.check()['ok'])
+
+    def test_only_possible_new_serials_are_confirmed(self):
+        create_serials(3)
+        index = SerialIndex()
+        index.load()
+        for serial in ('NOT-A-SERIAL', '000499', '0000503', '503'):
+            with self.subTest(serial=serial), self.assertNumQueries(0):
+                self.assertFalse(index.confirm(serial))
+        create_serials(1, first=503, first_seq=4)
+        with self.assertNumQueries(1):
+            self.assertTrue(index.confirm('000503'))
+
+    def test_sync_queries_without_holding_the_lock(self):
+        create_serials(1)
+        index = SerialIndex()
+        index.load()
+        locked = []
+
+        def probe():
+            # What a lookup on another thread would see during the query
+            acquired = index._lock.acquire(blocking=False)
+            if acquired:
+                index._lock.release()
+            locked.append(not acquired)
+
+        def try_lock(execute, sql, params, many, context):
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return execute(sql, params, many, context)
+
+        with connections['default'].execute_wrapper(try_lock):
+            index.sync()
+        self.assertEqual(locked, [False])
+
+
+@override_settings(SERIAL_INDEX={'ENABLED': True, 'SYNC_INTERVAL': 3600})
+class SerialIndexLookupTests(TransactionTestCase):
+    """lookup_serial with the index enabled."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        patcher = mock.patch('inventory.serial_index._index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        create_serials(1)
+
+    def lookup(self, serial):
+        return self.client.get(reverse('inventory:lookup_serial'), {'serial': serial})
+
+    def test_mis_scans_are_rejected(self):
+        self.assertEqual(self.lookup('000500').status_code, 200)
+        with self.assertNumQueries(0), self.assertNumQueries(0, using='reader'):
+            self.assertEqual(self.lookup('NOT-A-SERIAL').status_code, 404)
+
+    def test_serials_from_another_process_are_found_before_the_next_sync(self):
+        self.assertEqual(self.lookup('000500').status_code, 200)
+        create_serials(1, first=501, first_seq=2)
+        response = self.lookup('000501')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['part_number'], '232-9983')
+
+
+class ServeCommandTests(SimpleTestCase):
+    """Address parsing and option checks of manage.py serve."""
+
+    def test_parse_addrport(self):
+        self.assertEqual(parse_addrport(None, '127.0.0.1', 8001), ('127.0.0.1', 8001))
+        self.assertEqual(parse_addrport('9000', '127.0.0.1', 8001), ('127.0.0.1', 9000))
+        self.assertEqual(parse_addrport('0.0.0.0:9000', '127.0.0.1', 8001), ('0.0.0.0', 9000))
+        self.assertEqual(parse_addrport('[::1]:9000', '127.0.0.1', 8001), ('::1', 9000))
+        self.assertEqual(parse_addrport(':9000', '127.0.0.1', 8001), ('127.0.0.1', 9000))
+        for addrport in ('web', '0.0.0.0:', 'host:80a'):
+            with self.assertRaises(CommandError):
+                parse_addrport(addrport, '127.0.0.1', 8001)
+
+    @override_settings(SERVER={'PORT': 9100, 'THREADS': 16})
+    def test_settings_override_the_defaults(self):
+        server = get_server_settings()
+        self.assertEqual((server['HOST'], server['PORT'], server['THREADS']), ('127.0.0.1', 9100, 16))
+
+    def test_options_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, '--threads must be at least 1'):
+            call_command('serve', '--threads', '0')
+
+
+class AsyncViewTests(TransactionTestCase):
+    """The async lookup and label views served through the ASGI handler."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        create_serials(2)
+        cutoff = timezone.now() - timedelta(days=90)
+        SerialNumber.objects.filter(serial_number='000501').update(created_at=cutoff - timedelta(days=1))
+        SerialArchiveService.archive(cutoff)
+        self.client = AsyncClient()
+
+    async def test_lookup_serial(self):
+        url = reverse('inventory:lookup_serial')
+        hot = (await self.client.get(url, {'serial': '000500'})).json()['data']
+        self.assertEqual((hot['part_number'], hot['archived']), ('232-9983', False))
+        archived = (await self.client.get(url, {'serial': '000501'})).json()['data']
+        self.assertTrue(archived['archived'])
+        self.assertEqual((await self.client.get(url, {'serial': '999999'})).status_code, 404)
+
+    async def test_generate_label_zpl(self):
+        url = reverse('inventory:generate_label_zpl')
+        response = await self.client.post(url, json.dumps({
+            'label_type': 'serial', 'serial_number': '000500', 'part_number': '232-9983', 'upc': '012345678905',
+        }), content_type='application/json')
+        self.assertIn('000500', response.json()['zpl'])
+        response = await self.client.post(url, json.dumps({'label_type': 'pallet'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class AsgiServeTests(SimpleTestCase):
+    """manage.py serve --asgi."""
+
+    def test_persistent_connections_are_disabled(self):
+        with ExitStack() as stack:
+            for database in connections.settings.values():
+                stack.enter_context(mock.patch.dict(database))
+            stack.enter_context(mock.patch.object(ServeCommand, 'ensure_static_files'))
+            run = stack.enter_context(mock.patch('uvicorn.run'))
+            call_command('serve', '127.0.0.1:9001', '--asgi', stdout=io.StringIO())
+
+            self.assertEqual({database['CONN_MAX_AGE'] for database in connections.settings.values()}, {0})
+        self.assertEqual(run.call_args.kwargs['port'], 9001)
+        self.assertNotEqual(connections.settings['default']['CONN_MAX_AGE'], 0)
+
+
+class StartupFingerprintTests(TestCase):
+    """The tray app skips migrate only while the schema stamp still matches."""
+
+    databases = {'default', 'system'}
+
+    def setUp(self):
+        stamp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(stamp_dir.cleanup)
+        override = override_settings(BASE_DIR=Path(stamp_dir.name))
+        override.enable()
+        self.addCleanup(override.disable)
+        self.fingerprint = startup.migration_fingerprint()
+
+    def test_fingerprint_follows_the_migration_files(self):
+        self.assertEqual(startup.migration_fingerprint(), self.fingerprint)
+        real_iter_modules = startup.pkgutil.iter_modules
+
+        def iter_modules(path):
+            yield from real_iter_modules(path)
+            yield None, '9999_new_migration', False
+
+        with mock.patch.object(startup.pkgutil, 'iter_modules', iter_modules):
+            self.assertNotEqual(startup.migration_fingerprint(), self.fingerprint)
+
+    def test_stamp_matches_until_the_schema_changes(self):
+        self.assertFalse(startup.schema_is_current(self.fingerprint))
+        startup.write_stamp(self.fingerprint)
+        self.assertTrue(startup.schema_is_current(self.fingerprint))
+        self.assertFalse(startup.schema_is_current('0' * 64))
+
+        # A database restored from an older backup has a different migration count
+        with connections['system'].cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO django_migrations (app, name, applied) VALUES ('sessions', '9999_restored', ?)",
+                [timezone.now()],
+            )
+        self.assertFalse(startup.schema_is_current(self.fingerprint))
+
+    def test_ensure_schema_skips_migrate_when_current(self):
+        with mock.patch('django.core.management.call_command') as call:
+            self.assertTrue(startup.ensure_schema())
+            self.assertEqual([c.kwargs['database'] for c in call.call_args_list], ['default', 'system'])
+            self.assertTrue(Config.objects.exists())
+
+            call.reset_mock()
+            self.assertFalse(startup.ensure_schema())
+            call.assert_not_called()
+
+
+class BundleConfigTests(SimpleTestCase):
+    """What the PyInstaller bundle leaves out."""
+
+    def test_excluded_modules(self):
+        self.assertTrue(is_excluded('django.contrib.admin'))
+        self.assertTrue(is_excluded('django.contrib.admin.sites'))
+        self.assertTrue(is_excluded('uvicorn'))
+        self.assertFalse(is_excluded('django.contrib.administrator'))
+        self.assertFalse(is_excluded('django.contrib.auth'))
+        self.assertFalse(is_excluded('inventory.views'))
+
+    def test_data_files_of_excluded_apps_and_locales_are_dropped(self):
+        self.assertFalse(keep_data_file('django/contrib/admin/templates/admin/base.html'))
+        self.assertFalse(keep_data_file('django\\contrib\\admin\\static\\admin\\css\\base.css'))
+        self.assertFalse(keep_data_file('django/conf/locale/de/LC_MESSAGES/django.mo'))
+        self.assertFalse(keep_data_file('django/conf/locale/en/LC_MESSAGES/django.po'))
+        self.assertTrue(keep_data_file('django/conf/locale/en/LC_MESSAGES/django.mo'))
+        self.assertTrue(keep_data_file('inventory/templates/inventory/base.html'))
+
+
+class AsgiStaticFilesTests(SimpleTestCase):
+    """Static files answered in front of Django under ASGI."""
+
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        root = Path(static_root.name)
+        (root / 'app.css').write_text('body { color: black; }\n' * 100)
+        (root / 'app.css.gz').write_bytes(gzip.compress((root / 'app.css').read_bytes()))
+        override = override_settings(
+            STATIC_ROOT=root,
+            MIDDLEWARE=[WHITENOISE_MIDDLEWARE, 'django.middleware.common.CommonMiddleware'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def request(self, application, path, method='GET', headers=()):
+        messages = []
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # Django waits for the client to disconnect while it responds
+            while not any(m['type'] == 'http.response.body' and not m.get('more_body') for m in messages):
+                await asyncio.sleep(0.01)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'root_path': '', 'headers': [(b'host', b'testserver'), *headers],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        async_to_sync(application)(scope, receive, send)
+        start = messages[0]
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return start['status'], dict(start['headers']), body
+
+    def test_static_files_skip_the_django_middleware(self):
+        # The middleware is left out of the ASGI chain, without changing the settings
+        with mock.patch.object(WhiteNoiseMiddleware, '__init__', side_effect=AssertionError('loaded')):
+            application = get_asgi_application()
+        self.assertIn(WHITENOISE_MIDDLEWARE, settings.MIDDLEWARE)
+
+        status, headers, body = self.request(application, '/static/app.css')
+        self.assertEqual((status, headers[b'content-type']), (200, b'text/css; charset="utf-8"'))
+        self.assertEqual(body, b'body { color: black; }\n' * 100)
+
+        status, headers, body = self.request(
+            application, '/static/app.css', headers=[(b'accept-encoding', b'gzip, br')],
+        )
+        self.assertEqual(headers[b'content-encoding'], b'gzip')
+        self.assertEqual(gzip.decompress(body), b'body { color: black; }\n' * 100)
+
+        status, _, body = self.request(application, '/static/app.css', method='HEAD')
+        self.assertEqual((status, body), (200, b''))
+
+    def test_hashed_files_are_immutable(self):
+        root = Path(settings.STATIC_ROOT)
+        (root / 'app.0123456789ab.css').write_text('body {}\n')
+        _, headers, _ = self.request(get_asgi_application(), '/static/app.0123456789ab.css')
+        self.assertIn(b'immutable', headers[b'cache-control'])
+        _, headers, _ = self.request(get_asgi_application(), '/static/app.css')
+        self.assertNotIn(b'immutable', headers[b'cache-control'])
+
+    def test_other_paths_reach_django(self):
+        status, _, _ = self.request(get_asgi_application(), '/static/missing.css')
+        self.assertEqual(status, 404)
+
+    def test_wsgi_keeps_the_middleware(self):
+        response = Client().get('/static/app.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'body { color: black; }\n' * 100)
+
+
+@override_settings(SERIAL_EVENTS_POLL_INTERVAL=0.05)
+class SerialEventBrokerTests(TransactionTestCase):
+    """Publishing counter events to subscribed event loops, and the poller."""
+
+    def setUp(self):
+        Config.objects.create(pk=1, current_serial=500, serial_digits=6)
+        self.broker = SerialEventBroker()
+
+    async def next_event(self, queue):
+        return await asyncio.wait_for(queue.get(), 5)
+
+    async def test_publish_reaches_subscribers_from_any_thread(self):
+        first = self.broker.subscribe({'current_serial': 500, 'serial_digits': 6})
+        second = self.broker.subscribe()
+        thread = threading.Thread(target=self.broker.publish, args=('counter', {'current_serial': 510, 'serial_digits': 6}))
+        thread.start()
+        thread.join()
+        self.assertEqual((await self.next_event(first))[1]['current_serial'], 510)
+        self.assertEqual((await self.next_event(second))[0], 'counter')
+
+        self.broker.unsubscribe(first)
+        self.broker.unsubscribe(second)
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+    async def test_slow_subscribers_keep_the_latest_events(self):
+        queue = self.broker.subscribe({'current_serial': 500, 'serial_digits': 6})
+        for serial in range(501, 502 + SUBSCRIBER_QUEUE_SIZE):
+            self.broker.publish('counter', {'current_serial': serial, 'serial_digits': 6})
+        await asyncio.sleep(0)
+        events = [queue.get_nowait()[1]['current_serial'] for _ in range(queue.qsize())]
+        self.assertEqual(len(events), SUBSCRIBER_QUEUE_SIZE)
+        self.assertEqual(events[-1], 501 + SUBSCRIBER_QUEUE_SIZE)
+        self.broker.unsubscribe(queue)
+
+    async def test_poller_publishes_changes_from_other_processes(self):
+        queue = self.broker.subscribe({'current_serial': 500, 'serial_digits': 6})
+        # Another server process moves the counter
+        await Config.objects.filter(pk=1).aupdate(current_serial=600)
+        event_type, data = await self.next_event(queue)
+        self.assertEqual((event_type, data['next_serial']), ('counter', '000600'))
+
+        self.broker.unsubscribe(queue)
+        poller = self.broker._poller
+        await asyncio.to_thread(poller.join, 5)
+        self.assertFalse(poller.is_alive())
+
+    async def test_stream_sends_the_state_then_generation_events(self):
+        stream = stream_events({'current_serial': 500, 'serial_digits': 6, 'next_serial': '000500'})
+        self.assertTrue((await anext(stream)).startswith('event: counter\n'))
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        await sync_to_async(SerialNumberGenerator.generate_serials)('232-9983', 2)
+        message = await asyncio.wait_for(pending, 5)
+        # The shared poller may first report a counter it saw before this test
+        while not message.startswith('event: generated\n'):
+            message = await asyncio.wait_for(anext(stream), 5)
+        self.assertEqual(json.loads(message.split('data: ', 1)[1])['next_serial'], '000502')
+        await stream.aclose()
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_wsgi_requests_poll(self):
+        # A WSGI worker can't hold the stream open: one event, a retry hint, done
+        response = Client().get(reverse('inventory:serial_events'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        retry, message = response.content.decode().split('\n', 1)
+        self.assertEqual(retry, 'retry: 50')
+        self.assertEqual(message, format_event('counter', serial_state(500, 6)))
+        self.assertEqual(broker.subscriber_count(), 0)
+
+
+class MetricsTests(SimpleTestCase):
+    """Prometheus text rendering of counters, gauges and histograms."""
+
+    def test_counter_and_gauge(self):
+        counter = metrics.Counter('scans_total', 'Scans.', ('station', 'result'))
+        counter.inc(station='dock "1"', result='hit')
+        counter.inc(2, station='dock "1"', result='hit')
+        counter.inc(station='line\n2', result='miss')
+        self.assertEqual(counter.render(), [
+            '# HELP scans_total Scans.',
+            '# TYPE scans_total counter',
+            'scans_total{station="dock \\"1\\"",result="hit"} 3',
+            'scans_total{station="line\\n2",result="miss"} 1',
+        ])
+        gauge = metrics.Gauge('rate', 'Rate.')
+        gauge.set(12.5)
+        gauge.set(40.0)
+        self.assertEqual(gauge.render()[-1], 'rate 40')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('latency_seconds', 'Latency.', ('view',), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value, view='lookup')
+        self.assertEqual(histogram.render()[2:], [
+            'latency_seconds_bucket{view="lookup",le="0.1"} 2',
+            'latency_seconds_bucket{view="lookup",le="1"} 3',
+            'latency_seconds_bucket{view="lookup",le="+Inf"} 4',
+            'latency_seconds_sum{view="lookup"} 3.65',
+            'latency_seconds_count{view="lookup"} 4',
+        ])
+
+    def test_label_sets_are_capped(self):
+        counter = metrics.Counter('generated_total', 'Generated.', ('part_number',))
+        with mock.patch.object(metrics, 'MAX_LABEL_SETS', 2):
+            for part_number in ('A', 'B', 'C', 'D', 'A'):
+                counter.inc(part_number=part_number)
+        self.assertEqual(counter.render()[2:], [
+            'generated_total{part_number="A"} 2',
+            'generated_total{part_number="B"} 1',
+            'generated_total{part_number="other"} 2',
+        ])
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('inventory:metrics'))
+        body = self.client.get(reverse('inventory:metrics')).content.decode()
+        self.assertIn('labelgen_http_requests_total{view="inventory:metrics",method="GET",status="200"}', body)
+        self.assertIn('# TYPE labelgen_http_request_duration_seconds histogram', body)
+        self.assertTrue(body.endswith('\n'))
+
+
+class RequestProfilerTests(TestCase):
+    """Sampling, the slow-request log and the profiler middleware."""
+
+    def make_profiler(self, **options):
+        return RequestProfiler(dict(
+            {'SAMPLE_RATE': 1, 'SLOW_THRESHOLD_MS': 500, 'KEEP': 50, 'TRACEMALLOC': True}, **options
+        ))
+
+    def profile(self, profiler, view):
+        request = RequestFactory().get('/api/lookup/')
+        state, token = profiler.start()
+        response = view()
+        profiler.finish(request, response, state, token)
+        return profiler.log.records()
+
+    def test_sampled_requests_get_a_profile_and_sql_count(self):
+        profiler = self.make_profiler()
+        with connections['default'].execute_wrapper(_sql_wrapper):
+            records = self.profile(profiler, lambda: (Config.objects.count(), HttpResponse())[1])
+        self.assertEqual(len(records), 1)
+        self.assertEqual((records[0]['sampled'], records[0]['sql_count']), (True, 1))
+        self.assertIn('function calls', records[0]['profile'])
+        self.assertIsNotNone(records[0]['peak_alloc_kb'])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_unsampled_requests_are_kept_only_when_slow(self):
+        self.assertEqual(self.profile(self.make_profiler(SAMPLE_RATE=0), HttpResponse), [])
+        records = self.profile(self.make_profiler(SAMPLE_RATE=0, SLOW_THRESHOLD_MS=0), HttpResponse)
+        self.assertEqual((len(records), records[0]['sampled'], records[0]['profile']), (1, False, None))
+
+    def test_log_keeps_the_slowest(self):
+        log = SlowRequestLog(keep=2)
+        for duration_ms in (30, 10, 50, 20):
+            log.add({'duration_ms': duration_ms})
+        self.assertEqual([record['duration_ms'] for record in log.records()], [50, 30])
+        self.assertFalse(log.would_keep(25))
+
+    def test_middleware_stops_profiling_when_the_view_raises(self):
+        profiler = self.make_profiler()
+
+        def view(request):
+            raise RuntimeError('boom')
+
+        with mock.patch('inventory.middleware.get_profiler', return_value=profiler):
+            middleware = profiler_middleware(view)
+        with self.assertRaises(RuntimeError):
+            middleware(RequestFactory().get('/api/lookup/'))
+
+        self.assertFalse(profiler._profile_lock.locked())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(profiler.log.records()[0]['status'], 500)
+
+    def test_async_profiles_are_marked_event_loop_only(self):
+        profiler = self.make_profiler()
+
+        async def view(request):
+            return HttpResponse()
+
+        with mock.patch('inventory.middleware.get_profiler', return_value=profiler):
+            middleware = profiler_middleware(view)
+        async_to_sync(middleware)(RequestFactory().get('/api/lookup/'))
+        self.assertTrue(profiler.log.records()[0]['event_loop_only'])
+
+
+class SlowQueryLogTests(TestCase):
+    """SQL shapes, plan scanning and recording of slow statements."""
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t\n WHERE a = 'O''Brien' AND b IN (%s, %s,%s) AND c > 12.5"),
+            'SELECT * FROM t WHERE a = ? AND b IN (%s, ...) AND c > ?',
+        )
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE id IN (%s, %s)'),
+            normalize_sql('SELECT * FROM t WHERE id IN (%s, %s, %s, %s)'),
+        )
+
+    def test_scanned_tables(self):
+        plan = [
+            'SCAN inventory_serialnumber',
+            'SEARCH inventory_product USING INDEX sqlite_autoindex_inventory_product_1 (part_number=?)',
+            'SCAN TABLE "inventory_config"',
+            'SCAN inventory_serialnumber USING COVERING INDEX inventory_serialnumber_created_at',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(scanned_tables(plan), ['inventory_serialnumber', 'inventory_config'])
+
+    def test_params_of_sensitive_tables_are_redacted(self):
+        self.assertEqual(format_params('UPDATE "inventory_config" SET admin_password = %s', ['x']), '<redacted>')
+        self.assertTrue(format_params('SELECT %s', ['a' * 500]).endswith('...'))
+
+    def test_slow_statements_are_recorded_with_their_plan(self):
+        query_log = SlowQueryLog({
+            'THRESHOLD_MS': 0, 'EXPLAIN': True, 'KEEP_SHAPES': 10,
+            'FLAG_TABLES': ('inventory_serialnumber',),
+        })
+        create_serials(2)
+        with self.assertLogs('inventory.slow_queries', 'WARNING'):
+            with connections['default'].execute_wrapper(query_log):
+                list(SerialNumber.objects.filter(upc='012345678905'))
+                list(SerialNumber.objects.filter(serial_number='000500'))
+        entries = query_log.shapes.entries()
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0]['flagged'], ['inventory_serialnumber'])
+        self.assertEqual(entries[1]['flagged'], [])
+        self.assertEqual(entries[0]['views'], {'-': 1})
+
+
+class BenchmarkReportTests(SimpleTestCase):
+    """Timing summaries and the baseline comparison of manage.py bench."""
+
+    def test_summarize(self):
+        self.assertEqual(percentile([], 0.5), 0.0)
+        summary = summarize([i / 1000 for i in range(1, 101)])
+        self.assertEqual(
+            (summary['runs'], summary['p50_ms'], summary['p95_ms'], summary['min_ms'], summary['max_ms']),
+            (100, 50.0, 95.0, 1.0, 100.0),
+        )
+        self.assertEqual(summary['mean_ms'], 50.5)
+
+    def test_compare_to_baseline(self):
+        baseline = {'scenarios': {
+            'lookup': {'p50_ms': 2.0},
+            'generate': {'p50_ms': 10.0},
+            'zero': {'p50_ms': 0},
+        }}
+        results = {
+            'lookup': {'p50_ms': 2.5},
+            'generate': {'p50_ms': 10.5},
+            'zero': {'p50_ms': 1.0},
+            'new_scenario': {'p50_ms': 5.0},
+        }
+        comparison = {row['scenario']: row for row in compare_to_baseline(results, baseline, tolerance=0.1)}
+        self.assertEqual(set(comparison), {'lookup', 'generate', 'zero'})
+        self.assertEqual((comparison['lookup']['change'], comparison['lookup']['regressed']), (0.25, True))
+        self.assertEqual((comparison['generate']['change'], comparison['generate']['regressed']), (0.05, False))
+        self.assertFalse(comparison['zero']['regressed'])
+        self.assertEqual(compare_to_baseline(results, {}, tolerance=0.1), [])
+
+
+class BenchmarkRunTests(TestCase):
+    """Scenarios leave the saved benchmark dataset as they found it."""
+
+    databases = {'default', 'system'}
+
+    def test_scenario_writes_are_rolled_back(self):
+        Config.objects.create(pk=1, current_serial=503, serial_digits=6, last_change_seq=3)
+        create_serials(3)
+        suite = mock.Mock()
+        suite.scenarios.return_value = [
+            ('generate', 3, lambda: SerialNumberGenerator.generate_serials('232-9983', 10)),
+            ('other', 3, lambda: Product.objects.create(part_number=f'B-{Product.objects.count()}')),
+        ]
+        results = run_suite(suite, selected=['generate'], log=lambda line: None)
+
+        self.assertEqual(list(results), ['generate'])
+        self.assertEqual(results['generate']['runs'], 3)
+        self.assertEqual(SerialNumber.objects.count(), 3)
+        self.assertEqual(Config.objects.get(pk=1).current_serial, 503)
+        self.assertFalse(GenerationBatch.objects.exists())
+
+
+class LoadSimulatorTests(SimpleTestCase):
+    """Scan mix parsing and result checks of manage.py loadsim."""
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('generate=1, lookup=4,label'), {'generate': 1.0, 'lookup': 4.0, 'label': 1.0})
+        with self.assertRaisesMessage(ValueError, "Unknown operation 'print'"):
+            parse_mix('print=1')
+        with self.assertRaisesMessage(ValueError, 'positive weight'):
+            parse_mix('generate=0,lookup=0')
+
+    def test_check_serials_finds_duplicates_and_gaps(self):
+        serials = [{'serial_number': number} for number in ('000500', '000501', '000501', '000504', '000505')]
+        self.assertEqual(check_serials(serials), {
+            'allocated': 5,
+            'unique': 4,
+            'duplicates': ['000501'],
+            'gaps': [(502, 503)],
+            'first': 500,
+            'last': 505,
+        })
+        self.assertEqual(check_serials([])['first'], None)
+
+    def test_record_response(self):
+        results = LoadResults()
+        body = json.dumps({'success': True, 'data': {'results': [
+            {'success': True, 'serials': ['000500', '000501'], 'upc': '012345678905'},
+            {'success': False, 'error': 'Unknown part'},
+        ]}}).encode()
+        record_response(results, 'generate', 200, body, 0.01)
+        record_response(results, 'lookup', 404, b'{"success": false}', 0.001)
+        record_response(results, 'generate', 500, b'database is locked', 0.5)
+
+        self.assertEqual([serial['serial_number'] for serial in results.serials], ['000500', '000501'])
+        # The failed part counts as an error; a lookup miss does not
+        self.assertEqual(dict(results.errors), {'generate': 2})
+        self.assertEqual(results.lock_errors, 1)
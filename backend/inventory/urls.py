@@ -7,10 +7,25 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('generate/', views.bulk_generate, name='bulk_generate'),
     path('api/process-bulk-scans/', views.process_bulk_scans, name='process_bulk_scans'),
+    path('api/parse-scan/', views.parse_scan, name='parse_scan'),
+    path('api/serial-events/', views.serial_events, name='serial_events'),
     path('box-label/', views.box_label, name='box_label'),
     path('api/lookup-serial/', views.lookup_serial, name='lookup_serial'),
+    path('api/export-serials/', views.export_serials, name='export_serials'),
+    path('api/changes/', views.change_feed, name='change_feed'),
     path('reprint/', views.reprint, name='reprint'),
+    path('api/recent-batches/', views.recent_batches, name='recent_batches'),
+    path('api/batch-label-zpl/', views.batch_label_zpl, name='batch_label_zpl'),
+    path('api/print-jobs/', views.print_jobs, name='print_jobs'),
+    path('api/print-jobs/<int:job_id>/checkpoint/', views.print_job_checkpoint, name='print_job_checkpoint'),
+    path('api/print-jobs/<int:job_id>/resume/', views.print_job_resume, name='print_job_resume'),
+    path('api/network-printers/', views.network_printers, name='network_printers'),
+    path('api/network-print/', views.network_print, name='network_print'),
+    path('api/network-print/labels/', views.network_print_labels, name='network_print_labels'),
+    path('api/pool-print/', views.pool_print, name='pool_print'),
+    path('api/pool-print/<str:run_id>/', views.pool_print_status, name='pool_print_status'),
     path('printer-settings/', views.printer_settings, name='printer_settings'),
+    path('metrics', views.metrics, name='metrics'),
     
     # Admin UPC Management
     path('admin-login/', views.admin_login, name='admin_login'),
@@ -19,6 +34,8 @@ urlpatterns = [
     path('api/admin-upload-csv/', views.admin_upload_csv, name='admin_upload_csv'),
     path('api/admin-update-upc/', views.admin_update_upc, name='admin_update_upc'),
     path('admin-download-template/', views.admin_download_template, name='admin_download_template'),
+    path('admin-profiler/', views.admin_profiler, name='admin_profiler'),
+    path('admin-slow-queries/', views.admin_slow_queries, name='admin_slow_queries'),
     path('api/preview-zpl/', views.preview_zpl, name='preview_zpl'),
     path('api/generate-label-zpl/', views.generate_label_zpl, name='generate_label_zpl'),
 ]
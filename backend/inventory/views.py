@@ -1,16 +1,44 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.http import require_http_methods
-from .services import BulkScanParser, BulkGenerationService, SerialNumberGenerator
-from .models import SerialNumber, Product, Config
+from django.conf import settings
+from django.db import transaction
+from asgiref.sync import sync_to_async
+from .services import BulkScanParser, BulkGenerationService, LabelTemplateService, SerialNumberGenerator
+from .models import Product, GenerationBatch, PrintJob
+from .batches import GenerationBatchService
+from .print_jobs import PrintJobService
+from .scans import ScanStreamParser
+from .netprint import NetworkPrintError, get_network_printers, get_transport
+from .scheduler import LabelRun, build_schedule, get_printer_pools, job_streams, pool_runs
+from .exports import SerialExportService
+from .archive import SerialArchiveService
+from .feed import ChangeFeedService
+from .routers import read_only_db, read_db_alias
+from .serial_index import aget_serial_index
+from .events import format_event, publish_counter, serial_state, stream_events
+from .profiler import get_profiler, get_profiler_settings
+from .querylog import get_query_log, get_query_log_settings
+from .metrics import CSV_IMPORT_DURATION, CSV_IMPORT_RATE, CSV_IMPORT_ROWS, SERIAL_LOOKUPS, registry
 from .forms import AdminLoginForm, ConfigForm, UPCUploadForm, ProductUPCForm, AdminPasswordChangeForm, LabelTemplateForm
+import asyncio
 import json
+import time
 import csv
 import base64
 import urllib.request
 import urllib.error
 
 
+LABELARY_TIMEOUT = 10
+
+
+def client_station(request, station=None):
+    """Workstation name sent by the client, or else its address."""
+    return str(station or request.META.get('REMOTE_ADDR', ''))[:100]
+
+
 def home(request):
     """Home page with links to all functionality."""
     return render(request, 'inventory/home.html')
@@ -33,34 +61,28 @@ def bulk_generate(request):
 def process_bulk_scans(request):
     """
     API endpoint to process bulk scans and generate serial numbers.
-    Expects JSON with list of part/quantity pairs.
+    Expects JSON with either a list of part/quantity pairs or the raw
+    'scans' in the order they were read (GS1 compound barcodes included),
+    and an optional station name (defaults to the client address) recorded
+    on each batch.
     """
     try:
         data = json.loads(request.body)
-        pairs = data.get('pairs', [])
+        station = client_station(request, data.get('station'))
         
-        # Validate each pair
-        validated_pairs = []
-        for pair in pairs:
-            part_number = pair.get('part_number', '').strip()
-            quantity_str = pair.get('quantity', '')
-            
-            try:
-                quantity = int(quantity_str)
-                qty_valid = quantity > 0
-            except (ValueError, TypeError):
-                quantity = None
-                qty_valid = False
-            
-            validated_pairs.append({
-                'part_number': part_number,
-                'quantity': quantity,
-                'valid': bool(part_number) and qty_valid,
-                'error': None if (bool(part_number) and qty_valid) else 'Invalid input'
-            })
+        if 'scans' in data:
+            scans = data['scans']
+            if isinstance(scans, str):
+                scans = scans.splitlines()
+            validated_pairs = BulkScanParser.parse_scans(str(scan) for scan in scans)
+        else:
+            validated_pairs = [
+                BulkScanParser.validate_pair(pair.get('part_number'), pair.get('quantity'))
+                for pair in data.get('pairs', [])
+            ]
         
         # Process the scans
-        result = BulkGenerationService.process_bulk_scans(validated_pairs)
+        result = BulkGenerationService.process_bulk_scans(validated_pairs, station)
         
         return JsonResponse({
             'success': True,
@@ -74,35 +96,185 @@ def process_bulk_scans(request):
         }, status=400)
 
 
+@require_http_methods(["POST"])
+def parse_scan(request):
+    """
+    Decode one scan for the bulk generation page. A GS1 compound barcode
+    gives the part and quantity at once ('complete'); any other scan is
+    returned as a part number still waiting for its quantity.
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+    
+    parser = ScanStreamParser()
+    completed = parser.feed(str(data.get('scan') or ''))
+    if completed:
+        pair = dict(completed[0], complete=True)
+    elif parser.pending_part is not None:
+        valid = BulkScanParser.validate_part_number(parser.pending_part)
+        pair = {
+            'part_number': parser.pending_part,
+            'quantity': None,
+            'valid': valid,
+            'error': None if valid else 'Invalid part number format',
+            'source': parser.pending_source,
+            'complete': False,
+        }
+    else:
+        return JsonResponse({'success': False, 'error': 'Empty scan'}, status=400)
+    
+    return JsonResponse({'success': True, 'data': pair})
+
+
+@require_http_methods(["GET"])
+async def serial_events(request):
+    """
+    Server-Sent Events stream of the next serial number.
+
+    Under ASGI the connection stays open and receives 'counter' and
+    'generated' events as they happen. WSGI servers would tie up a worker
+    thread per open connection, so there this is polling: the current state
+    is sent once with a retry hint of SERIAL_EVENTS_POLL_INTERVAL and the
+    response ends, and EventSource reconnects after that delay.
+    """
+    config = await SerialNumberGenerator.aget_config()
+    state = serial_state(config.current_serial, config.serial_digits)
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(stream_events(state), content_type='text/event-stream')
+    else:
+        retry_ms = int(getattr(settings, 'SERIAL_EVENTS_POLL_INTERVAL', 2) * 1000)
+        response = HttpResponse(
+            f'retry: {retry_ms}\n' + format_event('counter', state),
+            content_type='text/event-stream'
+        )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Prometheus text-format metrics for this server process."""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 def box_label(request):
     """Box label printing page for shipping."""
     return render(request, 'inventory/box_label.html')
 
 
 @require_http_methods(["GET"])
-def lookup_serial(request):
+@read_only_db
+async def lookup_serial(request):
     """API endpoint to lookup a serial number."""
     serial = request.GET.get('serial', '').strip()
     
-    try:
-        serial_record = SerialNumber.objects.select_related('part_number').get(
-            serial_number=serial
-        )
-        
+    # With the in-memory index enabled, mis-scans are rejected without a
+    # query. A miss that could be a serial another process just generated
+    # is confirmed with a sync first.
+    index = await aget_serial_index()
+    if index is not None and serial not in index and (
+        not index.may_be_new(serial) or not await sync_to_async(index.confirm)(serial)
+    ):
+        SERIAL_LOOKUPS.inc(result='rejected')
         return JsonResponse({
-            'success': True,
-            'data': {
-                'serial_number': serial_record.serial_number,
-                'part_number': serial_record.part_number.part_number,
-                'upc': serial_record.upc,
-                'created_at': serial_record.created_at.isoformat()
-            }
-        })
-    except SerialNumber.DoesNotExist:
+            'success': False,
+            'error': 'Serial number not found'
+        }, status=404)
+    
+    # Recent serials are in the hot table; older ones fall through to the archive
+    serial_record = await SerialArchiveService.alookup(serial)
+    SERIAL_LOOKUPS.inc(result='miss' if serial_record is None else 'hit')
+    if serial_record is None:
         return JsonResponse({
             'success': False,
             'error': 'Serial number not found'
         }, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'serial_number': serial_record['serial_number'],
+            'part_number': serial_record['part_number'],
+            'upc': serial_record['upc'],
+            'created_at': serial_record['created_at'].isoformat(),
+            'archived': serial_record['archived']
+        }
+    })
+
+
+@require_http_methods(["GET"])
+@read_only_db
+def export_serials(request):
+    """
+    Stream serial number history as CSV or NDJSON.
+
+    Query parameters: format (csv|ndjson), gzip (1), start, end (ISO date or
+    datetime), part, serial_from, serial_to, include_archived (1).
+    """
+    export_format = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip', '') in ('1', 'true', 'yes')
+    include_archived = request.GET.get('include_archived', '') in ('1', 'true', 'yes')
+
+    try:
+        filters = {
+            'start_date': SerialExportService.parse_date_bound(request.GET.get('start')),
+            'end_date': SerialExportService.parse_date_bound(request.GET.get('end'), end_of_day=True),
+            'part_number': request.GET.get('part', '').strip() or None,
+            'serial_from': request.GET.get('serial_from', '').strip() or None,
+            'serial_to': request.GET.get('serial_to', '').strip() or None,
+            # Pin the alias: the stream is consumed after the view returns
+            'using': read_db_alias(),
+        }
+        querysets = [SerialExportService.build_queryset(**filters)]
+        if include_archived:
+            # Archived rows are older, so they go first
+            querysets.insert(0, SerialExportService.build_queryset(archived=True, **filters))
+        stream = SerialExportService.stream(querysets, export_format, compress)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+    content_type = 'application/x-ndjson' if export_format == 'ndjson' else 'text/csv'
+    filename = f'serials.{export_format}'
+    if compress:
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_http_methods(["GET"])
+@read_only_db
+def change_feed(request):
+    """
+    API endpoint returning new serials and UPC changes after a cursor.
+
+    Query parameters: cursor (last seq processed, default 0), limit (page size).
+    """
+    try:
+        cursor = int(request.GET.get('cursor', 0))
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid cursor'
+        }, status=400)
+    
+    limit = ChangeFeedService.clamp_page_size(
+        request.GET.get('limit', ChangeFeedService.DEFAULT_PAGE_SIZE)
+    )
+    
+    return JsonResponse({
+        'success': True,
+        'data': ChangeFeedService.fetch(cursor, limit)
+    })
 
 
 def reprint(request):
@@ -110,6 +282,299 @@ def reprint(request):
     return render(request, 'inventory/reprint.html')
 
 
+@require_http_methods(["GET"])
+@read_only_db
+def recent_batches(request):
+    """
+    API endpoint listing recent generation batches, newest first.
+
+    Query parameters: limit (page size), serial (only the batch that
+    contains this serial number).
+    """
+    serial = request.GET.get('serial', '').strip()
+    if serial:
+        batch = GenerationBatchService.containing(serial, using=read_db_alias())
+        batches = [GenerationBatchService.to_dict(batch)] if batch else []
+    else:
+        limit = GenerationBatchService.clamp_limit(
+            request.GET.get('limit', GenerationBatchService.DEFAULT_RECENT)
+        )
+        batches = GenerationBatchService.recent(limit, using=read_db_alias())
+    
+    return JsonResponse({
+        'success': True,
+        'data': {'batches': batches}
+    })
+
+
+@require_http_methods(["GET", "POST"])
+def print_jobs(request):
+    """
+    API endpoint for the print job ledger.
+
+    GET lists the station's unfinished jobs (query parameter: station,
+    defaulting to the client address). POST registers a job; expects JSON
+    with label_type, labels, printer and optional station.
+    """
+    if request.method == 'GET':
+        station = client_station(request, request.GET.get('station'))
+        return JsonResponse({
+            'success': True,
+            'data': {'jobs': PrintJobService.open_jobs(station)}
+        })
+    
+    try:
+        data = json.loads(request.body)
+        job = PrintJobService.create(
+            data.get('label_type'),
+            data.get('labels'),
+            printer=data.get('printer', ''),
+            station=client_station(request, data.get('station'))
+        )
+    except (ValueError, TypeError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'data': PrintJobService.to_dict(job)
+    })
+
+
+@require_http_methods(["POST"])
+def print_job_checkpoint(request, job_id):
+    """
+    API endpoint recording how many labels of a job have printed.
+    Expects JSON with confirmed and optional status and error.
+    """
+    try:
+        data = json.loads(request.body)
+        recorded = PrintJobService.checkpoint(
+            job_id,
+            data.get('confirmed'),
+            status=data.get('status') or PrintJob.STATUS_PRINTING,
+            error=data.get('error', '')
+        )
+    except PrintJob.DoesNotExist as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=404)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'data': {'recorded': recorded}
+    })
+
+
+@require_http_methods(["GET"])
+def print_job_resume(request, job_id):
+    """API endpoint returning a job and the labels it has left to print."""
+    try:
+        job = PrintJobService.resume(job_id)
+    except PrintJob.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'error': 'Print job not found'
+        }, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'data': job
+    })
+
+
+@require_http_methods(["GET"])
+def network_printers(request):
+    """API endpoint listing the raw TCP printers in settings.NETWORK_PRINTERS."""
+    printers = [
+        {
+            'id': f'net:{name}',
+            'name': name,
+            'host': options['HOST'],
+            'port': options['PORT'],
+        }
+        for name, options in sorted(get_network_printers().items())
+    ]
+    return JsonResponse({
+        'success': True,
+        'data': {'printers': printers}
+    })
+
+
+def network_print_error(e):
+    """The JSON response for a failed network print."""
+    return JsonResponse({
+        'success': False,
+        'error': str(e),
+        'labels_sent': e.labels_sent
+    }, status=502)
+
+
+def network_print_result(result):
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'printer': result['printer'],
+            'bytes': result['bytes'],
+            'labels': result['labels'],
+            'ms': round(result['seconds'] * 1000, 2)
+        }
+    })
+
+
+@require_http_methods(["POST"])
+async def network_print(request):
+    """
+    API endpoint sending ZPL to a network printer over raw TCP (port 9100)
+    through the server's pooled connections, instead of the bridge.
+    Expects JSON with printer (name or "net:<name>") and zpl.
+
+    The socket writes (up to WRITE_TIMEOUT each, plus the wait for a pooled
+    connection) run in a worker thread of their own, so a stalled printer
+    holds neither the event loop nor the thread other sync views share.
+    """
+    try:
+        data = json.loads(request.body)
+        printer = str(data.get('printer', '')).removeprefix('net:')
+        zpl = data.get('zpl', '')
+        if printer not in get_network_printers():
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown network printer: {printer}'
+            }, status=404)
+        if not zpl:
+            return JsonResponse({
+                'success': False,
+                'error': 'No ZPL data provided'
+            }, status=400)
+        result = await sync_to_async(get_transport().print_document, thread_sensitive=False)(printer, zpl)
+    except NetworkPrintError as e:
+        return network_print_error(e)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    return network_print_result(result)
+
+
+@require_http_methods(["POST"])
+async def network_print_labels(request):
+    """
+    API endpoint printing a list of labels on a network printer in one
+    request, pipelined LABELS_PER_WRITE labels per write. Used by print
+    jobs (bulk generation, reprints, resumes) in place of one request per
+    label.
+
+    Expects JSON with printer, label_type and labels (dicts with
+    serial_number, part_number and upc, in print order). When the printer
+    stops part way, the 502 response's labels_sent says how many labels it
+    took, so the job can be checkpointed there.
+    """
+    try:
+        data = json.loads(request.body)
+        printer = str(data.get('printer', '')).removeprefix('net:')
+        if printer not in get_network_printers():
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown network printer: {printer}'
+            }, status=404)
+        labels = PrintJobService.clean_labels(data.get('labels'))
+        
+        config = await SerialNumberGenerator.aget_config()
+        zpl_template = LabelTemplateService.get_template(config, data.get('label_type', 'serial'))
+        documents = [
+            LabelTemplateService.render(zpl_template, label['serial_number'], label['part_number'], label['upc'])
+            for label in labels
+        ]
+        result = await sync_to_async(get_transport().print_labels, thread_sensitive=False)(printer, documents)
+    except NetworkPrintError as e:
+        return network_print_error(e)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    return network_print_result(result)
+
+
+@require_http_methods(["POST"])
+def pool_print(request):
+    """
+    API endpoint printing a generation batch (or a sub-range) across a
+    printer pool from settings.PRINTER_POOLS.
+
+    Expects JSON with pool, batch_id, label_type and optional start/end
+    serials. With dry_run, returns the per-printer ZPL jobs without
+    printing; otherwise printing starts in the background and the run's
+    progress is at /api/pool-print/<run_id>/.
+    """
+    try:
+        data = json.loads(request.body)
+        pool_name = data.get('pool', '')
+        if pool_name not in get_printer_pools():
+            return JsonResponse({
+                'success': False,
+                'error': f'Unknown printer pool: {pool_name}'
+            }, status=404)
+        
+        batch = GenerationBatch.objects.filter(pk=data.get('batch_id')).first()
+        if batch is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Batch not found'
+            }, status=404)
+        
+        config = SerialNumberGenerator.get_config()
+        template = LabelTemplateService.get_template(config, data.get('label_type', 'serial'))
+        serials = GenerationBatchService.serials(batch, data.get('start'), data.get('end'))
+        schedule = build_schedule(pool_name, int(serials[0]), int(serials[-1]))
+        labels = LabelRun(template, batch.part_number_id, batch.upc, batch.serial_digits)
+    except (ValueError, TypeError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    
+    if data.get('dry_run'):
+        return JsonResponse({
+            'success': True,
+            'data': {'jobs': job_streams(schedule, labels)}
+        })
+    
+    run_id = pool_runs.start(pool_name, schedule, labels)
+    return JsonResponse({
+        'success': True,
+        'data': pool_runs.status(run_id)
+    })
+
+
+@require_http_methods(["GET"])
+def pool_print_status(request, run_id):
+    """API endpoint reporting a pool print run's per-printer progress."""
+    run = pool_runs.status(run_id)
+    if run is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Pool print run not found'
+        }, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'data': run
+    })
+
+
 def printer_settings(request):
     """Printer configuration page."""
     return render(request, 'inventory/printer_settings.html')
@@ -153,14 +618,18 @@ def admin_upc(request):
         return redirect('inventory:admin_login')
     
     config = SerialNumberGenerator.get_config()
-    products = Product.objects.all().order_by('part_number')
+    # Rendered after the view body, so pin the listing to the read-only alias
+    products = Product.objects.using(read_db_alias()).order_by('part_number')
     
     # Handle config update
     config_updated = False
     if request.method == 'POST' and 'update_config' in request.POST:
         config_form = ConfigForm(request.POST, instance=config)
         if config_form.is_valid():
-            config_form.save()
+            # Only the form's columns: a full-row save would write back the
+            # last_change_seq read above and rewind the change feed counter
+            config_form.save(commit=False).save(update_fields=ConfigForm.Meta.fields)
+            publish_counter(config_form.instance)
             config_updated = True
             config = SerialNumberGenerator.get_config()  # Reload config
     else:
@@ -175,7 +644,7 @@ def admin_upc(request):
             # Reload config to avoid stale data
             config = SerialNumberGenerator.get_config()
             config.admin_password = password_form.cleaned_data['new_password']
-            config.save()
+            config.save(update_fields=['admin_password'])
             password_updated = True
             password_form = AdminPasswordChangeForm()  # Reset form
     
@@ -184,7 +653,7 @@ def admin_upc(request):
     if request.method == 'POST' and 'update_templates' in request.POST:
         template_form = LabelTemplateForm(request.POST, instance=config)
         if template_form.is_valid():
-            template_form.save()
+            template_form.save(commit=False).save(update_fields=LabelTemplateForm.Meta.fields)
             template_updated = True
             config = SerialNumberGenerator.get_config()  # Reload config
     else:
@@ -220,20 +689,31 @@ def admin_upload_csv(request):
     
     form = UPCUploadForm(request.POST, request.FILES)
     if form.is_valid():
+        started = time.perf_counter()
         results, errors = form.parse_csv()
         
         updated_count = 0
         created_count = 0
         
-        for part_number, upc in results:
-            product, created = Product.objects.get_or_create(part_number=part_number)
-            product.upc = upc
-            product.save()
-            
-            if created:
-                created_count += 1
-            else:
-                updated_count += 1
+        with transaction.atomic():
+            for part_number, upc in results:
+                product, created = Product.objects.get_or_create(part_number=part_number)
+                if created or product.upc != upc:
+                    product.upc = upc
+                    product.change_seq = ChangeFeedService.reserve_locked(1)
+                    product.save()
+                
+                if created:
+                    created_count += 1
+                else:
+                    updated_count += 1
+        
+        elapsed = time.perf_counter() - started
+        rows = len(results) + len(errors)
+        CSV_IMPORT_ROWS.inc(rows)
+        CSV_IMPORT_DURATION.observe(elapsed)
+        if elapsed > 0:
+            CSV_IMPORT_RATE.set(rows / elapsed)
         
         return JsonResponse({
             'success': True,
@@ -260,9 +740,12 @@ def admin_update_upc(request):
         part_number = data.get('part_number')
         upc = data.get('upc', '').strip() or None
         
-        product = get_object_or_404(Product, part_number=part_number)
-        product.upc = upc
-        product.save()
+        with transaction.atomic():
+            product = get_object_or_404(Product, part_number=part_number)
+            if product.upc != upc:
+                product.upc = upc
+                product.change_seq = ChangeFeedService.reserve_locked(1)
+                product.save()
         
         return JsonResponse({'success': True})
     except Exception as e:
@@ -283,10 +766,90 @@ def admin_download_template(request):
     return response
 
 
+def admin_profiler(request):
+    """Slow-request report from the opt-in request profiler."""
+    if not request.session.get('admin_authenticated'):
+        return redirect('inventory:admin_login')
+    
+    profiler = get_profiler()
+    if request.method == 'POST' and profiler is not None:
+        profiler.log.clear()
+        return redirect('inventory:admin_profiler')
+    
+    context = {
+        'enabled': profiler is not None,
+        'options': get_profiler_settings(),
+        'records': profiler.log.records() if profiler else [],
+    }
+    return render(request, 'inventory/admin_profiler.html', context)
+
+
+def admin_slow_queries(request):
+    """Slow statements grouped by SQL shape, with full table scans flagged."""
+    if not request.session.get('admin_authenticated'):
+        return redirect('inventory:admin_login')
+    
+    query_log = get_query_log()
+    if request.method == 'POST' and query_log is not None:
+        query_log.shapes.clear()
+        return redirect('inventory:admin_slow_queries')
+    
+    context = {
+        'enabled': query_log is not None,
+        'options': get_query_log_settings(),
+        'entries': query_log.shapes.entries() if query_log else [],
+    }
+    return render(request, 'inventory/admin_slow_queries.html', context)
+
+
+class LabelaryError(Exception):
+    """Labelary rejected the ZPL or could not be reached."""
+
+
+async def post_to_labelary(url, zpl_code):
+    """
+    POST ZPL to Labelary and return the PNG bytes without blocking the event loop.
+    Uses httpx when installed, otherwise urllib in a worker thread.
+    """
+    # Imported here: httpx is slow to import and only previews need it
+    try:
+        import httpx
+    except ImportError:
+        httpx = None
+
+    headers = {
+        'Accept': 'image/png',
+        'Content-Type': 'application/x-www-form-urlencoded'
+    }
+    body = zpl_code.encode('utf-8')
+
+    if httpx is None:
+        def post():
+            req = urllib.request.Request(url, data=body, headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(req, timeout=LABELARY_TIMEOUT) as response:
+                    return response.read()
+            except urllib.error.HTTPError as e:
+                error_body = e.read().decode('utf-8') if e.fp else 'Unknown error'
+                raise LabelaryError(f'Labelary API error: {e.code} - {error_body}')
+            except urllib.error.URLError as e:
+                raise LabelaryError(f'Network error: {str(e.reason)}')
+        return await asyncio.to_thread(post)
+
+    try:
+        async with httpx.AsyncClient(timeout=LABELARY_TIMEOUT) as client:
+            response = await client.post(url, content=body, headers=headers)
+    except httpx.RequestError as e:
+        raise LabelaryError(f'Network error: {str(e) or e.__class__.__name__}')
+    if response.status_code >= 400:
+        raise LabelaryError(f'Labelary API error: {response.status_code} - {response.text}')
+    return response.content
+
+
 @require_http_methods(["POST"])
-def preview_zpl(request):
+async def preview_zpl(request):
     """Preview ZPL label using Labelary API."""
-    if not request.session.get('admin_authenticated'):
+    if not await request.session.aget('admin_authenticated'):
         return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=403)
     
     try:
@@ -295,7 +858,7 @@ def preview_zpl(request):
         label_type = data.get('label_type', 'serial')  # 'serial' or 'box'
         
         # Get config to determine label size
-        config = SerialNumberGenerator.get_config()
+        config = await SerialNumberGenerator.aget_config()
         
         # Get dimensions based on label type
         if label_type == 'box':
@@ -319,19 +882,8 @@ def preview_zpl(request):
         # Labelary API endpoint: POST http://api.labelary.com/v1/printers/{dpmm}/labels/{width}x{height}/0/
         url = f'http://api.labelary.com/v1/printers/{dpmm}/labels/{width}x{height}/0/'
         
-        # Send POST request with ZPL in body
-        req = urllib.request.Request(
-            url,
-            data=zpl_code.encode('utf-8'),
-            headers={
-                'Accept': 'image/png',
-                'Content-Type': 'application/x-www-form-urlencoded'
-            },
-            method='POST'
-        )
-        
-        with urllib.request.urlopen(req, timeout=10) as response:
-            image_data = response.read()
+        # Awaiting here frees the worker for other requests while Labelary renders
+        image_data = await post_to_labelary(url, zpl_code)
         
         # Convert to base64
         image_base64 = base64.b64encode(image_data).decode('utf-8')
@@ -341,16 +893,10 @@ def preview_zpl(request):
             'image': f'data:image/png;base64,{image_base64}'
         })
     
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8') if e.fp else 'Unknown error'
+    except LabelaryError as e:
         return JsonResponse({
             'success': False,
-            'error': f'Labelary API error: {e.code} - {error_body}'
-        }, status=400)
-    except urllib.error.URLError as e:
-        return JsonResponse({
-            'success': False,
-            'error': f'Network error: {str(e.reason)}'
+            'error': str(e)
         }, status=400)
     except Exception as e:
         return JsonResponse({
@@ -360,7 +906,7 @@ def preview_zpl(request):
 
 
 @require_http_methods(["POST"])
-def generate_label_zpl(request):
+async def generate_label_zpl(request):
     """Generate ZPL code for a label with actual data."""
     try:
         data = json.loads(request.body)
@@ -369,38 +915,55 @@ def generate_label_zpl(request):
         part_number = data.get('part_number', '')
         upc = data.get('upc', '')
         
-        config = SerialNumberGenerator.get_config()
+        config = await SerialNumberGenerator.aget_config()
         
-        # Get the appropriate template
-        if label_type == 'serial':
-            zpl_template = config.serial_label_zpl
-        elif label_type == 'box':
-            zpl_template = config.box_label_zpl
-        else:
-            return JsonResponse({
-                'success': False,
-                'error': 'Invalid label_type. Must be "serial" or "box"'
-            }, status=400)
+        # Get the appropriate template (ValueError for an unknown label_type)
+        zpl_template = LabelTemplateService.get_template(config, label_type)
+        zpl_code = LabelTemplateService.render(zpl_template, serial_number, part_number, upc)
         
-        # Substitute variables
-        zpl_code = zpl_template.replace('{{serial}}', serial_number)
-        zpl_code = zpl_code.replace('{{part}}', part_number)
+        return JsonResponse({
+            'success': True,
+            'zpl': zpl_code,
+            'label_type': label_type
+        })
+    
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+
+
+@require_http_methods(["POST"])
+async def batch_label_zpl(request):
+    """
+    Generate ZPL for every label of a generation batch, or a sub-range of it,
+    as one document for a single print job.
+
+    Expects JSON with batch_id, label_type and optional start/end serials.
+    """
+    try:
+        data = json.loads(request.body)
+        label_type = data.get('label_type', 'serial')
         
-        # Handle UPC variables (both full and 11-digit versions)
-        if upc:
-            upc_full = upc  # Full 12-digit UPC
-            upc_11 = upc[:11] if len(upc) >= 11 else upc  # First 11 digits for UPC-A barcode
-        else:
-            upc_full = ''
-            upc_11 = ''
+        batch = await GenerationBatch.objects.filter(pk=data.get('batch_id')).afirst()
+        if batch is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Batch not found'
+            }, status=404)
         
-        zpl_code = zpl_code.replace('{{upc_full}}', upc_full)
-        zpl_code = zpl_code.replace('{{upc_11_digits}}', upc_11)
+        config = await SerialNumberGenerator.aget_config()
+        zpl_template = LabelTemplateService.get_template(config, label_type)
+        serials = GenerationBatchService.serials(batch, data.get('start'), data.get('end'))
         
         return JsonResponse({
             'success': True,
-            'zpl': zpl_code,
-            'label_type': label_type
+            'zpl': LabelTemplateService.render_many(zpl_template, serials, batch.part_number_id, batch.upc),
+            'label_type': label_type,
+            'count': len(serials),
+            'first_serial': serials[0],
+            'last_serial': serials[-1]
         })
     
     except Exception as e:
@@ -6,6 +6,7 @@ Build with: pyinstaller labelgen.spec
 """
 
 import os
+import sys
 from pathlib import Path
 
 block_cipher = None
@@ -13,6 +14,9 @@ block_cipher = None
 # Base directory
 base_dir = Path(SPECPATH)
 
+sys.path.insert(0, str(base_dir))
+from bundle_config import EXCLUDED_MODULES, keep_data_file
+
 # Collect Django files
 django_datas = []
 
@@ -20,18 +24,22 @@ django_datas = []
 inventory_dir = base_dir / 'inventory'
 templates_dir = inventory_dir / 'templates'
 static_dir = inventory_dir / 'static'
-migrations_dir = inventory_dir / 'migrations'
 
 if templates_dir.exists():
     django_datas.append((str(templates_dir), 'inventory/templates'))
 if static_dir.exists():
     django_datas.append((str(static_dir), 'inventory/static'))
-if migrations_dir.exists():
-    django_datas.append((str(migrations_dir), 'inventory/migrations'))
 
-# Add labelgen settings
-labelgen_dir = base_dir / 'labelgen'
-django_datas.append((str(labelgen_dir), 'labelgen'))
+# Hashed and precompressed static files from `collectstatic` (build_exe.py
+# runs it before PyInstaller)
+staticfiles_dir = base_dir / 'staticfiles'
+if staticfiles_dir.exists():
+    django_datas.append((str(staticfiles_dir), 'staticfiles'))
+
+# The labelgen package ships only as compiled modules in the PYZ archive.
+# Migrations are compiled there too, but Django's PyInstaller hook also
+# collects every app's migrations/*.py as data files, so their source is
+# still in the bundle
 
 # Add database (if exists)
 db_path = base_dir / 'db.sqlite3'
@@ -40,11 +48,9 @@ if db_path.exists():
 
 # Hidden imports needed by Django
 hidden_imports = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
-    'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.template.loaders.filesystem',
     'django.template.loaders.app_directories',
@@ -54,8 +60,15 @@ hidden_imports = [
     'inventory.urls',
     'inventory.forms',
     'inventory.services',
+    'inventory.startup',
     'labelgen.settings',
+    'labelgen.settings_production',
     'labelgen.urls',
+    'labelgen.wsgi',
+    'inventory.management.commands.serve',
+    'waitress',
+    'whitenoise.middleware',
+    'whitenoise.storage',
     'pystray._win32',
 ]
 
@@ -68,13 +81,19 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDED_MODULES,
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
     noarchive=False,
+    # Ship bytecode compiled with -O (asserts stripped); docstrings are kept
+    optimize=1,
 )
 
+# Drop data files (templates, static files, translations) of excluded apps
+# and non-English locales that Django's hook collects wholesale
+a.datas = [entry for entry in a.datas if keep_data_file(entry[0])]
+
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
 exe = EXE(
@@ -9,8 +9,10 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'labelgen.settings')
 
+# Serves static files itself in place of the sync-only WhiteNoise middleware
+# (see inventory/asgi_static.py)
+from inventory.asgi_static import get_asgi_application  # noqa: E402
+
 application = get_asgi_application()
@@ -48,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.middleware.metrics_middleware',
+    'inventory.middleware.profiler_middleware',
+    'inventory.middleware.slow_query_middleware',
+    'inventory.middleware.trace_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +80,21 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'labelgen.wsgi.application'
 
+# Defaults for `manage.py serve` (waitress). THREADS is the worker pool,
+# CONNECTION_LIMIT caps open (keep-alive) connections, CHANNEL_TIMEOUT closes
+# idle keep-alive connections after that many seconds and BACKLOG is the
+# listen queue depth for connections waiting to be accepted. ASGI serves
+# labelgen.asgi with uvicorn instead, so async views share one event loop.
+SERVER = {
+    'HOST': '127.0.0.1',
+    'PORT': 8001,
+    'THREADS': 8,
+    'CONNECTION_LIMIT': 100,
+    'CHANNEL_TIMEOUT': 120,
+    'BACKLOG': 1024,
+    'ASGI': False,
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
@@ -84,7 +103,151 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Keep connections open between requests instead of reconnecting
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds the sqlite3 driver waits on a locked database
+            'timeout': 20,
+            # Take the write lock when a transaction starts so concurrent
+            # generate_serials calls queue up instead of failing on lock upgrade
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Read-only connections to the same WAL database for lookup/export views.
+    # They never queue behind the write lock held by serial generation.
+    'reader': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+    # Sessions, auth, admin log and content types live in their own file so
+    # their writes never take the lock that serial generation needs.
+    'system': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'system.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+}
+
+DATABASE_ROUTERS = [
+    'inventory.routers.SystemAppsRouter',
+    'inventory.routers.ReadReplicaRouter',
+]
+
+# PRAGMAs applied to every new SQLite connection (see inventory/db.py).
+# WAL lets lookups read while serials are being generated; NORMAL sync is
+# durable across application crashes and only syncs the WAL at checkpoints.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 20000,        # milliseconds
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,       # 256 MB memory-mapped I/O
+    'cache_size': -65536,         # negative = KiB, so 64 MB page cache
+    'temp_store': 'MEMORY',
+}
+
+# Per-alias changes to SQLITE_PRAGMAS; a value of None drops that PRAGMA.
+# Read-only connections cannot switch the journal mode (the writer already
+# put the file in WAL mode), and query_only guards against stray writes.
+SQLITE_ALIAS_PRAGMAS = {
+    'reader': {
+        'journal_mode': None,
+        'query_only': 'ON',
+    },
+}
+
+# Serials older than this are moved to the archive table by
+# `manage.py archive_serials`; lookups fall through to the archive.
+SERIAL_ARCHIVE_AFTER_DAYS = 90
+
+# How often (seconds) the live "Next Serial" stream checks the database for
+# counter changes made by other server processes. Under WSGI the stream
+# isn't held open, so this is also how often each open page polls.
+SERIAL_EVENTS_POLL_INTERVAL = 2
+
+# Optional in-memory serial index (inventory/serial_index.py). Unknown serials
+# are rejected by a Bloom filter without querying SQLite. Serials generated by
+# other processes are picked up every SYNC_INTERVAL seconds. An unknown serial
+# that could be one of them (numeric, the current width, above every indexed
+# number) triggers a sync before it is reported as not found.
+SERIAL_INDEX = {
+    'ENABLED': False,
+    'SYNC_INTERVAL': 5,
+    'BLOOM_ERROR_RATE': 0.01,
+}
+
+# Opt-in request profiler (inventory/profiler.py), reported on /admin-profiler/.
+# SAMPLE_RATE of requests are run under cProfile and tracemalloc; every
+# request slower than SLOW_THRESHOLD_MS is recorded with its SQL count and
+# time. The KEEP slowest are kept in memory. Costs nothing when disabled.
+PROFILER = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'SLOW_THRESHOLD_MS': 500,
+    'KEEP': 50,
+    'TRACEMALLOC': True,
+}
+
+# Slow-query log (inventory/querylog.py), reported on /admin-slow-queries/.
+# Statements slower than THRESHOLD_MS are logged to 'inventory.slow_queries'
+# with their view, parameters and EXPLAIN QUERY PLAN, and aggregated by SQL
+# shape. Full scans of FLAG_TABLES are flagged in the report.
+SLOW_QUERY_LOG = {
+    'ENABLED': False,
+    'THRESHOLD_MS': 50,
+    'EXPLAIN': True,
+    'KEEP_SHAPES': 200,
+    'FLAG_TABLES': ('inventory_serialnumber', 'inventory_product'),
+}
+
+# Record generate, lookup and label requests to FILE (one JSON line each) so
+# `manage.py loadsim --replay FILE` can replay a real session at higher speed.
+LOAD_TRACE = {
+    'ENABLED': False,
+    'FILE': BASE_DIR / 'load_trace.ndjson',
+}
+
+# Network label printers the server prints to directly over raw TCP
+# (inventory/netprint.py). Each appears on the printer settings page as
+# "net:<name>". Only HOST is required; see netprint.PRINTER_DEFAULTS for
+# PORT, POOL_SIZE, LABELS_PER_WRITE, WRITE_TIMEOUT and the rest.
+#   NETWORK_PRINTERS = {
+#       'shipping-zebra': {'HOST': '192.168.1.50'},
+#       'line-2-datamax': {'HOST': '192.168.1.51', 'LABELS_PER_WRITE': 50},
+#   }
+NETWORK_PRINTERS = {}
+
+# Pools of identical network printers that share large runs
+# (inventory/scheduler.py): NETWORK_PRINTERS names and their relative speeds.
+# A run is split into one contiguous serial range per printer, and work moves
+# to whichever printer finishes first.
+#   PRINTER_POOLS = {
+#       'line-1': {'shipping-zebra': 1.0, 'line-2-datamax': 0.6},
+#   }
+PRINTER_POOLS = {}
+
+# Bulk scan parsing (inventory/scans.py). Patterns must match the whole scan;
+# use r'\d{3}-\d{4}' for strict XXX-XXXX part numbers. GS1 compound barcodes
+# (AI 240 part, AI 30/37 quantity) are decoded when GS1 is on; set
+# GS1_SEPARATOR to whatever the scanners send for FNC1.
+SCAN_PARSER = {
+    'PART_PATTERN': r'\S.*',
+    'QUANTITY_PATTERN': r'0*[1-9][0-9]{0,5}',
+    'GS1': True,
+    'GS1_SEPARATOR': '\x1d',
 }
 
 
@@ -123,3 +286,7 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# `manage.py collectstatic` target. The production settings serve it with
+# WhiteNoise from hashed, precompressed copies.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -0,0 +1,71 @@
+"""
+Production settings for labelgen.
+
+Used by the tray app and `manage.py serve`. Everything comes from the base
+settings except debugging aids: DEBUG is off (so Django no longer records every
+SQL query in memory), templates are compiled once and cached, apps nothing
+uses are not loaded, and static files are served by WhiteNoise.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+
+DEBUG = False
+
+# Comma-separated host names the server answers to. Add the server's LAN
+# address or host name when workstations connect over the network.
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('LABELGEN_ALLOWED_HOSTS', 'localhost,127.0.0.1,[::1]').split(',')
+    if host.strip()
+]
+
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# The Django admin site is not routed (see labelgen/urls.py) and no view uses
+# the messages framework, so skip loading them at startup.
+UNUSED_APPS = ('django.contrib.admin', 'django.contrib.messages')
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware != 'django.contrib.messages.middleware.MessageMiddleware'
+]
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+    if processor != 'django.contrib.messages.context_processors.messages'
+]
+
+# Static files: collectstatic writes content-hashed copies plus .gz and .br
+# variants (.br needs the brotli package). WhiteNoise serves hashed files as
+# immutable with a far-future max-age, so stations only download the page
+# CSS/JS again after an upgrade changes it. The middleware is sync-only, so
+# this subclass of it steps aside under labelgen.asgi, which serves the same
+# files in front of Django (inventory/asgi_static.py).
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'inventory.asgi_static.StaticFilesMiddleware',
+)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# The frozen bundle collects static files at build time and ships them inside
+# the executable
+if getattr(sys, 'frozen', False):
+    STATIC_ROOT = Path(sys._MEIPASS) / 'staticfiles'
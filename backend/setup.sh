@@ -27,6 +27,7 @@ fi
 # Run migrations
 echo "✓ Running database migrations..."
 python manage.py migrate
+python manage.py migrate --database=system
 
 # Check if superuser exists
 echo ""
@@ -25,6 +25,16 @@ except ImportError:
 # When frozen, we need to run Django directly, not as subprocess
 IS_FROZEN = getattr(sys, 'frozen', False)
 
+# Serve through waitress with production settings unless the development
+# server is explicitly requested (LABELGEN_DEV_SERVER=1). The frozen bundle
+# leaves out the apps the development settings need, so it always uses
+# production settings.
+USE_DEV_SERVER = (
+    not IS_FROZEN
+    and os.environ.get('LABELGEN_DEV_SERVER', '') in ('1', 'true', 'yes')
+)
+SETTINGS_MODULE = 'labelgen.settings' if USE_DEV_SERVER else 'labelgen.settings_production'
+
 
 class LabelGenTrayApp:
     def __init__(self):
@@ -54,8 +64,14 @@ class LabelGenTrayApp:
         
         return image
     
+    def server_args(self):
+        """manage.py arguments for the configured server mode"""
+        if USE_DEV_SERVER:
+            return ['runserver', str(self.port), '--noreload']
+        return ['serve', str(self.port)]
+    
     def start_server(self):
-        """Start the Django development server"""
+        """Start the Django server"""
         if self.server_process is not None or self.running:
             return
         
@@ -71,7 +87,8 @@ class LabelGenTrayApp:
                 manage_py = self.base_dir / 'manage.py'
                 python_exe = sys.executable
                 
-                cmd = [python_exe, str(manage_py), 'runserver', str(self.port), '--noreload']
+                cmd = [python_exe, str(manage_py)] + self.server_args()
+                env = dict(os.environ, DJANGO_SETTINGS_MODULE=SETTINGS_MODULE)
                 
                 # Start server in background
                 startupinfo = None
@@ -83,8 +100,11 @@ class LabelGenTrayApp:
                 self.server_process = subprocess.Popen(
                     cmd,
                     cwd=str(self.base_dir),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
+                    env=env,
+                    # Nothing reads the server's output; a pipe would fill up
+                    # with request log lines and stall the server
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                     startupinfo=startupinfo
                 )
             
@@ -100,39 +120,55 @@ class LabelGenTrayApp:
         """Run Django server directly when frozen (in thread)"""
         try:
             # Set up Django
-            os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'labelgen.settings')
+            os.environ.setdefault('DJANGO_SETTINGS_MODULE', SETTINGS_MODULE)
+            
+            from inventory.startup import StartupTimer, ensure_schema
+            timer = StartupTimer()
             
             import django
             from django.core.management import execute_from_command_line, call_command
             
-            django.setup()
+            timer.step('django.setup', django.setup)
             
-            # Apply migrations automatically on startup
-            print("Checking for migrations...")
+            # Migrate and create the Config row only when the shipped
+            # migrations or the database files changed since the last launch
             try:
-                call_command('migrate', '--noinput', verbosity=0)
-                print("✓ Migrations applied")
+                if ensure_schema(timer):
+                    print("✓ Migrations applied")
+                else:
+                    print("✓ Schema unchanged, migrate skipped")
             except Exception as e:
                 print(f"Warning: Migration error: {e}")
             
-            # Check if Config object exists, create if not
-            try:
-                from inventory.models import Config
-                if not Config.objects.exists():
-                    print("Creating initial Config...")
-                    Config.objects.create()
-                    print("✓ Config created")
-            except Exception as e:
-                print(f"Warning: Config check error: {e}")
+            # Load the serial index in the background so it doesn't delay the first request
+            threading.Thread(target=self._warm_serial_index, daemon=True).start()
+            
+            print(timer.report())
             
             # Run server
-            sys.argv = ['manage.py', 'runserver', str(self.port), '--noreload']
-            execute_from_command_line(sys.argv)
+            if USE_DEV_SERVER:
+                sys.argv = ['manage.py'] + self.server_args()
+                execute_from_command_line(sys.argv)
+            else:
+                # Pass the command instance; command discovery scans the
+                # filesystem, which doesn't see modules inside the bundle
+                from inventory.management.commands.serve import Command as ServeCommand
+                call_command(ServeCommand(), str(self.port))
         except Exception as e:
             print(f"Error running Django: {e}")
         finally:
             self.running = False
     
+    def _warm_serial_index(self):
+        """Load the serial index so the first scan doesn't wait for it"""
+        try:
+            from inventory.serial_index import get_serial_index
+            index = get_serial_index()
+            if index is not None:
+                print(f"✓ Serial index loaded ({len(index)} serials)")
+        except Exception as e:
+            print(f"Warning: Serial index error: {e}")
+    
     def stop_server(self):
         """Stop the Django server"""
         if self.server_process: